@@ -0,0 +1,28 @@
+# admin_sistema/hashing.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+# Por debajo de este número de contraseñas no compensa levantar procesos.
+MINIMO_PARA_POOL = 8
+
+
+def hashear_passwords(passwords, workers=None):
+    """
+    Calcula make_password() para cada contraseña, en paralelo con un pool de
+    procesos (PBKDF2 es CPU-bound). Mantiene el orden de la lista recibida.
+
+    Este módulo no importa modelos para que los procesos hijos (spawn en
+    Windows) puedan cargarlo sin inicializar las apps de Django.
+    """
+    passwords = list(passwords)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(passwords) < MINIMO_PARA_POOL:
+        return [make_password(p) for p in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
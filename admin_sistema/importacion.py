@@ -0,0 +1,168 @@
+# admin_sistema/importacion.py
+
+import csv
+import io
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from core.cache_datos import invalidar_tablas
+from core.models import NIVEL_ACCESO_CHOICES, PerfilUsuario
+from .hashing import hashear_passwords
+
+# Columnas del CSV (mismos nombres que el formulario de gestion_usuarios)
+COLUMNAS_CSV = ('usuario', 'contrasena', 'nombre', 'apellidos', 'email', 'nivel', 'num_empleado')
+# Sólo los niveles que la interfaz puede mostrar y editar
+NIVELES_VALIDOS = tuple(str(valor) for valor, _ in NIVEL_ACCESO_CHOICES)
+LONGITUD_USUARIO = User._meta.get_field('username').max_length
+TAMANO_LOTE_DEFAULT = 500
+
+
+class ResultadoImportacion:
+    """Resumen de una importación: usuarios creados y fallos por fila."""
+
+    def __init__(self):
+        self.creados = 0
+        self.errores = []  # [(linea, usuario, motivo)]
+
+    def agregar_error(self, linea, usuario, motivo):
+        self.errores.append((linea, usuario, motivo))
+
+
+def leer_csv(archivo):
+    """
+    Lee un CSV (ruta, archivo de texto o UploadedFile binario) y retorna una
+    lista de (linea, fila_dict) con las claves normalizadas a minúsculas.
+    """
+    if isinstance(archivo, (str, bytes)) or hasattr(archivo, '__fspath__'):
+        with open(archivo, newline='', encoding='utf-8-sig') as f:
+            return leer_csv(f)
+
+    contenido = archivo.read()
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8-sig')
+
+    lector = csv.DictReader(io.StringIO(contenido))
+    filas = []
+    # La línea 1 es el encabezado
+    for linea, fila in enumerate(lector, start=2):
+        filas.append((linea, {
+            (k or '').strip().lower(): (v or '').strip() for k, v in fila.items()
+        }))
+    return filas
+
+
+def _validar_filas(filas, resultado):
+    """
+    Descarta filas incompletas, duplicadas en el archivo o ya existentes en la
+    BD. Los usuarios se comparan sin distinguir mayúsculas, como en MySQL.
+    """
+    candidatas = []
+    vistos = set()
+
+    for linea, fila in filas:
+        username = fila.get('usuario', '')
+        nivel = fila.get('nivel') or '3'
+
+        if not username or not fila.get('contrasena'):
+            resultado.agregar_error(linea, username, "Faltan usuario o contraseña.")
+        elif len(username) > LONGITUD_USUARIO:
+            resultado.agregar_error(linea, username, f"El usuario no puede tener más de {LONGITUD_USUARIO} caracteres.")
+        elif nivel not in NIVELES_VALIDOS:
+            resultado.agregar_error(linea, username, f"Nivel '{nivel}' no válido.")
+        elif username.lower() in vistos:
+            resultado.agregar_error(linea, username, "Usuario repetido en el archivo.")
+        else:
+            vistos.add(username.lower())
+            fila['nivel'] = nivel
+            candidatas.append((linea, fila))
+
+    # Una sola consulta para detectar usuarios que ya existen
+    existentes = set(
+        User.objects.annotate(usuario_normalizado=Lower('username'))
+        .filter(usuario_normalizado__in=vistos)
+        .values_list('usuario_normalizado', flat=True)
+    )
+    validas = []
+    for linea, fila in candidatas:
+        if fila['usuario'].lower() in existentes:
+            resultado.agregar_error(linea, fila['usuario'], "El usuario ya existe.")
+        else:
+            validas.append((linea, fila))
+    return validas
+
+
+def _insertar_lote(lote, resultado):
+    """
+    Inserta un lote con bulk_create en una transacción. Si una fila viola una
+    restricción (p. ej. un usuario creado mientras tanto) el lote se reintenta
+    fila por fila, cada una en su savepoint, y sólo se reporta la fila culpable.
+    """
+    try:
+        _crear_usuarios(lote)
+        resultado.creados += len(lote)
+    except IntegrityError as e:
+        if len(lote) == 1:
+            linea, fila, password_hash = lote[0]
+            resultado.agregar_error(linea, fila['usuario'], f"No se pudo crear: {e}")
+            return
+        for item in lote:
+            _insertar_lote([item], resultado)
+
+
+def _crear_usuarios(lote):
+    """User + PerfilUsuario del lote con bulk_create en una transacción (o savepoint)."""
+    usuarios = []
+    for linea, fila, password_hash in lote:
+        nivel = fila['nivel']
+        usuarios.append(User(
+            username=fila['usuario'],
+            password=password_hash,
+            first_name=fila.get('nombre', ''),
+            last_name=fila.get('apellidos', ''),
+            email=fila.get('email', ''),
+            is_staff=nivel in ('1', '2'),
+            is_superuser=nivel == '1',
+        ))
+
+    with transaction.atomic():
+        User.objects.bulk_create(usuarios)
+
+        # MySQL no devuelve los IDs en bulk_create: se recuperan en una consulta
+        ids = dict(User.objects.filter(
+            username__in=[u.username for u in usuarios]
+        ).values_list('username', 'id'))
+
+        PerfilUsuario.objects.bulk_create([
+            PerfilUsuario(
+                user_id=ids[fila['usuario']],
+                nivel_acceso=int(fila['nivel']),
+                numero_empleado=fila.get('num_empleado') or None,
+            )
+            for linea, fila, password_hash in lote
+        ])
+        # bulk_create no emite post_save: se invalida la lista de usuarios aquí
+        invalidar_tablas(User._meta.db_table, PerfilUsuario._meta.db_table)
+
+
+def importar_usuarios(filas, tamano_lote=TAMANO_LOTE_DEFAULT, workers=1):
+    """
+    Da de alta usuarios en bloque a partir de las filas de leer_csv() y
+    retorna un ResultadoImportacion. Los registros se insertan por lotes. Por
+    defecto las contraseñas se hashean en el mismo proceso: sólo el comando
+    importar_usuarios pide un pool (workers=None usa todas las CPUs), nunca
+    una petición web.
+    """
+    resultado = ResultadoImportacion()
+    validas = _validar_filas(filas, resultado)
+    if not validas:
+        return resultado
+
+    hashes = hashear_passwords([fila['contrasena'] for linea, fila in validas], workers=workers)
+    preparadas = [(linea, fila, h) for (linea, fila), h in zip(validas, hashes)]
+
+    for inicio in range(0, len(preparadas), tamano_lote):
+        _insertar_lote(preparadas[inicio:inicio + tamano_lote], resultado)
+
+    return resultado
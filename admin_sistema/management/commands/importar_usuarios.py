@@ -0,0 +1,40 @@
+# admin_sistema/management/commands/importar_usuarios.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_sistema.importacion import (
+    COLUMNAS_CSV, TAMANO_LOTE_DEFAULT, importar_usuarios, leer_csv,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Alta masiva de usuarios desde un CSV con columnas: "
+        + ", ".join(COLUMNAS_CSV)
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo CSV.")
+        parser.add_argument(
+            '--lote', type=int, default=TAMANO_LOTE_DEFAULT,
+            help="Usuarios por cada bulk_create (default: %(default)s).",
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Procesos para hashear contraseñas (default: núm. de CPUs).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            filas = leer_csv(options['archivo'])
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+
+        resultado = importar_usuarios(filas, tamano_lote=options['lote'], workers=options['workers'])
+
+        for linea, usuario, motivo in resultado.errores:
+            self.stderr.write(f"Línea {linea} ({usuario or 'sin usuario'}): {motivo}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.creados} usuarios creados, {len(resultado.errores)} filas con error."
+        ))
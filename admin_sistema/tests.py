@@ -1,3 +1,114 @@
+# admin_sistema/tests.py
+
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
+
+from core.models import PerfilUsuario
+from . import importacion
+from .importacion import ResultadoImportacion, _insertar_lote, importar_usuarios, leer_csv
+
+ENCABEZADO = "usuario,contrasena,nombre,apellidos,email,nivel,num_empleado\n"
+
+
+def _filas(*lineas):
+    return leer_csv(StringIO(ENCABEZADO + "\n".join(lineas) + "\n"))
+
+
+# =======================================================
+# IMPORTACIÓN MASIVA DE USUARIOS (CSV)
+# =======================================================
+
+class ImportacionUsuariosTests(TestCase):
+
+    def test_importa_usuarios_con_su_perfil(self):
+        resultado = importar_usuarios(_filas(
+            "ana,clave-segura-1,Ana,López,ana@example.com,2,E-01",
+            "beto,clave-segura-2,Beto,Ruiz,,,",
+        ))
+        self.assertEqual((resultado.creados, resultado.errores), (2, []))
+
+        ana = User.objects.select_related('perfilusuario').get(username='ana')
+        self.assertTrue(ana.check_password('clave-segura-1'))
+        self.assertTrue(ana.is_staff)
+        self.assertEqual((ana.perfilusuario.nivel_acceso, ana.perfilusuario.numero_empleado), (2, 'E-01'))
+        # Sin nivel en el archivo: Jefe Almacén
+        self.assertEqual(PerfilUsuario.objects.get(user__username='beto').nivel_acceso, 3)
+
+    def test_solo_acepta_los_niveles_de_la_interfaz(self):
+        resultado = importar_usuarios(_filas(
+            "ana,clave-segura-1,,,,4,",
+            "beto,clave-segura-2,,,,0,",
+        ))
+        self.assertEqual(resultado.creados, 0)
+        self.assertEqual([linea for linea, _, _ in resultado.errores], [2, 3])
+        self.assertFalse(User.objects.exists())
+
+    def test_rechaza_duplicados_sin_distinguir_mayusculas(self):
+        User.objects.create_user('Carla', password='clave-segura-0')
+        resultado = importar_usuarios(_filas(
+            "ana,clave-segura-1,,,,3,",
+            "ANA,clave-segura-2,,,,3,",
+            "carla,clave-segura-3,,,,3,",
+        ))
+        self.assertEqual(resultado.creados, 1)
+        self.assertEqual(
+            [(linea, motivo) for linea, _, motivo in resultado.errores],
+            [(3, "Usuario repetido en el archivo."), (4, "El usuario ya existe.")],
+        )
+
+    def test_un_conflicto_en_el_lote_solo_reporta_su_fila(self):
+        # Usuario creado entre la validación y la inserción
+        User.objects.create_user('beto', password='clave-segura-0')
+        lote = [
+            (linea, {'usuario': usuario, 'nivel': '3'}, make_password(None))
+            for linea, usuario in ((2, 'ana'), (3, 'beto'), (4, 'carla'))
+        ]
+        resultado = ResultadoImportacion()
+        _insertar_lote(lote, resultado)
+
+        self.assertEqual(resultado.creados, 2)
+        self.assertEqual([(linea, usuario) for linea, usuario, _ in resultado.errores], [(3, 'beto')])
+        self.assertEqual(
+            set(PerfilUsuario.objects.values_list('user__username', flat=True)), {'beto', 'ana', 'carla'},
+        )
+
+    def test_la_vista_no_levanta_un_pool_de_procesos(self):
+        administrador = User.objects.create_user('admin', password='clave-segura-0')
+        administrador.perfilusuario.nivel_acceso = 1
+        administrador.perfilusuario.save()
+        self.client.force_login(administrador)
+
+        archivo = SimpleUploadedFile('usuarios.csv', (ENCABEZADO + "ana,clave-segura-1,,,,3,\n").encode())
+        with mock.patch.object(importacion, 'hashear_passwords', wraps=importacion.hashear_passwords) as hashear:
+            self.client.post(reverse('admin_sistema:importar_usuarios'), {'archivo_csv': archivo})
+        self.assertEqual(hashear.call_args.kwargs['workers'], 1)
+        self.assertTrue(User.objects.filter(username='ana').exists())
+
+
+# =======================================================
+# ALTA DE USUARIOS DESDE LA GESTIÓN
+# =======================================================
+
+class AltaUsuarioTests(TestCase):
+
+    def setUp(self):
+        administrador = User.objects.create_user('admin', password='clave-segura-0')
+        PerfilUsuario.objects.filter(user=administrador).update(nivel_acceso=1)
+        self.client.force_login(administrador)
 
-# Create your tests here.
+    def test_el_alta_guarda_nivel_y_numero_de_empleado_en_el_perfil(self):
+        self.client.post(reverse('admin_sistema:usuarios'), {
+            'usuario': 'ana', 'nombre': 'Ana', 'apellidos': 'López', 'email': 'ana@example.com',
+            'contrasena': 'clave-segura-1', 'confirmar_contrasena': 'clave-segura-1',
+            'nivel': '2', 'num_empleado': 'E-07',
+        })
+        perfil = PerfilUsuario.objects.select_related('user').get(user__username='ana')
+        self.assertEqual((perfil.nivel_acceso, perfil.numero_empleado), (2, 'E-07'))
+        self.assertTrue(perfil.user.is_staff)
+        self.assertFalse(perfil.user.is_superuser)
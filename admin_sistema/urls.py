@@ -28,6 +28,9 @@ urlpatterns = [
     # Lista de usuarios
     path('usuarios/', views.gestion_usuarios, name='usuarios'),
 
+    # Alta masiva desde CSV
+    path('usuarios/importar/', views.importar_usuarios_csv, name='importar_usuarios'),
+
     # Editar usuario por ID
     path('usuarios/editar/<int:pk>/', views.editar_usuario, name='editar_usuario'),
 
@@ -1,12 +1,17 @@
 # C:\Users\ADMIN\Desktop\proyecto\sma_inventario\admin_sistema\views.py
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from core.models import PerfilUsuario 
-from django.db.models import F
+from core.acceso import nivel_acceso_de, nivel_requerido
+from core.condicional import condicional_por_version
+from core.paginacion import paginar_por_clave
+from .importacion import importar_usuarios, leer_csv
+from django.db.models import F, Q
+from django.utils.http import urlencode
 from django.core.exceptions import ObjectDoesNotExist
 
 # Corrección para evitar error cuando no existe perfil
@@ -18,15 +23,12 @@ RelatedObjectDoesNotExist = ObjectDoesNotExist
 # =======================================================
 
 def is_admin(user):
-    """Retorna True si el usuario tiene nivel 1 (Administrador)."""
-    if not user.is_authenticated:
-        return False
-    try:
-        return user.perfilusuario.nivel_acceso == 1
-    except RelatedObjectDoesNotExist:
-        return False
-    except AttributeError:
-        return False
+    """Retorna True si el usuario tiene nivel 1 (Administrador). Sin consulta adicional."""
+    return nivel_acceso_de(user) == 1
+
+
+# Decorador de vistas de administración: valida el nivel sin consultar la BD
+admin_requerido = nivel_requerido(1, login_url='/dashboard/')
 
 
 # =======================================================
@@ -51,7 +53,8 @@ def login_user(request):
 # =======================================================
 
 @login_required
-@user_passes_test(is_admin, login_url='/dashboard/')
+@admin_requerido
+@condicional_por_version(User._meta.db_table, PerfilUsuario._meta.db_table)
 def gestion_usuarios(request):
     """Lista usuarios y permite crear nuevos."""
     
@@ -73,20 +76,25 @@ def gestion_usuarios(request):
             is_superuser = nivel == '1'
             is_staff = nivel in ('1', '2')
             
-            user = User.objects.create_user(
-                username=username,
-                password=password,
-                first_name=first_name,
-                last_name=last_name,
-                email=email,
-                is_staff=is_staff,
-                is_superuser=is_superuser,
-            )
-
-            # Guardar perfil
-            user.perfilusuario.nivel_acceso = int(nivel)
-            user.perfilusuario.numero_empleado = num_empleado if num_empleado else None
-            user.perfilusuario.save()
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    username=username,
+                    password=password,
+                    first_name=first_name,
+                    last_name=last_name,
+                    email=email,
+                    is_staff=is_staff,
+                    is_superuser=is_superuser,
+                )
+
+                # Guardar perfil (la señal post_save ya creó uno con el nivel por defecto)
+                PerfilUsuario.objects.update_or_create(
+                    user=user,
+                    defaults={
+                        'nivel_acceso': int(nivel),
+                        'numero_empleado': num_empleado if num_empleado else None,
+                    },
+                )
 
             messages.success(request, f'Usuario "{username}" creado exitosamente.')
 
@@ -97,13 +105,73 @@ def gestion_usuarios(request):
         
         return redirect('admin_sistema:usuarios')
     
-    # Listado GET
-    usuarios_listado = User.objects.all().select_related('perfilusuario').order_by('username')
-    return render(request, 'admin_sistema/usuarios.html', {"usuarios": usuarios_listado})
+    # Listado GET: búsqueda en servidor + paginación por clave (username)
+    busqueda = request.GET.get('q', '').strip()
+    nivel_filtro = request.GET.get('nivel', '').strip()
+
+    usuarios_qs = User.objects.select_related('perfilusuario')
+
+    if busqueda:
+        # Búsqueda por prefijo: LIKE 'texto%' puede usar los índices
+        usuarios_qs = usuarios_qs.filter(
+            Q(username__istartswith=busqueda)
+            | Q(first_name__istartswith=busqueda)
+            | Q(last_name__istartswith=busqueda)
+            | Q(perfilusuario__numero_empleado__istartswith=busqueda)
+        )
+    if nivel_filtro.isdigit():
+        usuarios_qs = usuarios_qs.filter(perfilusuario__nivel_acceso=int(nivel_filtro))
+
+    pagina = paginar_por_clave(
+        usuarios_qs,
+        ('username',),
+        cursor=request.GET.get('cursor'),
+        direccion=request.GET.get('dir', 'siguiente'),
+    )
+
+    return render(request, 'admin_sistema/usuarios.html', {
+        "usuarios": pagina,
+        "pagina": pagina,
+        "busqueda": busqueda,
+        "nivel_filtro": nivel_filtro,
+        # Parámetros de búsqueda que se conservan en los enlaces de paginación
+        "params_busqueda": urlencode({'q': busqueda, 'nivel': nivel_filtro}),
+    })
+
+
+@login_required
+@admin_requerido
+def importar_usuarios_csv(request):
+    """Alta masiva de usuarios desde un CSV (mismas columnas que el formulario)."""
+    if request.method != 'POST' or 'archivo_csv' not in request.FILES:
+        messages.error(request, 'Selecciona un archivo CSV para importar.')
+        return redirect('admin_sistema:usuarios')
+
+    try:
+        filas = leer_csv(request.FILES['archivo_csv'])
+        # Sin pool de procesos dentro de la petición (ver importar_usuarios)
+        resultado = importar_usuarios(filas, workers=1)
+    except UnicodeDecodeError:
+        messages.error(request, 'El archivo debe estar codificado en UTF-8.')
+        return redirect('admin_sistema:usuarios')
+    except Exception as e:
+        messages.error(request, f'Error inesperado en la importación: {e}')
+        return redirect('admin_sistema:usuarios')
+
+    if resultado.creados:
+        messages.success(request, f'{resultado.creados} usuarios importados exitosamente.')
+
+    # Se muestran sólo los primeros fallos para no saturar la página
+    for linea, usuario, motivo in resultado.errores[:20]:
+        messages.error(request, f'Línea {linea} ({usuario or "sin usuario"}): {motivo}')
+    if len(resultado.errores) > 20:
+        messages.warning(request, f'... y {len(resultado.errores) - 20} filas más con error.')
+
+    return redirect('admin_sistema:usuarios')
 
 
 @login_required
-@user_passes_test(is_admin, login_url='/dashboard/')
+@admin_requerido
 def editar_usuario(request, pk):
     """Editar usuario existente."""
     
@@ -118,6 +186,7 @@ def editar_usuario(request, pk):
         new_nivel = request.POST.get('nivel')
         new_estado = request.POST.get('estado')
         new_num_empleado = request.POST.get('num_empleado')
+        new_nombre_visualizacion = request.POST.get('nombre_visualizacion', '').strip()
         
         if new_password and new_password != confirm_password:
             messages.error(request, 'Las contraseñas nuevas no coinciden.')
@@ -144,6 +213,7 @@ def editar_usuario(request, pk):
 
             perfil.nivel_acceso = int(new_nivel)
             perfil.numero_empleado = new_num_empleado if new_num_empleado else None
+            perfil.nombre_visualizacion = new_nombre_visualizacion or None
             perfil.save()
 
             messages.success(request, f'Usuario "{usuario.username}" actualizado.')
@@ -168,7 +238,7 @@ def editar_usuario(request, pk):
 
 
 @login_required
-@user_passes_test(is_admin, login_url='/dashboard/')
+@admin_requerido
 def eliminar_usuario(request, pk):
     """Eliminar usuario por ID."""
 
@@ -196,11 +266,11 @@ def eliminar_usuario(request, pk):
 # =======================================================
 
 @login_required
-@user_passes_test(is_admin, login_url='/dashboard/')
+@admin_requerido
 def gestion_proveedores(request):
     return render(request, 'admin_sistema/proveedores.html', {})
 
 @login_required
-@user_passes_test(is_admin, login_url='/dashboard/')
+@admin_requerido
 def generar_reportes(request):
     return render(request, 'admin_sistema/reportes.html', {})
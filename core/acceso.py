@@ -0,0 +1,85 @@
+# core/acceso.py
+
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.views import redirect_to_login
+from django.utils.functional import SimpleLazyObject
+
+from .models import PerfilUsuario
+
+# Nivel de usuarios sin PerfilUsuario (0 no es un nivel válido)
+NIVEL_SIN_PERFIL = 0
+
+
+class BackendConPerfil(ModelBackend):
+    """
+    ModelBackend que trae el PerfilUsuario en la misma consulta con la que
+    AuthenticationMiddleware recupera al usuario de la sesión en cada petición.
+    El nivel es siempre el de la base de datos, en cualquier proceso, sin una
+    consulta adicional ni una caché que invalidar al editar el perfil.
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related('perfilusuario').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+def nivel_acceso_de(user):
+    """
+    Retorna el nivel de acceso del usuario. Con el usuario de la petición
+    (BackendConPerfil) el perfil ya viene cargado; con uno recién autenticado
+    (authenticate en login_view) se consulta una vez.
+    """
+    if not user.is_authenticated:
+        return NIVEL_SIN_PERFIL
+    try:
+        return user.perfilusuario.nivel_acceso
+    except PerfilUsuario.DoesNotExist:
+        return NIVEL_SIN_PERFIL
+
+
+def obtener_nivel_acceso(request):
+    """Nivel del usuario de la petición (usa el atributo del middleware si existe)."""
+    nivel = getattr(request, 'nivel_acceso', None)
+    if nivel is None:
+        nivel = nivel_acceso_de(request.user)
+    return nivel
+
+
+# =======================================================
+# 🔐  MIDDLEWARE Y DECORADOR
+# =======================================================
+
+class NivelAccesoMiddleware:
+    """
+    Expone `request.nivel_acceso` de forma perezosa (como `request.user`).
+    Debe ir después de AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.nivel_acceso = SimpleLazyObject(lambda: nivel_acceso_de(request.user))
+        return self.get_response(request)
+
+
+def nivel_requerido(*niveles, login_url=None):
+    """
+    Restringe una vista a los niveles indicados sin consultar la base de datos.
+    Se comporta como user_passes_test: redirige a `login_url` con ?next=.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.user.is_authenticated and obtener_nivel_acceso(request) in niveles:
+                return view_func(request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path(), login_url)
+        return _wrapped_view
+    return decorator
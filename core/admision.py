@@ -0,0 +1,210 @@
+# core/admision.py
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.shortcuts import redirect
+
+from core.acceso import obtener_nivel_acceso
+from core.estadisticas import percentil
+
+PRIORIDAD_ALTA = 0
+PRIORIDAD_NORMAL = 1
+PRIORIDAD_BAJA = 2
+NOMBRES_PRIORIDAD = {PRIORIDAD_ALTA: 'alta', PRIORIDAD_NORMAL: 'normal', PRIORIDAD_BAJA: 'baja'}
+
+MAXIMO_CONCURRENTE_DEFAULT = 2
+LONGITUD_COLA_DEFAULT = 20
+ESPERA_MAXIMA_DEFAULT = 20
+# Segundos de espera que equivalen a subir una clase de prioridad
+ENVEJECIMIENTO_DEFAULT = 10
+MUESTRAS_ESPERA = 200
+
+
+class AdmisionRechazada(Exception):
+    """La petición no obtuvo turno: cola llena o espera máxima agotada."""
+
+
+class _Turno:
+    __slots__ = ('numero', 'usuario', 'prioridad', 'etiqueta', 'llegada', 'inicio')
+
+    def __init__(self, numero, usuario, prioridad, etiqueta):
+        self.numero = numero
+        self.usuario = usuario
+        self.prioridad = prioridad
+        self.etiqueta = etiqueta
+        self.llegada = time.monotonic()
+        self.inicio = None
+
+
+class ControladorAdmision:
+    """
+    Limita cuántas tareas pesadas (reportes) corren a la vez en este proceso.
+    Las demás esperan en una cola con clases de prioridad:
+
+    - Se atiende primero la menor prioridad efectiva = prioridad - espera /
+      `envejecimiento` (una tarea baja que espera lo suficiente no se posterga
+      indefinidamente); a igualdad, la que llegó antes.
+    - Un usuario no ocupa dos lugares de ejecución a la vez: su siguiente
+      tarea espera a que termine la anterior.
+    - La espera está acotada (`espera_maxima`) y la cola también
+      (`longitud_cola`): el hilo del servidor nunca queda retenido sin límite.
+    """
+
+    def __init__(self, maximo_concurrente=MAXIMO_CONCURRENTE_DEFAULT, longitud_cola=LONGITUD_COLA_DEFAULT,
+                 espera_maxima=ESPERA_MAXIMA_DEFAULT, envejecimiento=ENVEJECIMIENTO_DEFAULT):
+        self.maximo_concurrente = maximo_concurrente
+        self.longitud_cola = longitud_cola
+        self.espera_maxima = espera_maxima
+        self.envejecimiento = envejecimiento
+
+        self._condicion = threading.Condition()
+        self._numeros = itertools.count(1)
+        self._cola = []
+        self._en_ejecucion = []
+        self._admitidos = 0
+        self._rechazados = {'cola_llena': 0, 'espera_agotada': 0}
+        self._esperas_ms = []
+
+    @contextmanager
+    def turno(self, usuario, prioridad=PRIORIDAD_NORMAL, etiqueta=''):
+        """Bloque que corre con un lugar de ejecución; lanza AdmisionRechazada si no lo obtiene."""
+        actual = self._entrar(usuario, prioridad, etiqueta)
+        try:
+            yield actual
+        finally:
+            self._salir(actual)
+
+    def _entrar(self, usuario, prioridad, etiqueta):
+        with self._condicion:
+            if len(self._cola) >= self.longitud_cola:
+                self._rechazados['cola_llena'] += 1
+                raise AdmisionRechazada(
+                    f"Hay {len(self._cola)} reportes en espera. Intente de nuevo en unos minutos."
+                )
+            actual = _Turno(next(self._numeros), usuario, prioridad, etiqueta)
+            self._cola.append(actual)
+            limite = actual.llegada + self.espera_maxima
+
+            while self._siguiente() is not actual:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._cola.remove(actual)
+                    self._rechazados['espera_agotada'] += 1
+                    # Otro turno pudo quedar primero al salir éste de la cola
+                    self._condicion.notify_all()
+                    raise AdmisionRechazada(
+                        f"El servidor sigue ocupado con otros reportes tras {self.espera_maxima}s. "
+                        "Intente de nuevo en unos minutos."
+                    )
+                self._condicion.wait(restante)
+
+            self._cola.remove(actual)
+            actual.inicio = time.monotonic()
+            self._en_ejecucion.append(actual)
+            self._admitidos += 1
+            self._esperas_ms.append((actual.inicio - actual.llegada) * 1000)
+            del self._esperas_ms[:-MUESTRAS_ESPERA]
+            # Si quedan lugares, otro turno que despertó antes que éste (y volvió
+            # a esperar por no ser el siguiente) debe reevaluar ahora
+            if self._cola and len(self._en_ejecucion) < self.maximo_concurrente:
+                self._condicion.notify_all()
+            return actual
+
+    def _salir(self, actual):
+        with self._condicion:
+            self._en_ejecucion.remove(actual)
+            self._condicion.notify_all()
+
+    def _siguiente(self):
+        """Turno en cola que debe entrar ahora, o None si no hay lugar."""
+        if len(self._en_ejecucion) >= self.maximo_concurrente:
+            return None
+        ocupados = {t.usuario for t in self._en_ejecucion}
+        candidatos = [t for t in self._cola if t.usuario not in ocupados]
+        if not candidatos:
+            return None
+        ahora = time.monotonic()
+        return min(candidatos, key=lambda t: (self._prioridad_efectiva(t, ahora), t.numero))
+
+    def _prioridad_efectiva(self, turno, ahora):
+        return turno.prioridad - (ahora - turno.llegada) / self.envejecimiento
+
+    def estado(self, detalle=True):
+        """Resumen para el endpoint de estado (detalle=False omite usuarios)."""
+        with self._condicion:
+            ahora = time.monotonic()
+
+            def _describir(t, desde):
+                datos = {
+                    'prioridad': NOMBRES_PRIORIDAD.get(t.prioridad, t.prioridad),
+                    'etiqueta': t.etiqueta,
+                    'segundos': round(ahora - desde, 1),
+                }
+                if detalle:
+                    datos['usuario'] = str(t.usuario)
+                return datos
+
+            esperas = self._esperas_ms
+            return {
+                'maximo_concurrente': self.maximo_concurrente,
+                'longitud_cola': self.longitud_cola,
+                'espera_maxima_s': self.espera_maxima,
+                'en_ejecucion': [_describir(t, t.inicio) for t in self._en_ejecucion],
+                'en_cola': [_describir(t, t.llegada) for t in sorted(self._cola, key=lambda t: t.numero)],
+                'admitidos': self._admitidos,
+                'rechazados': dict(self._rechazados),
+                'espera_ms': {
+                    'p50': round(percentil(esperas, 50), 1),
+                    'p95': round(percentil(esperas, 95), 1),
+                    'max': round(max(esperas, default=0.0), 1),
+                },
+            }
+
+
+def prioridad_de(request):
+    """Clase de prioridad según el nivel de acceso (REPORTES_ADMISION['PRIORIDAD_POR_NIVEL'])."""
+    por_nivel = _configuracion().get('PRIORIDAD_POR_NIVEL', {1: PRIORIDAD_ALTA, 3: PRIORIDAD_NORMAL})
+    return por_nivel.get(obtener_nivel_acceso(request), PRIORIDAD_BAJA)
+
+
+def _configuracion():
+    return getattr(settings, 'REPORTES_ADMISION', {})
+
+
+def _crear_controlador_reportes():
+    configuracion = _configuracion()
+    return ControladorAdmision(
+        maximo_concurrente=configuracion.get('MAXIMO_CONCURRENTE', MAXIMO_CONCURRENTE_DEFAULT),
+        longitud_cola=configuracion.get('LONGITUD_COLA', LONGITUD_COLA_DEFAULT),
+        espera_maxima=configuracion.get('ESPERA_MAXIMA', ESPERA_MAXIMA_DEFAULT),
+        envejecimiento=configuracion.get('ENVEJECIMIENTO', ENVEJECIMIENTO_DEFAULT),
+    )
+
+
+controlador_reportes = _crear_controlador_reportes()
+
+
+def con_admision(etiqueta, redirigir_a, controlador=None):
+    """
+    Decorador de vista: la ejecuta con un turno de `controlador` (por defecto
+    el de reportes). Si no obtiene turno avisa con un mensaje y redirige.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            try:
+                with (controlador or controlador_reportes).turno(
+                    request.user.get_username(), prioridad_de(request), etiqueta
+                ):
+                    return vista(request, *args, **kwargs)
+            except AdmisionRechazada as e:
+                messages.warning(request, str(e))
+                return redirect(redirigir_a)
+        return envoltura
+    return decorador
@@ -10,4 +10,6 @@ class CoreConfig(AppConfig):
     def ready(self):
         # 📢 Importante: Este método asegura que Django cargue y registre las señales
         # definidas en core.signals al iniciar la aplicación.
-        import core.signals
\ No newline at end of file
+        import core.signals
+        # Registra el chequeo de dependencias vendorizadas (check --deploy)
+        import core.vendor
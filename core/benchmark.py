@@ -0,0 +1,76 @@
+# core/benchmark.py
+
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from core.estadisticas import percentil
+
+
+def resumen_tiempos(tiempos_ms):
+    """Estadísticas de latencia (ms) para imprimir en los benchmarks."""
+    return {
+        'n': len(tiempos_ms),
+        'media': statistics.fmean(tiempos_ms) if tiempos_ms else 0.0,
+        'p50': percentil(tiempos_ms, 50),
+        'p95': percentil(tiempos_ms, 95),
+        'p99': percentil(tiempos_ms, 99),
+        'max': max(tiempos_ms) if tiempos_ms else 0.0,
+    }
+
+
+def formatear_resumen(nombre, resumen, consultas=None):
+    linea = (
+        f"{nombre:<28} n={resumen['n']:<5} media={resumen['media']:8.2f}ms "
+        f"p50={resumen['p50']:8.2f}ms p95={resumen['p95']:8.2f}ms "
+        f"p99={resumen['p99']:8.2f}ms max={resumen['max']:8.2f}ms"
+    )
+    if consultas is not None:
+        linea += f" consultas={consultas}"
+    return linea
+
+
+def cliente_benchmark():
+    """
+    Cliente de pruebas que usa un host permitido por ALLOWED_HOSTS (o
+    'localhost', válido con DEBUG=True) en lugar de 'testserver'.
+    """
+    host = next(
+        (h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')),
+        'localhost',
+    )
+    return Client(SERVER_NAME=host)
+
+
+def medir(funcion):
+    """
+    Ejecuta `funcion()` y retorna (resultado, milisegundos, consultas SQL).
+    """
+    with CaptureQueriesContext(connection) as contexto:
+        inicio = time.perf_counter()
+        resultado = funcion()
+        ms = (time.perf_counter() - inicio) * 1000
+    return resultado, ms, len(contexto.captured_queries)
+
+
+def medir_memoria(funcion):
+    """
+    Ejecuta `funcion()` con tracemalloc y retorna (resultado, pico en bytes).
+    Se mide aparte de la latencia: tracemalloc ralentiza la ejecución.
+    """
+    ya_activo = tracemalloc.is_tracing()
+    if not ya_activo:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        resultado = funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        if not ya_activo:
+            tracemalloc.stop()
+    return resultado, pico
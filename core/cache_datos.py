@@ -0,0 +1,182 @@
+# core/cache_datos.py
+
+import hashlib
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import VersionDatos
+
+CACHE_DATOS_TIMEOUT_DEFAULT = 300
+
+# Tablas invalidadas en la transacción en curso de este hilo (cada hilo usa su
+# propia conexión). Se aplican todas con un solo UPDATE al confirmar.
+_pendientes = threading.local()
+
+
+def _versiones():
+    # Siempre en la primaria: una réplica atrasada daría una versión vieja
+    return VersionDatos.objects.using(DEFAULT_DB_ALIAS)
+
+
+def _version_inicial():
+    # Basada en el reloj: una fila recreada (tabla vaciada) no repite versiones
+    return int(time.time() * 1000)
+
+
+def _crear_faltantes(tablas):
+    _versiones().bulk_create(
+        [VersionDatos(tabla=t, version=_version_inicial(), modificado=timezone.now()) for t in tablas],
+        ignore_conflicts=True,
+    )
+
+
+def _estado(tablas):
+    """{tabla: (version, modificado)} en una consulta; crea las filas que falten."""
+    estado = {
+        tabla: (version, modificado)
+        for tabla, version, modificado in _versiones().filter(tabla__in=tablas)
+        .values_list('tabla', 'version', 'modificado')
+    }
+    faltantes = [t for t in tablas if t not in estado]
+    if faltantes:
+        _crear_faltantes(faltantes)
+        estado.update(
+            (tabla, (version, modificado))
+            for tabla, version, modificado in _versiones().filter(tabla__in=faltantes)
+            .values_list('tabla', 'version', 'modificado')
+        )
+    return estado
+
+
+def versiones_de(*tablas):
+    """Versión actual de cada tabla, en el mismo orden (una sola consulta)."""
+    estado = _estado(tablas)
+    return [estado[t][0] for t in tablas]
+
+
+def estado_de(*tablas):
+    """
+    (version_combinada, timestamp del último cambio) de `tablas` en una sola
+    consulta: el ETag y el Last-Modified de una respuesta salen de la misma
+    lectura. Una tabla sin registro se da de alta con "ahora", lo que nunca
+    produce un falso "no modificado".
+    """
+    estado = _estado(tablas)
+    version = '-'.join(str(estado[t][0]) for t in tablas)
+    return version, max(modificado for _, modificado in estado.values()).timestamp()
+
+
+def cambiadas_recientemente(tablas, segundos):
+    """
+    True si alguna de `tablas` cambió en los últimos `segundos`, o si alguna aún
+    no tiene registro. Se compara con timezone.now() (UTC), el mismo reloj que
+    sella los cambios; NOW() de MySQL devolvería la hora de la zona de la sesión.
+    """
+    tablas = set(tablas)
+    limite = timezone.now() - timedelta(seconds=segundos)
+    conteo = _versiones().filter(tabla__in=tablas).aggregate(
+        conocidas=Count('id'),
+        recientes=Count('id', filter=Q(modificado__gt=limite)),
+    )
+    return conteo['recientes'] > 0 or conteo['conocidas'] < len(tablas)
+
+
+def _incrementar_pendientes():
+    tablas = getattr(_pendientes, 'tablas', None)
+    if not tablas:
+        # Otro callback de la misma confirmación ya las aplicó
+        return
+    _pendientes.tablas = set()
+    # F() + 1 es atómico entre procesos. El sello sale de timezone.now() (UTC,
+    # como el resto de DateTimeField): NOW() de MySQL usa la zona de la sesión
+    actualizadas = _versiones().filter(tabla__in=tablas).update(
+        version=F('version') + 1, modificado=timezone.now(),
+    )
+    if actualizadas < len(tablas):
+        # Sin fila aún (nadie la ha leído): cualquier versión nueva sirve
+        _crear_faltantes(tablas)
+
+
+def invalidar_tablas(*tablas):
+    """
+    Incrementa la versión de `tablas` cuando la transacción actual se confirma
+    (inmediatamente si no hay transacción). Todas las tablas invalidadas en la
+    transacción se aplican juntas. Si la transacción se revierte, quedan
+    pendientes hasta la siguiente confirmación: un incremento de más sólo
+    cuesta un fallo de caché. Las entradas viejas no se borran: dejan de
+    consultarse y expiran solas.
+    """
+    if not hasattr(_pendientes, 'tablas'):
+        _pendientes.tablas = set()
+    _pendientes.tablas.update(tablas)
+    transaction.on_commit(_incrementar_pendientes)
+
+
+def version_combinada(*tablas):
+    """Cadena usable como parte de una clave o en {% cache ... version %}."""
+    return '-'.join(str(v) for v in versiones_de(*tablas))
+
+
+class MetricasCache:
+    """Aciertos y fallos por nombre de entrada, en memoria del proceso (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._aciertos = Counter()
+        self._fallos = Counter()
+
+    def registrar(self, nombre, acierto):
+        with self._lock:
+            (self._aciertos if acierto else self._fallos)[nombre] += 1
+
+    def resumen(self):
+        with self._lock:
+            nombres = set(self._aciertos) | set(self._fallos)
+            resumen = {}
+            for nombre in sorted(nombres):
+                aciertos, fallos = self._aciertos[nombre], self._fallos[nombre]
+                resumen[nombre] = {
+                    'aciertos': aciertos,
+                    'fallos': fallos,
+                    'tasa_aciertos': round(aciertos / (aciertos + fallos), 4),
+                }
+            return resumen
+
+    def reiniciar(self):
+        with self._lock:
+            self._aciertos.clear()
+            self._fallos.clear()
+
+
+metricas_cache = MetricasCache()
+
+_AUSENTE = object()
+
+
+def obtener_o_calcular(nombre, tablas, calcular, partes=(), timeout=None):
+    """
+    Retorna el valor cacheado de `nombre` para la versión actual de `tablas`
+    o lo calcula con `calcular()` y lo guarda. `partes` distingue variantes
+    (filtros, búsqueda...). El valor debe ser serializable con pickle.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'CACHE_DATOS_TIMEOUT', CACHE_DATOS_TIMEOUT_DEFAULT)
+
+    clave = f"datos:{nombre}:{version_combinada(*tablas)}"
+    if partes:
+        # Las variantes pueden traer texto libre (búsquedas): se resumen en un hash
+        clave += ':' + hashlib.md5(repr(tuple(partes)).encode()).hexdigest()
+    valor = cache.get(clave, _AUSENTE)
+    metricas_cache.registrar(nombre, valor is not _AUSENTE)
+    if valor is _AUSENTE:
+        valor = calcular()
+        cache.set(clave, valor, timeout)
+    return valor
@@ -0,0 +1,82 @@
+# core/condicional.py
+
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.contrib import messages
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from core.acceso import obtener_nivel_acceso
+from core.cache_datos import estado_de
+
+
+def _aplica(request):
+    """
+    Sólo se validan GET/HEAD autenticados sin mensajes pendientes: un 304
+    ocultaría el mensaje flash que la página debe mostrar una vez.
+    """
+    return (
+        request.method in ('GET', 'HEAD')
+        and request.user.is_authenticated
+        and len(messages.get_messages(request)) == 0
+    )
+
+
+def condicional_por_version(*tablas, extra=None):
+    """
+    Decorador de GET condicional (ETag / Last-Modified) basado en la versión de
+    datos de `tablas` (core.cache_datos): responde 304 antes de ejecutar la
+    vista, sin consultas ni render. `extra(request)` puede aportar un
+    timestamp adicional (p. ej. mtime de una carpeta).
+
+    El ETag incluye la ruta completa, la sesión, el token CSRF y el nivel de
+    acceso, porque la página renderizada depende de ellos. Versión y fecha se
+    leen juntas de core.VersionDatos (compartida por todos los procesos), una
+    vez por petición.
+    """
+    def _extra(request):
+        return extra(request) if extra else None
+
+    def _estado(request):
+        if not hasattr(request, '_estado_versiones'):
+            request._estado_versiones = estado_de(*tablas)
+        return request._estado_versiones
+
+    def etag(request, *args, **kwargs):
+        if not _aplica(request):
+            return None
+        partes = [
+            request.get_full_path(),
+            request.session.session_key or '',
+            request.COOKIES.get('csrftoken', ''),
+            str(obtener_nivel_acceso(request)),
+            _estado(request)[0],
+            str(_extra(request)),
+            # Las ventanas relativas a "hoy" (KPIs de 30 días) cambian cada día
+            timezone.localdate().isoformat(),
+        ]
+        return hashlib.md5('|'.join(partes).encode()).hexdigest()
+
+    def ultima_mod(request, *args, **kwargs):
+        if not _aplica(request):
+            return None
+        inicio_dia = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        marcas = [_estado(request)[1], inicio_dia, _extra(request) or 0]
+        return datetime.fromtimestamp(max(marcas), tz=dt_timezone.utc)
+
+    def decorador(vista):
+        vista_condicional = condition(etag_func=etag, last_modified_func=ultima_mod)(vista)
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            response = vista_condicional(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                # El navegador conserva la copia pero la revalida en cada recarga
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return envoltura
+
+    return decorador
@@ -0,0 +1,13 @@
+# core/context_processors.py
+
+from .acceso import obtener_nivel_acceso
+
+
+def nivel_acceso(request):
+    """
+    Expone `nivel_acceso` a las plantillas. El PerfilUsuario ya viene con el
+    usuario de la sesión (BackendConPerfil): no agrega consultas.
+    """
+    if not hasattr(request, 'user'):
+        return {}
+    return {'nivel_acceso': obtener_nivel_acceso(request)}
@@ -0,0 +1,90 @@
+# core/db_router.py
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.cache_datos import cambiadas_recientemente
+
+ALIAS_REPLICA = 'replica'
+REPLICA_RETRASO_MAXIMO_DEFAULT = 5
+
+# Activado por las vistas de sólo lectura (reportes, dashboards, exportaciones)
+_leer_de_replica = ContextVar('leer_de_replica', default=False)
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+@contextmanager
+def usar_replica(activar=True):
+    """Las lecturas dentro del bloque van a la réplica (si está configurada)."""
+    token = _leer_de_replica.set(activar)
+    try:
+        yield
+    finally:
+        _leer_de_replica.reset(token)
+
+
+def _cambio_reciente(tablas):
+    """
+    True si alguna de `tablas` cambió hace menos del retraso máximo tolerado de
+    la réplica: esa lectura podría no ver la escritura (ni la del propio
+    usuario tras el redirect, ni la que ya invalidó la caché de datos). Se mide
+    en la primaria con su propio reloj, igual en todos los procesos.
+    """
+    if not tablas:
+        return False
+    retraso = getattr(settings, 'REPLICA_RETRASO_MAXIMO', REPLICA_RETRASO_MAXIMO_DEFAULT)
+    return cambiadas_recientemente(tablas, retraso)
+
+
+def lecturas_en_replica(*tablas):
+    """
+    Decorador para vistas de sólo lectura: sus consultas se envían a la réplica
+    salvo que `tablas` hayan cambiado dentro de REPLICA_RETRASO_MAXIMO segundos.
+    Sin réplica configurada no hace nada.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if not replica_configurada() or _cambio_reciente(tablas):
+                return vista(request, *args, **kwargs)
+            with usar_replica():
+                return vista(request, *args, **kwargs)
+        return envoltura
+    return decorador
+
+
+class RouterReplica:
+    """
+    Escrituras siempre a 'default'. Las lecturas van a 'replica' sólo dentro
+    de usar_replica()/lecturas_en_replica y fuera de transacciones en
+    'default' (select_for_update y lecturas previas a escribir deben ver la primaria).
+    """
+
+    def db_for_read(self, model, **hints):
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db:
+            # Relaciones de un objeto leído: misma base que el objeto
+            return instancia._state.db
+        if not _leer_de_replica.get() or not replica_configurada():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return ALIAS_REPLICA
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplica contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación
+        return db != ALIAS_REPLICA
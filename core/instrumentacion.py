@@ -0,0 +1,245 @@
+# core/instrumentacion.py
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core.estadisticas import percentil
+
+logger = logging.getLogger('sma_inventario.rendimiento')
+
+PRESUPUESTO_CONSULTAS_DEFAULT = 50
+UMBRAL_CONSULTAS_REPETIDAS_DEFAULT = 5
+MUESTRAS_POR_VISTA = 200
+# Huellas N+1 que se conservan por vista (las más frecuentes)
+MAX_HUELLAS_POR_VISTA = 20
+# Segundos entre dos avisos de la misma huella N+1 en la misma vista
+INTERVALO_AVISO_N1_DEFAULT = 300
+
+_PATRON_LISTA_PARAMETROS = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_PATRON_NUMEROS = re.compile(r'\b\d+\b')
+
+
+def huella_sql(sql):
+    """
+    Normaliza una sentencia para agrupar consultas equivalentes: las listas
+    IN (%s, %s, ...) se colapsan y los números literales (LIMIT, OFFSET) se
+    sustituyen, de modo que la misma consulta en un bucle dé la misma huella.
+    """
+    sql = _PATRON_LISTA_PARAMETROS.sub('(...)', sql)
+    return _PATRON_NUMEROS.sub('N', sql)
+
+
+class _RegistroConsultas:
+    """execute_wrapper que cuenta consultas, tiempo de BD y huellas repetidas."""
+
+    def __init__(self):
+        self.total = 0
+        self.tiempo_bd = 0.0
+        self.huellas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo_bd += time.perf_counter() - inicio
+            self.total += 1
+            self.huellas[huella_sql(sql)] += 1
+
+    def repetidas(self, umbral):
+        return {huella: n for huella, n in self.huellas.items() if n >= umbral}
+
+
+class EstadisticasRendimiento:
+    """Muestras recientes por vista, en memoria del proceso (thread-safe)."""
+
+    def __init__(self, muestras_por_vista=MUESTRAS_POR_VISTA):
+        self._lock = threading.Lock()
+        self._muestras = defaultdict(lambda: deque(maxlen=muestras_por_vista))
+        self._huellas = defaultdict(Counter)
+        self._violaciones = Counter()
+
+    def registrar(self, vista, consultas, tiempo_bd_ms, tiempo_total_ms, repetidas, excedio):
+        with self._lock:
+            self._muestras[vista].append((consultas, tiempo_bd_ms, tiempo_total_ms))
+            if repetidas:
+                huellas = self._huellas[vista]
+                huellas.update(repetidas)
+                if len(huellas) > MAX_HUELLAS_POR_VISTA:
+                    self._huellas[vista] = Counter(dict(huellas.most_common(MAX_HUELLAS_POR_VISTA)))
+            if excedio:
+                self._violaciones[vista] += 1
+
+    def resumen(self):
+        with self._lock:
+            datos = {vista: list(muestras) for vista, muestras in self._muestras.items()}
+            huellas = {vista: c.most_common(5) for vista, c in self._huellas.items()}
+            violaciones = dict(self._violaciones)
+
+        resumen = {}
+        for vista, muestras in datos.items():
+            consultas = [m[0] for m in muestras]
+            tiempos_bd = [m[1] for m in muestras]
+            tiempos = [m[2] for m in muestras]
+            resumen[vista] = {
+                'peticiones': len(muestras),
+                'consultas_media': round(sum(consultas) / len(consultas), 2),
+                'consultas_max': max(consultas),
+                'tiempo_bd_ms_p50': round(percentil(tiempos_bd, 50), 2),
+                'tiempo_total_ms_p50': round(percentil(tiempos, 50), 2),
+                'tiempo_total_ms_p95': round(percentil(tiempos, 95), 2),
+                'presupuesto': presupuesto_de(vista),
+                'violaciones_presupuesto': violaciones.get(vista, 0),
+                'consultas_repetidas': [
+                    {'sql': huella, 'veces': veces} for huella, veces in huellas.get(vista, [])
+                ],
+            }
+        return resumen
+
+    def reiniciar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._huellas.clear()
+            self._violaciones.clear()
+
+
+class LimitadorAvisos:
+    """
+    Deja pasar un aviso por clave cada `intervalo` segundos, para que una vista
+    con N+1 no escriba la misma línea de log en cada petición. Las claves
+    vencidas se descartan al crecer la tabla.
+    """
+
+    MAX_CLAVES = 1000
+
+    def __init__(self, reloj=time.monotonic):
+        self._lock = threading.Lock()
+        self._ultimo = {}
+        self._reloj = reloj
+
+    def permitir(self, clave, intervalo):
+        ahora = self._reloj()
+        with self._lock:
+            ultimo = self._ultimo.get(clave)
+            if ultimo is not None and ahora - ultimo < intervalo:
+                return False
+            if len(self._ultimo) >= self.MAX_CLAVES:
+                self._ultimo = {c: t for c, t in self._ultimo.items() if ahora - t < intervalo}
+            self._ultimo[clave] = ahora
+            return True
+
+    def reiniciar(self):
+        with self._lock:
+            self._ultimo.clear()
+
+
+# Instancias compartidas por el middleware y la vista de estadísticas
+estadisticas = EstadisticasRendimiento()
+avisos_n1 = LimitadorAvisos()
+
+
+def presupuesto_de(vista):
+    presupuestos = getattr(settings, 'PRESUPUESTO_CONSULTAS', {})
+    return presupuestos.get(
+        vista,
+        getattr(settings, 'PRESUPUESTO_CONSULTAS_DEFAULT', PRESUPUESTO_CONSULTAS_DEFAULT),
+    )
+
+
+def _instrumentar(registro):
+    stack = ExitStack()
+    for conexion in connections.all():
+        stack.enter_context(conexion.execute_wrapper(registro))
+    return stack
+
+
+def _contar_mientras_transmite(contenido, registro, al_terminar):
+    """
+    Itera el contenido de una StreamingHttpResponse contando las consultas de
+    cada fragmento. El wrapper se instala sólo durante cada next(), no mientras
+    el generador está suspendido; `al_terminar` corre al agotarse o al cerrarse
+    la respuesta (el cliente cortó la descarga).
+    """
+    iterador = iter(contenido)
+    try:
+        while True:
+            with _instrumentar(registro):
+                try:
+                    fragmento = next(iterador)
+                except StopIteration:
+                    return
+            yield fragmento
+    finally:
+        al_terminar()
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide por petición el número de consultas, el tiempo de BD, el tiempo total
+    y las consultas repetidas (sospecha de N+1). Con DEBUG=True lo expone en
+    cabeceras X-*; siempre alimenta `estadisticas` y registra en el log las
+    vistas que exceden su presupuesto de consultas.
+
+    En respuestas en streaming la medición sigue hasta que se cierra el flujo,
+    así que las consultas del iterador también cuentan contra el presupuesto
+    (las cabeceras X-* ya se enviaron y sólo reflejan lo previo al primer byte).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        registro = _RegistroConsultas()
+        inicio = time.perf_counter()
+
+        with _instrumentar(registro):
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+
+        if settings.DEBUG:
+            response['X-Consultas-SQL'] = str(registro.total)
+            response['X-Tiempo-BD-ms'] = f"{registro.tiempo_bd * 1000:.2f}"
+            response['X-Tiempo-Total-ms'] = f"{(time.perf_counter() - inicio) * 1000:.2f}"
+            umbral = getattr(settings, 'UMBRAL_CONSULTAS_REPETIDAS', UMBRAL_CONSULTAS_REPETIDAS_DEFAULT)
+            response['X-Consultas-Repetidas'] = str(len(registro.repetidas(umbral)))
+
+        def al_terminar():
+            self._registrar(request, match.view_name, registro, inicio)
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = _contar_mientras_transmite(
+                response.streaming_content, registro, al_terminar,
+            )
+        else:
+            al_terminar()
+        return response
+
+    def _registrar(self, request, vista, registro, inicio):
+        tiempo_total_ms = (time.perf_counter() - inicio) * 1000
+        tiempo_bd_ms = registro.tiempo_bd * 1000
+        umbral = getattr(settings, 'UMBRAL_CONSULTAS_REPETIDAS', UMBRAL_CONSULTAS_REPETIDAS_DEFAULT)
+        repetidas = registro.repetidas(umbral)
+        presupuesto = presupuesto_de(vista)
+        excedio = presupuesto is not None and registro.total > presupuesto
+
+        estadisticas.registrar(vista, registro.total, tiempo_bd_ms, tiempo_total_ms, repetidas, excedio)
+
+        if excedio:
+            logger.warning(
+                "Vista %s excedió su presupuesto de consultas: %s > %s (%s %s)",
+                vista, registro.total, presupuesto, request.method, request.path,
+            )
+        intervalo = getattr(settings, 'INTERVALO_AVISO_N1', INTERVALO_AVISO_N1_DEFAULT)
+        for huella, veces in repetidas.items():
+            if avisos_n1.permitir((vista, huella), intervalo):
+                logger.warning("Posible N+1 en %s (%s veces): %s", vista, veces, huella)
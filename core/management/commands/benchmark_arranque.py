@@ -0,0 +1,98 @@
+# core/management/commands/benchmark_arranque.py
+
+import json
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Lo que hace un worker de gunicorn antes de atender su primera petición:
+# cargar la aplicación WSGI (settings + apps) y el URLconf (vistas).
+_SCRIPT_WORKER = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+from sma_inventario.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+ms = (time.perf_counter() - inicio) * 1000
+print(json.dumps({
+    'ms': ms,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modulos': len(sys.modules),
+    'vigilados': {m: m in sys.modules for m in %r},
+}))
+"""
+
+# Dependencias pesadas que no deberían cargarse al arrancar
+MODULOS_VIGILADOS = ('openpyxl', 'pymysql', 'whitenoise', 'PIL')
+
+_PATRON_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(.*)$')
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el arranque de un worker (python -X importtime): tiempo hasta "
+        "tener la app WSGI y el URLconf cargados, memoria residente máxima y "
+        "los paquetes que más tiempo de importación consumen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15, help="Paquetes a listar por tiempo propio.")
+        parser.add_argument('--json', dest='salida_json', help="Guarda los resultados en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        corridas = [self._corrida() for _ in range(options['repeticiones'])]
+
+        tiempos = [c['ms'] for c in corridas]
+        rss = [c['rss_kb'] for c in corridas]
+        # El desglose por paquete se toma de la corrida mediana
+        mediana = sorted(corridas, key=lambda c: c['ms'])[len(corridas) // 2]
+
+        self.stdout.write(f"Arranque de worker ({options['repeticiones']} repeticiones, {settings.SETTINGS_MODULE}):")
+        self.stdout.write(
+            f"  tiempo p50={statistics.median(tiempos):.1f}ms min={min(tiempos):.1f}ms max={max(tiempos):.1f}ms"
+        )
+        self.stdout.write(f"  memoria residente máx. p50={statistics.median(rss) / 1024:.1f}MB")
+        self.stdout.write(f"  módulos cargados: {mediana['modulos']}")
+        for modulo, cargado in mediana['vigilados'].items():
+            estilo = self.style.WARNING if cargado else self.style.SUCCESS
+            self.stdout.write(estilo(f"  {modulo}: {'cargado' if cargado else 'no cargado'}"))
+
+        self.stdout.write(f"  Paquetes por tiempo de importación propio (top {options['top']}):")
+        for paquete, us in mediana['paquetes'][:options['top']]:
+            self.stdout.write(f"    {paquete:<30} {us / 1000:8.1f}ms")
+
+        if options['salida_json']:
+            resultado = {
+                'tiempo_ms': tiempos, 'rss_kb': rss,
+                'modulos': mediana['modulos'], 'vigilados': mediana['vigilados'],
+                'paquetes_us': mediana['paquetes'],
+            }
+            with open(options['salida_json'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2)
+            self.stdout.write(f"Resultados guardados en {options['salida_json']}")
+
+    def _corrida(self):
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', _SCRIPT_WORKER % (MODULOS_VIGILADOS,)],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if proceso.returncode != 0:
+            raise CommandError(f"El worker simulado falló:\n{proceso.stderr[-2000:]}")
+
+        resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+
+        # Tiempo propio (sin hijos) agrupado por paquete de primer nivel
+        por_paquete = defaultdict(int)
+        for linea in proceso.stderr.splitlines():
+            coincidencia = _PATRON_IMPORTTIME.match(linea)
+            if coincidencia:
+                propio, _, modulo = coincidencia.groups()
+                por_paquete[modulo.strip().split('.')[0]] += int(propio)
+        resultado['paquetes'] = sorted(por_paquete.items(), key=lambda x: x[1], reverse=True)
+        return resultado
@@ -0,0 +1,105 @@
+# core/management/commands/benchmark_login.py
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.benchmark import cliente_benchmark, formatear_resumen, medir, resumen_tiempos
+from core.models import PerfilUsuario
+
+USUARIO_TEMPORAL = '__benchmark_login__'
+PASSWORD_TEMPORAL = 'Benchmark-Login-2024'
+
+
+class _Rollback(Exception):
+    """Fuerza la reversión de los datos temporales del benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el camino de inicio de sesión: authenticate, POST de login y "
+        "primera carga del dashboard (latencia y número de consultas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=20)
+        parser.add_argument(
+            '--usuario',
+            help="Usuario existente a usar. Si se omite se crea uno temporal "
+                 "dentro de una transacción que se revierte al terminar.",
+        )
+        parser.add_argument('--password', help="Contraseña de --usuario.")
+        parser.add_argument(
+            '--nivel', type=int, default=1,
+            help="Nivel de acceso del usuario temporal (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        if options['usuario'] and not options['password']:
+            raise CommandError("--password es obligatorio junto con --usuario.")
+
+        if options['usuario']:
+            self._ejecutar(options['usuario'], options['password'], options['iteraciones'])
+            return
+
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(USUARIO_TEMPORAL, password=PASSWORD_TEMPORAL)
+                PerfilUsuario.objects.update_or_create(
+                    user=user, defaults={'nivel_acceso': options['nivel']}
+                )
+                self._ejecutar(USUARIO_TEMPORAL, PASSWORD_TEMPORAL, options['iteraciones'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _ejecutar(self, username, password, iteraciones):
+        url_login = reverse('core:login')
+        url_dashboard = settings.LOGIN_REDIRECT_URL
+        tabla_perfil = PerfilUsuario._meta.db_table
+
+        tiempos = {'authenticate': [], 'login (POST)': [], 'primer dashboard': [], 'total': []}
+        consultas = {nombre: 0 for nombre in tiempos}
+        escrituras_perfil = 0
+
+        for _ in range(iteraciones):
+            user, ms_auth, q_auth = medir(
+                lambda: authenticate(username=username, password=password)
+            )
+            if user is None:
+                raise CommandError("Credenciales inválidas para el benchmark.")
+
+            client = cliente_benchmark()
+            with CaptureQueriesContext(connection) as contexto:
+                respuesta, ms_login, q_login = medir(
+                    lambda: client.post(url_login, {'username': username, 'password': password})
+                )
+            if respuesta.status_code != 302:
+                raise CommandError(f"El login respondió {respuesta.status_code}.")
+
+            escrituras_perfil += sum(
+                1 for q in contexto.captured_queries
+                if tabla_perfil in q['sql'] and q['sql'].lstrip().upper().startswith(('UPDATE', 'INSERT'))
+            )
+
+            respuesta, ms_dash, q_dash = medir(lambda: client.get(url_dashboard))
+
+            for nombre, ms, q in (
+                ('authenticate', ms_auth, q_auth),
+                ('login (POST)', ms_login, q_login),
+                ('primer dashboard', ms_dash, q_dash),
+                ('total', ms_auth + ms_login + ms_dash, q_auth + q_login + q_dash),
+            ):
+                tiempos[nombre].append(ms)
+                consultas[nombre] = q  # última iteración (estado estable)
+
+        self.stdout.write(f"Benchmark de login ({iteraciones} iteraciones, usuario '{username}'):")
+        for nombre, valores in tiempos.items():
+            self.stdout.write(formatear_resumen(nombre, resumen_tiempos(valores), consultas[nombre]))
+
+        estilo = self.style.SUCCESS if escrituras_perfil == 0 else self.style.ERROR
+        self.stdout.write(estilo(f"Escrituras en {tabla_perfil} durante el login: {escrituras_perfil}"))
@@ -0,0 +1,74 @@
+# core/management/commands/vendorizar_estaticos.py
+
+import hashlib
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.vendor import dependencias_vendor
+
+
+class Command(BaseCommand):
+    help = (
+        "Descarga las dependencias JS/CSS de VENDOR_ESTATICOS a static/ para "
+        "servirlas desde la app (sin CDN). Sólo guarda archivos cuyo sha256 "
+        "coincide con el fijado; con --fijar descarga las dependencias sin hash "
+        "e imprime el valor a fijar. Con --verificar sólo comprueba los "
+        "archivos existentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true')
+        parser.add_argument('--forzar', action='store_true', help="Vuelve a descargar aunque el archivo exista.")
+        parser.add_argument(
+            '--fijar', action='store_true',
+            help="Acepta dependencias sin sha256 fijado (primera descarga o cambio de versión).",
+        )
+
+    def handle(self, *args, **options):
+        base = Path(settings.STATICFILES_DIRS[0])
+        fallos = 0
+
+        for nombre, dependencia in dependencias_vendor().items():
+            destino = base / dependencia['destino']
+            esperado = dependencia.get('sha256')
+
+            if not options['verificar'] and (options['forzar'] or not destino.exists()):
+                if not esperado and not options['fijar']:
+                    raise CommandError(
+                        f"{nombre} no tiene sha256 fijado en VENDOR_ESTATICOS; "
+                        "use --fijar para descargarlo y obtener el hash."
+                    )
+                self.stdout.write(f"Descargando {nombre} de {dependencia['url']}...")
+                try:
+                    with urllib.request.urlopen(dependencia['url'], timeout=30) as respuesta:
+                        contenido = respuesta.read()
+                except OSError as e:
+                    raise CommandError(f"No se pudo descargar {nombre}: {e}")
+                if esperado and hashlib.sha256(contenido).hexdigest() != esperado:
+                    raise CommandError(f"El sha256 de {nombre} no coincide con el fijado en VENDOR_ESTATICOS.")
+                destino.parent.mkdir(parents=True, exist_ok=True)
+                destino.write_bytes(contenido)
+
+            if not destino.exists():
+                self.stdout.write(self.style.ERROR(f"{nombre}: falta {destino}"))
+                fallos += 1
+                continue
+
+            actual = hashlib.sha256(destino.read_bytes()).hexdigest()
+            if esperado and actual != esperado:
+                self.stdout.write(self.style.ERROR(f"{nombre}: sha256 {actual} no coincide"))
+                fallos += 1
+            elif not esperado:
+                self.stdout.write(self.style.WARNING(
+                    f"{nombre}: sin sha256 fijado; agregue 'sha256': '{actual}' en VENDOR_ESTATICOS"
+                ))
+                if not options['fijar']:
+                    fallos += 1
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{nombre}: OK ({destino.stat().st_size} bytes)"))
+
+        if fallos:
+            raise CommandError(f"{fallos} dependencias con problemas.")
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:06
+
+from django.db import migrations, models
+
+
+# Mapeo que antes estaba fijo en MovimientoInventario.get_responsable_display
+NOMBRES_MAPEADOS = {
+    'lmartinez': 'Lizeth',
+    'hola': 'hola',
+    'lzamora': 'Juan',
+}
+
+
+def migrar_nombres_mapeados(apps, schema_editor):
+    PerfilUsuario = apps.get_model('core', 'PerfilUsuario')
+    for username, nombre in NOMBRES_MAPEADOS.items():
+        PerfilUsuario.objects.filter(user__username=username).update(nombre_visualizacion=nombre)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='nombre_visualizacion',
+            field=models.CharField(blank=True, max_length=150, null=True, verbose_name='Nombre a Mostrar'),
+        ),
+        migrations.RunPython(migrar_nombres_mapeados, migrations.RunPython.noop),
+    ]
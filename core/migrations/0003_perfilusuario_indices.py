@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_perfilusuario_nombre_visualizacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='perfilusuario',
+            index=models.Index(fields=['numero_empleado'], name='perfil_num_empleado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilusuario',
+            index=models.Index(fields=['nivel_acceso'], name='perfil_nivel_acceso_idx'),
+        ),
+    ]
@@ -23,6 +23,35 @@ class PerfilUsuario(models.Model):
         null=True, 
         verbose_name="Número de Empleado"
     )
+    # Nombre que se muestra como responsable en movimientos y reportes.
+    # Se resuelve en SQL (ver MovimientoInventarioQuerySet.con_responsable_display).
+    nombre_visualizacion = models.CharField(
+        max_length=150,
+        blank=True,
+        null=True,
+        verbose_name="Nombre a Mostrar"
+    )
+
+    class Meta:
+        # Soportan la búsqueda y el filtro por nivel del listado de usuarios
+        indexes = [
+            models.Index(fields=['numero_empleado'], name='perfil_num_empleado_idx'),
+            models.Index(fields=['nivel_acceso'], name='perfil_nivel_acceso_idx'),
+        ]
+
+    def __str__(self):
+        return f"Perfil de {self.user.username} - Nivel {self.get_nivel_acceso_display()}"
+
+class VersionDatos(models.Model):
+    """
+    Versión de datos por tabla (core.cache_datos). Vive en la base de datos y
+    no en la caché para que todos los procesos y servidores vean el mismo
+    contador: un cambio confirmado invalida las copias cacheadas de todos.
+    """
+    tabla = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField()
+    # Último cambio confirmado, en UTC (timezone.now(), no NOW() de la sesión)
+    modificado = models.DateTimeField()
 
     def __str__(self):
-        return f"Perfil de {self.user.username} - Nivel {self.get_nivel_acceso_display()}"
\ No newline at end of file
+        return f"{self.tabla} v{self.version}"
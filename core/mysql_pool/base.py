@@ -0,0 +1,86 @@
+# core/mysql_pool/base.py
+"""
+Backend MySQL (PyMySQL vía install_as_MySQLdb) con pool de conexiones por
+proceso. Se activa con ENGINE 'core.mysql_pool' y se configura con la clave
+POOL del alias (TAMANO_MAXIMO, ESPERA_MAXIMA, EDAD_MAXIMA).
+
+Django sigue "cerrando" la conexión al terminar cada request (CONN_MAX_AGE=0);
+aquí ese cierre la devuelve al pool en lugar de cerrar el socket.
+"""
+
+import os
+import threading
+
+from django.db.backends.mysql.base import Database
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+
+from core.pool_conexiones import (
+    EDAD_MAXIMA_DEFAULT, ESPERA_MAXIMA_DEFAULT, TAMANO_MAXIMO_DEFAULT, PoolAgotado, PoolConexiones,
+)
+
+_pools = {}
+_candado_pools = threading.Lock()
+
+
+def metricas_pools():
+    """Métricas de los pools de este proceso, por alias."""
+    with _candado_pools:
+        pools = dict(_pools)
+    pid = os.getpid()
+    return {alias: pool.metricas() for (alias, pid_pool), pool in pools.items() if pid_pool == pid}
+
+
+def _validar(conexion):
+    conexion.ping(reconnect=False)
+
+
+def _cerrar(conexion):
+    conexion.close()
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+
+    def _pool(self, conn_params=None):
+        # Por proceso: tras un fork las conexiones heredadas no deben compartirse
+        clave = (self.alias, os.getpid())
+        with _candado_pools:
+            pool = _pools.get(clave)
+            if pool is None:
+                opciones = self.settings_dict.get('POOL', {})
+                parametros = conn_params or self.get_connection_params()
+                pool = _pools[clave] = PoolConexiones(
+                    crear=lambda: super(DatabaseWrapper, self).get_new_connection(parametros),
+                    validar=_validar,
+                    cerrar=_cerrar,
+                    tamano_maximo=opciones.get('TAMANO_MAXIMO', TAMANO_MAXIMO_DEFAULT),
+                    espera_maxima=opciones.get('ESPERA_MAXIMA', ESPERA_MAXIMA_DEFAULT),
+                    edad_maxima=opciones.get('EDAD_MAXIMA', EDAD_MAXIMA_DEFAULT),
+                )
+            return pool
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self._pool(conn_params).obtener()
+        except PoolAgotado as e:
+            # wrap_database_errors lo convierte en django.db.OperationalError
+            raise Database.OperationalError(str(e)) from e
+
+    def init_connection_state(self):
+        # Las variables de sesión (SQL_AUTO_IS_NULL, aislamiento) persisten en
+        # la conexión: sólo se fijan la primera vez que se entrega
+        if getattr(self.connection, '_estado_inicializado', False):
+            return
+        super().init_connection_state()
+        self.connection._estado_inicializado = True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        reutilizable = True
+        if self.in_atomic_block or not self.autocommit:
+            # Cerrada a mitad de una transacción: no debe llegar así a otro request
+            try:
+                self.connection.rollback()
+            except Database.Error:
+                reutilizable = False
+        self._pool().devolver(self.connection, reutilizable)
@@ -0,0 +1,135 @@
+# core/paginacion.py
+
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldError, ValidationError
+from django.db.models import Q
+
+TAMANO_PAGINA_DEFAULT = 50
+
+
+class PaginaClave:
+    """Resultado de paginar_por_clave(): filas de la página y cursores vecinos."""
+
+    def __init__(self, items, cursor_anterior=None, cursor_siguiente=None):
+        self.items = items
+        self.cursor_anterior = cursor_anterior
+        self.cursor_siguiente = cursor_siguiente
+
+    @property
+    def tiene_anterior(self):
+        return self.cursor_anterior is not None
+
+    @property
+    def tiene_siguiente(self):
+        return self.cursor_siguiente is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def codificar_cursor(valores):
+    # Decimal y datetime viajan como texto; los lookups los convierten de vuelta
+    return base64.urlsafe_b64encode(json.dumps(valores, default=str).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Retorna la lista de valores del cursor, o None si es inválido."""
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        return None
+    return valores if isinstance(valores, list) else None
+
+
+def _nombre(campo):
+    return campo.lstrip('-')
+
+
+def _valores_validos(queryset, campos, valores):
+    """
+    Convierte los valores del cursor con el tipo de cada campo de la clave
+    (columna o anotación). Retorna None si el cursor no corresponde a la clave:
+    otra longitud, nulos o valores que no son del tipo (cursor alterado).
+    """
+    if valores is None or len(valores) != len(campos) or None in valores:
+        return None
+    try:
+        return [
+            queryset.query.resolve_ref(_nombre(campo)).output_field.to_python(valor)
+            for campo, valor in zip(campos, valores)
+        ]
+    except (FieldError, ValidationError, TypeError, ValueError):
+        return None
+
+
+def _invertir(campo):
+    return _nombre(campo) if campo.startswith('-') else f'-{campo}'
+
+
+def _filtro_despues(campos, valores, lookup):
+    """
+    (c1, c2, ...) > (v1, v2, ...) expresado como OR de prefijos iguales. Los
+    campos descendentes ('-campo') usan el lookup opuesto.
+    """
+    opuesto = {'gt': 'lt', 'lt': 'gt'}[lookup]
+    condiciones = []
+    for i, campo in enumerate(campos):
+        iguales = {_nombre(c): v for c, v in zip(campos[:i], valores[:i])}
+        lookup_campo = opuesto if campo.startswith('-') else lookup
+        condiciones.append(Q(**iguales, **{f'{_nombre(campo)}__{lookup_campo}': valores[i]}))
+    return reduce(or_, condiciones)
+
+
+def paginar_por_clave(queryset, campos, cursor=None, direccion='siguiente', tamano=TAMANO_PAGINA_DEFAULT):
+    """
+    Paginación por clave (keyset): en lugar de OFFSET filtra por la última fila
+    vista, así el costo de cada página no crece con el número de registros.
+
+    `campos` es la clave de orden ('-campo' para descendente); el último campo
+    debe ser único (p. ej. ('username',) o ('nombre', 'id')) y conviene que la
+    clave esté indexada. Puede incluir anotaciones no nulas (se filtran con HAVING).
+    """
+    # Un cursor inválido o alterado vuelve a la primera página
+    valores = _valores_validos(queryset, campos, decodificar_cursor(cursor))
+
+    hacia_atras = direccion == 'anterior' and valores is not None
+
+    if hacia_atras:
+        qs = queryset.filter(_filtro_despues(campos, valores, 'lt'))
+        qs = qs.order_by(*[_invertir(c) for c in campos])
+    else:
+        qs = queryset
+        if valores is not None:
+            qs = qs.filter(_filtro_despues(campos, valores, 'gt'))
+        qs = qs.order_by(*campos)
+
+    # Se pide una fila extra para saber si existe otra página en esa dirección
+    filas = list(qs[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    if hacia_atras:
+        filas.reverse()
+
+    def clave(obj):
+        return [getattr(obj, _nombre(c)) for c in campos]
+
+    cursor_anterior = cursor_siguiente = None
+    if filas:
+        if hacia_atras:
+            cursor_anterior = codificar_cursor(clave(filas[0])) if hay_mas else None
+            cursor_siguiente = codificar_cursor(clave(filas[-1]))
+        else:
+            cursor_anterior = codificar_cursor(clave(filas[0])) if valores is not None else None
+            cursor_siguiente = codificar_cursor(clave(filas[-1])) if hay_mas else None
+
+    return PaginaClave(filas, cursor_anterior, cursor_siguiente)
@@ -0,0 +1,181 @@
+# core/pool_conexiones.py
+
+import threading
+import time
+from collections import deque
+
+TAMANO_MAXIMO_DEFAULT = 10
+ESPERA_MAXIMA_DEFAULT = 5.0
+EDAD_MAXIMA_DEFAULT = 600
+
+
+class PoolAgotado(Exception):
+    """Todas las conexiones del pool siguieron en uso durante la espera máxima."""
+
+
+class PoolConexiones:
+    """
+    Pool acotado de conexiones por proceso, independiente del driver: recibe
+    `crear()`, `validar(conexion)` (p. ej. ping) y `cerrar(conexion)`, de modo
+    que puede probarse con conexiones falsas.
+
+    Las conexiones libres se reutilizan en orden LIFO (la más reciente está
+    "caliente"), se validan al entregarse y se descartan al superar
+    `edad_maxima` segundos desde su creación.
+    """
+
+    def __init__(self, crear, validar, cerrar, tamano_maximo=TAMANO_MAXIMO_DEFAULT,
+                 espera_maxima=ESPERA_MAXIMA_DEFAULT, edad_maxima=EDAD_MAXIMA_DEFAULT):
+        self._crear = crear
+        self._validar = validar
+        self._cerrar = cerrar
+        self.tamano_maximo = tamano_maximo
+        self.espera_maxima = espera_maxima
+        self.edad_maxima = edad_maxima
+
+        self._condicion = threading.Condition()
+        self._libres = deque()  # (conexion, creada)
+        self._creadas_en = {}   # id(conexion) -> creada, de todas las abiertas
+        self._en_uso = 0
+        self._reservadas = 0    # creaciones en curso (cuentan para el tamaño)
+
+        self._creadas = 0
+        self._cerradas = 0
+        self._descartadas = 0
+        self._entregas = 0
+        self._agotados = 0
+        self._espera_total = 0.0
+        self._espera_maxima_vista = 0.0
+
+    # --- Entrega y devolución ------------------------------------------------
+
+    def obtener(self):
+        """Entrega una conexión válida; espera hasta `espera_maxima` si el pool está lleno."""
+        inicio = time.perf_counter()
+        limite = inicio + self.espera_maxima
+        while True:
+            conexion, creada = self._tomar_o_reservar(limite)
+            if conexion is None:
+                conexion = self._crear_reservada()
+                break
+            if time.monotonic() - creada <= self.edad_maxima and self._es_valida(conexion):
+                break
+            # Vieja o caída: se cierra fuera del candado y se intenta con otra
+            self._descartar(conexion, en_uso=True)
+
+        espera = time.perf_counter() - inicio
+        with self._condicion:
+            self._entregas += 1
+            self._espera_total += espera
+            self._espera_maxima_vista = max(self._espera_maxima_vista, espera)
+        return conexion
+
+    def devolver(self, conexion, reutilizable=True):
+        """Regresa la conexión al pool (o la cierra si no es reutilizable)."""
+        if not reutilizable:
+            self._descartar(conexion, en_uso=True)
+            return
+        with self._condicion:
+            creada = self._creadas_en.get(id(conexion))
+            if creada is None:
+                # No es de este pool (p. ej. tras cerrar_todo)
+                self._en_uso = max(0, self._en_uso - 1)
+                cerrar = True
+            else:
+                self._en_uso -= 1
+                self._libres.append((conexion, creada))
+                self._condicion.notify()
+                cerrar = False
+        if cerrar:
+            self._cerrar_silencioso(conexion)
+
+    def cerrar_todo(self):
+        """Cierra las conexiones libres; las que están en uso se cierran al devolverse."""
+        with self._condicion:
+            libres = list(self._libres)
+            self._libres.clear()
+            self._creadas_en.clear()
+        for conexion, _ in libres:
+            self._cerrar_silencioso(conexion)
+
+    # --- Métricas ------------------------------------------------------------
+
+    def metricas(self):
+        with self._condicion:
+            return {
+                'tamano_maximo': self.tamano_maximo,
+                'en_uso': self._en_uso,
+                'libres': len(self._libres),
+                'creadas': self._creadas,
+                'cerradas': self._cerradas,
+                'descartadas': self._descartadas,
+                'entregas': self._entregas,
+                'agotado': self._agotados,
+                'espera_total_ms': round(self._espera_total * 1000, 2),
+                'espera_promedio_ms': round(self._espera_total * 1000 / self._entregas, 3) if self._entregas else 0.0,
+                'espera_maxima_ms': round(self._espera_maxima_vista * 1000, 2),
+            }
+
+    # --- Internos ------------------------------------------------------------
+
+    def _tomar_o_reservar(self, limite):
+        """
+        Retorna (conexion_libre, creada) marcada en uso, o (None, None) con un
+        lugar reservado para crear una nueva. Lanza PoolAgotado al vencer `limite`.
+        """
+        with self._condicion:
+            while True:
+                if self._libres:
+                    conexion, creada = self._libres.pop()
+                    self._en_uso += 1
+                    return conexion, creada
+                if self._en_uso + self._reservadas < self.tamano_maximo:
+                    self._reservadas += 1
+                    return None, None
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    self._agotados += 1
+                    raise PoolAgotado(
+                        f"Sin conexiones libres tras {self.espera_maxima}s "
+                        f"({self.tamano_maximo} en uso)."
+                    )
+                self._condicion.wait(restante)
+
+    def _crear_reservada(self):
+        # La conexión se abre fuera del candado: puede tardar (red, autenticación)
+        try:
+            conexion = self._crear()
+        except Exception:
+            with self._condicion:
+                self._reservadas -= 1
+                self._condicion.notify()
+            raise
+        with self._condicion:
+            self._reservadas -= 1
+            self._en_uso += 1
+            self._creadas += 1
+            self._creadas_en[id(conexion)] = time.monotonic()
+        return conexion
+
+    def _es_valida(self, conexion):
+        try:
+            return self._validar(conexion) is not False
+        except Exception:
+            return False
+
+    def _descartar(self, conexion, en_uso):
+        with self._condicion:
+            if self._creadas_en.pop(id(conexion), None) is not None:
+                self._descartadas += 1
+            if en_uso:
+                self._en_uso = max(0, self._en_uso - 1)
+            self._condicion.notify()
+        self._cerrar_silencioso(conexion)
+
+    def _cerrar_silencioso(self, conexion):
+        try:
+            self._cerrar(conexion)
+        except Exception:
+            pass
+        with self._condicion:
+            self._cerradas += 1
@@ -1,34 +1,36 @@
 # C:\Users\ADMIN\Desktop\proyecto\sma_orler\core\signals.py
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
 from django.dispatch import receiver
 from .models import PerfilUsuario 
-from django.core.exceptions import ObjectDoesNotExist
-
-# COMENTA ESTA LÍNEA TEMPORALMENTE PARA LA PRUEBA DE DIAGNÓSTICO.
-# Esto evita que el código interno se ejecute en cada login.
-# @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
-    """Crea un PerfilUsuario cuando un User es creado. 
-       Intenta guardar el perfil existente si el User es actualizado."""
-    
-    # 1. Crear el perfil para un usuario nuevo
-    if created:
-        try:
-            PerfilUsuario.objects.create(user=instance)
-        except Exception as e:
-            # En un entorno de producción, usa logging, no print
-            print(f"Error crítico al crear PerfilUsuario para {instance.username}: {e}")
-            return # Evita intentar guardar si la creación falló
-
-    # 2. Guardar el perfil existente para un usuario actualizado
-    # ESTO SE EJECUTA EN CADA LOGIN (y es la fuente de la lentitud si el .save() es pesado)
-    try:
-        instance.perfilusuario.save()
-    except ObjectDoesNotExist:
-        # Si el perfil no existe, intenta crearlo (como fallback)
-        pass 
-    except Exception as e:
-        print(f"Error al guardar PerfilUsuario para {instance.username}: {e}")
+from .cache_datos import invalidar_tablas
 
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    """Crea el PerfilUsuario (nivel por defecto) sólo cuando se crea el User.
+
+    Las actualizaciones del User (p. ej. `last_login` en cada inicio de sesión)
+    no escriben en el perfil. Las altas masivas con bulk_create no disparan esta
+    señal y crean sus perfiles por su cuenta (admin_sistema.importacion).
+    """
+    if not created or raw:
+        return
+
+    PerfilUsuario.objects.get_or_create(user=instance)
+
+
+# ============================================================
+# VERSIÓN DE DATOS (GET CONDICIONAL DE LA LISTA DE USUARIOS)
+# ============================================================
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=PerfilUsuario)
+@receiver(post_delete, sender=PerfilUsuario)
+def invalidar_version_usuarios(sender, raw=False, update_fields=None, **kwargs):
+    """Cambios de usuarios o perfiles; `last_login` en cada login no cuenta."""
+    if raw or (update_fields and set(update_fields) == {'last_login'}):
+        return
+    invalidar_tablas(sender._meta.db_table)
@@ -0,0 +1,47 @@
+# core/templatetags/cache_datos.py
+
+from django import template
+
+from core.cache_datos import obtener_o_calcular
+
+register = template.Library()
+
+
+class CacheDatosNode(template.Node):
+    def __init__(self, nodelist, nombre, tablas, variantes):
+        self.nodelist = nodelist
+        self.nombre = nombre
+        self.tablas = tablas
+        self.variantes = variantes
+
+    def render(self, context):
+        tablas = self.tablas.resolve(context)
+        if isinstance(tablas, str):
+            tablas = [t.strip() for t in tablas.split(',') if t.strip()]
+        partes = [v.resolve(context) for v in self.variantes]
+        return obtener_o_calcular(
+            self.nombre.resolve(context), tablas,
+            lambda: self.nodelist.render(context), partes=partes,
+        )
+
+
+@register.tag('cache_datos')
+def cache_datos(parser, token):
+    """
+    Cachea un fragmento hasta que cambie la versión de las tablas indicadas:
+
+        {% cache_datos "nombre" tablas [variante ...] %} ... {% endcache_datos %}
+
+    `tablas` es una lista o una cadena separada por comas de db_table.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' requiere un nombre y las tablas.")
+    nodelist = parser.parse(('endcache_datos',))
+    parser.delete_first_token()
+    return CacheDatosNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(b) for b in bits[3:]],
+    )
@@ -0,0 +1,13 @@
+# core/templatetags/vendor.py
+
+from django import template
+
+from core.vendor import url_vendor
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_url(nombre):
+    """{% vendor_url 'chart.js' %} -> archivo estático local (CDN si aún no se descargó)."""
+    return url_vendor(nombre)
@@ -1,3 +1,624 @@
-from django.test import TestCase
+# core/tests.py
 
-# Create your tests here.
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipIf, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, router, transaction
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .admision import PRIORIDAD_ALTA, PRIORIDAD_BAJA, ControladorAdmision
+from .cache_datos import (
+    cambiadas_recientemente, invalidar_tablas, metricas_cache, obtener_o_calcular, versiones_de,
+)
+from .db_router import ALIAS_REPLICA, lecturas_en_replica, replica_configurada, usar_replica
+from .instrumentacion import InstrumentacionMiddleware, LimitadorAvisos, avisos_n1, estadisticas
+from .models import PerfilUsuario, VersionDatos
+from .paginacion import codificar_cursor, decodificar_cursor, paginar_por_clave
+from .pool_conexiones import PoolAgotado, PoolConexiones
+from .vendor import url_vendor, verificar_vendor
+
+# Las vistas renderizan {% static %}: sin collectstatic no hay manifiesto
+SIN_MANIFIESTO = override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+def _crear_usuario(username='admin', nivel=1, password='clave-de-prueba'):
+    # El PerfilUsuario se crea por señal con el nivel por defecto
+    usuario = User.objects.create_user(username=username, password=password)
+    PerfilUsuario.objects.filter(user=usuario).update(nivel_acceso=nivel)
+    return usuario
+
+
+def _consultas_a(tabla, consultas):
+    return [c['sql'] for c in consultas.captured_queries if tabla in c['sql']]
+
+
+# =======================================================
+# PAGINACIÓN POR CLAVE (KEYSET)
+# =======================================================
+
+class PaginacionClaveTests(TestCase):
+
+    CLAVE = ('-is_staff', '-date_joined', 'username')
+
+    def setUp(self):
+        # Empates en los dos primeros campos de la clave: sólo username desempata
+        fecha = timezone.now().replace(microsecond=123456)
+        for numero in range(11):
+            User.objects.create_user(f'usuario{numero:02d}', is_staff=numero % 3 == 0)
+        User.objects.filter(username__lt='usuario06').update(date_joined=fecha)
+        User.objects.filter(username__gte='usuario06').update(date_joined=fecha - timedelta(days=1))
+        self.esperado = list(User.objects.order_by(*self.CLAVE).values_list('username', flat=True))
+
+    def _recorrer(self, tamano):
+        vistos, cursor, paginas = [], None, []
+        while True:
+            pagina = paginar_por_clave(User.objects.all(), self.CLAVE, cursor=cursor, tamano=tamano)
+            vistos.extend(u.username for u in pagina)
+            paginas.append(pagina)
+            if not pagina.tiene_siguiente:
+                return vistos, paginas
+            cursor = pagina.cursor_siguiente
+
+    def test_recorre_con_empates_sin_huecos_ni_repetidos(self):
+        for tamano in (1, 3, 4, 11):
+            vistos, _ = self._recorrer(tamano)
+            self.assertEqual(vistos, self.esperado, tamano)
+
+    def test_la_pagina_anterior_regresa_las_mismas_filas(self):
+        _, paginas = self._recorrer(3)
+        for anterior, actual in zip(paginas, paginas[1:]):
+            atras = paginar_por_clave(
+                User.objects.all(), self.CLAVE, cursor=actual.cursor_anterior, direccion='anterior', tamano=3,
+            )
+            self.assertEqual([u.username for u in atras], [u.username for u in anterior])
+        self.assertFalse(paginas[0].tiene_anterior)
+
+    def test_el_cursor_conserva_decimal_y_fecha(self):
+        fecha = timezone.now()
+        valores = decodificar_cursor(codificar_cursor([Decimal('12.50'), fecha, 7]))
+        self.assertEqual(valores, ['12.50', str(fecha), 7])
+
+    def test_cursor_alterado_vuelve_a_la_primera_pagina(self):
+        primera = [u.username for u in paginar_por_clave(User.objects.all(), self.CLAVE, tamano=3)]
+        for cursor in (
+            'no-es-base64%%', codificar_cursor({'a': 1}), codificar_cursor([True]),
+            codificar_cursor(['sí', 'no-es-fecha', 'usuario03']), codificar_cursor([None, None, None]),
+        ):
+            pagina = paginar_por_clave(User.objects.all(), self.CLAVE, cursor=cursor, tamano=3)
+            self.assertEqual([u.username for u in pagina], primera, cursor)
+
+
+# =======================================================
+# NIVEL DE ACCESO
+# =======================================================
+
+class NivelAccesoTests(TestCase):
+
+    def setUp(self):
+        self.usuario = _crear_usuario()
+        self.client.force_login(self.usuario)
+
+    def test_vista_restringida_por_nivel(self):
+        self.assertEqual(self.client.get(reverse('core:rendimiento')).status_code, 200)
+
+        otro = _crear_usuario('jefe', nivel=3)
+        self.client.force_login(otro)
+        self.assertEqual(self.client.get(reverse('core:rendimiento')).status_code, 302)
+
+    def test_degradar_el_perfil_aplica_en_la_siguiente_peticion(self):
+        self.assertEqual(self.client.get(reverse('core:rendimiento')).status_code, 200)
+        # update() no emite señales: ningún otro proceso se entera más que por la BD
+        PerfilUsuario.objects.filter(user=self.usuario).update(nivel_acceso=3)
+        self.assertEqual(self.client.get(reverse('core:rendimiento')).status_code, 302)
+
+    def test_el_perfil_llega_con_el_usuario_de_la_sesion(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('core:dashboard'))
+        perfil = _consultas_a(PerfilUsuario._meta.db_table, consultas)
+        self.assertEqual(len(perfil), 1)
+        self.assertIn(User._meta.db_table, perfil[0])
+
+    def test_el_inicio_de_sesion_lee_el_perfil_una_vez(self):
+        self.client.logout()
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(reverse('core:login'), {'username': 'admin', 'password': 'clave-de-prueba'})
+            respuesta = self.client.get(reverse('core:dashboard'))
+        self.assertRedirects(respuesta, reverse('admin_sistema:usuarios'), fetch_redirect_response=False)
+        perfil = _consultas_a(PerfilUsuario._meta.db_table, consultas)
+        self.assertEqual(len(perfil), 1)
+        self.assertIn(User._meta.db_table, perfil[0])
+
+
+# =======================================================
+# PERFIL DE USUARIO (SÓLO AL CREAR EL USUARIO)
+# =======================================================
+
+def _escrituras_en(tabla, consultas):
+    return [
+        sql for sql in _consultas_a(tabla, consultas)
+        if sql.lstrip().upper().startswith(('INSERT', 'UPDATE'))
+    ]
+
+
+@SIN_MANIFIESTO
+class PerfilUsuarioTests(TestCase):
+
+    def test_guardar_el_usuario_no_escribe_el_perfil(self):
+        usuario = _crear_usuario('jefe', nivel=3)
+        with CaptureQueriesContext(connection) as consultas:
+            usuario.first_name = 'Jefe'
+            usuario.save()
+        self.assertEqual(_escrituras_en(PerfilUsuario._meta.db_table, consultas), [])
+        self.assertEqual(PerfilUsuario.objects.get(user=usuario).nivel_acceso, 3)
+
+    def test_el_login_no_escribe_el_perfil(self):
+        _crear_usuario()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(
+                reverse('core:login'), {'username': 'admin', 'password': 'clave-de-prueba'},
+            )
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(_escrituras_en(PerfilUsuario._meta.db_table, consultas), [])
+
+    def test_benchmark_de_login_no_deja_datos(self):
+        salida = StringIO()
+        call_command('benchmark_login', iteraciones=1, stdout=salida)
+        self.assertIn(f"Escrituras en {PerfilUsuario._meta.db_table} durante el login: 0", salida.getvalue())
+        # El usuario temporal se crea dentro de una transacción revertida
+        self.assertFalse(User.objects.exists())
+
+
+# =======================================================
+# CACHÉ DE DATOS VERSIONADA
+# =======================================================
+
+class CacheDatosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        metricas_cache.reiniciar()
+        self.calculos = 0
+
+    def _calcular(self):
+        self.calculos += 1
+        return self.calculos
+
+    def test_reutiliza_el_valor_mientras_no_cambie_la_version(self):
+        self.assertEqual(obtener_o_calcular('prueba', ['tabla_a'], self._calcular), 1)
+        self.assertEqual(obtener_o_calcular('prueba', ['tabla_a'], self._calcular), 1)
+        self.assertEqual(metricas_cache.resumen()['prueba'], {'aciertos': 1, 'fallos': 1, 'tasa_aciertos': 0.5})
+
+    def test_invalidar_al_confirmar_recalcula(self):
+        obtener_o_calcular('prueba', ['tabla_a'], self._calcular)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                invalidar_tablas('tabla_a')
+        self.assertEqual(obtener_o_calcular('prueba', ['tabla_a'], self._calcular), 2)
+
+    def test_la_version_de_otro_proceso_invalida_la_copia_local(self):
+        obtener_o_calcular('prueba', ['tabla_a'], self._calcular)
+        # Otro proceso confirma un cambio: sólo queda constancia en la base de datos
+        VersionDatos.objects.filter(tabla='tabla_a').update(version=F('version') + 1)
+        self.assertEqual(obtener_o_calcular('prueba', ['tabla_a'], self._calcular), 2)
+
+    def test_una_transaccion_incrementa_cada_tabla_una_vez(self):
+        antes = versiones_de('tabla_a', 'tabla_b')
+        with CaptureQueriesContext(connection) as consultas:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for _ in range(20):
+                        invalidar_tablas('tabla_a', 'tabla_b')
+        escrituras = [c for c in consultas.captured_queries if c['sql'].startswith('UPDATE')]
+        self.assertEqual(len(escrituras), 1)
+        self.assertEqual(versiones_de('tabla_a', 'tabla_b'), [v + 1 for v in antes])
+
+    def test_el_cambio_se_sella_en_utc_con_el_reloj_de_django(self):
+        versiones_de('tabla_a')
+        ahora = timezone.now().replace(microsecond=0) + timedelta(hours=6)
+        with mock.patch('django.utils.timezone.now', return_value=ahora):
+            with self.captureOnCommitCallbacks(execute=True):
+                invalidar_tablas('tabla_a')
+        self.assertEqual(VersionDatos.objects.get(tabla='tabla_a').modificado, ahora)
+
+
+# =======================================================
+# GET CONDICIONAL Y FRESCURA PARA LA RÉPLICA
+# =======================================================
+
+@SIN_MANIFIESTO
+class CondicionalTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(_crear_usuario())
+        self.url = reverse('admin_sistema:usuarios')
+        # La primera visita fija la cookie CSRF, que forma parte del ETag
+        self.client.get(self.url)
+
+    def test_responde_304_mientras_no_cambien_los_datos(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        repetida = self.client.get(self.url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+    def test_un_cambio_confirmado_en_otro_proceso_invalida_el_etag(self):
+        respuesta = self.client.get(self.url)
+        VersionDatos.objects.filter(tabla=User._meta.db_table).update(version=F('version') + 1)
+        repetida = self.client.get(self.url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(repetida.status_code, 200)
+
+    def test_etag_y_last_modified_salen_de_una_lectura(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(self.url)
+        self.assertIn('Last-Modified', respuesta)
+        self.assertEqual(len(_consultas_a(VersionDatos._meta.db_table, consultas)), 1)
+
+    def test_last_modified_es_la_hora_utc_del_cambio(self):
+        ahora = timezone.now().replace(microsecond=0) - timedelta(minutes=10)
+        with mock.patch('django.utils.timezone.now', return_value=ahora):
+            with self.captureOnCommitCallbacks(execute=True):
+                invalidar_tablas(User._meta.db_table, PerfilUsuario._meta.db_table)
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta['Last-Modified'], http_date(ahora.timestamp()))
+
+    def test_cambio_reciente_se_mide_en_utc(self):
+        versiones_de('tabla_a')
+        self.assertTrue(cambiadas_recientemente(['tabla_a'], 60))
+
+        VersionDatos.objects.filter(tabla='tabla_a').update(modificado=timezone.now() - timedelta(minutes=5))
+        self.assertFalse(cambiadas_recientemente(['tabla_a'], 60))
+        # Una tabla sin registro se trata como recién cambiada
+        self.assertTrue(cambiadas_recientemente(['tabla_a', 'tabla_nueva'], 60))
+
+
+# =======================================================
+# DEPENDENCIAS VENDORIZADAS
+# =======================================================
+
+VENDOR_PRUEBA = {
+    'libreria': {
+        'url': 'https://cdn.example.com/libreria.js',
+        'destino': 'vendor/libreria/1.0/libreria.js',
+        'sha256': None,
+    },
+}
+
+
+@override_settings(VENDOR_ESTATICOS=VENDOR_PRUEBA)
+class VendorTests(TestCase):
+
+    def test_sin_archivo_local_se_usa_el_cdn(self):
+        # Con o sin DEBUG, y con el manifest de producción: nunca un 500
+        for debug in (True, False):
+            with self.settings(DEBUG=debug):
+                self.assertEqual(url_vendor('libreria'), 'https://cdn.example.com/libreria.js')
+
+    def test_archivo_local_sin_collectstatic_usa_el_cdn(self):
+        with mock.patch('core.vendor._vendorizado', return_value=True):
+            self.assertEqual(url_vendor('libreria'), 'https://cdn.example.com/libreria.js')
+            with SIN_MANIFIESTO:
+                self.assertEqual(url_vendor('libreria'), '/static/vendor/libreria/1.0/libreria.js')
+
+    def test_check_deploy_exige_hash_y_archivo(self):
+        self.assertEqual([e.id for e in verificar_vendor()], ['core.E001'])
+        fijado = {'libreria': {**VENDOR_PRUEBA['libreria'], 'sha256': 'a' * 64}}
+        with self.settings(VENDOR_ESTATICOS=fijado):
+            self.assertEqual([e.id for e in verificar_vendor()], ['core.W002'])
+
+
+# =======================================================
+# ENRUTADO A LA RÉPLICA DE LECTURA
+# =======================================================
+
+@lecturas_en_replica(User._meta.db_table)
+def _usuarios_en_lectura(request):
+    return set(User.objects.values_list('username', flat=True))
+
+
+@skipUnless(connection.vendor == 'sqlite', "La réplica de prueba es una copia del archivo SQLite")
+@skipIf(replica_configurada(), "Ya hay una réplica configurada (SMA_DB_REPLICA_*)")
+class RouterReplicaTests(TransactionTestCase):
+    """
+    Réplica en un segundo archivo SQLite, como con SMA_DB_REPLICA_NAME: una
+    copia de la primaria tomada al iniciar la clase. Lo que se escribe
+    después sólo existe en 'default', así cada lectura delata de dónde salió.
+    La réplica se agrega después de preparar la clase: el runner sólo conoce
+    las bases de settings.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._carpeta = tempfile.TemporaryDirectory()
+        archivo = str(Path(cls._carpeta.name) / 'replica.sqlite3')
+        connection.ensure_connection()
+        with sqlite3.connect(archivo) as destino:
+            connection.connection.backup(destino)
+
+        # Igual que settings con SMA_DB_REPLICA_NAME: 'default' con otro NAME
+        config = {**connection.settings_dict, 'NAME': archivo}
+        connections.settings[ALIAS_REPLICA] = config
+        cls._config = override_settings(
+            DATABASES={**settings.DATABASES, ALIAS_REPLICA: config},
+            REPLICA_RETRASO_MAXIMO=5,
+        )
+        cls._config.enable()
+        cls.databases = cls.databases | {ALIAS_REPLICA}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._config.disable()
+        connections[ALIAS_REPLICA].close()
+        del connections[ALIAS_REPLICA]
+        del connections.settings[ALIAS_REPLICA]
+        cls._carpeta.cleanup()
+        super().tearDownClass()
+
+    def _sin_cambios_recientes(self):
+        VersionDatos.objects.filter(tabla=User._meta.db_table).update(modificado=timezone.now() - timedelta(minutes=5))
+
+    def test_lecturas_decoradas_van_a_la_replica(self):
+        User.objects.create_user(username='solo_en_primaria')
+        self._sin_cambios_recientes()
+        with CaptureQueriesContext(connections[ALIAS_REPLICA]) as consultas:
+            usuarios = _usuarios_en_lectura(None)
+        self.assertNotIn('solo_en_primaria', usuarios)
+        self.assertTrue(consultas.captured_queries)
+
+    def test_un_cambio_reciente_se_lee_de_la_primaria(self):
+        User.objects.create_user(username='recien_creado')
+        with CaptureQueriesContext(connections[ALIAS_REPLICA]) as consultas:
+            usuarios = _usuarios_en_lectura(None)
+        self.assertIn('recien_creado', usuarios)
+        self.assertFalse(consultas.captured_queries)
+
+    def test_escrituras_y_bloqueos_quedan_en_la_primaria(self):
+        with CaptureQueriesContext(connections[ALIAS_REPLICA]) as consultas:
+            with usar_replica():
+                usuario = User.objects.create_user(username='escrito_en_replica')
+                with transaction.atomic():
+                    bloqueado = User.objects.select_for_update().get(pk=usuario.pk)
+                    self.assertEqual(User.objects.filter(pk=usuario.pk).count(), 1)
+        self.assertEqual(bloqueado._state.db, DEFAULT_DB_ALIAS)
+        self.assertFalse(consultas.captured_queries)
+
+    def test_sin_replica_todo_va_a_la_primaria(self):
+        User.objects.create_user(username='sin_replica')
+        self._sin_cambios_recientes()
+        with self.settings(DATABASES={DEFAULT_DB_ALIAS: settings.DATABASES[DEFAULT_DB_ALIAS]}):
+            with usar_replica():
+                self.assertEqual(router.db_for_read(User), DEFAULT_DB_ALIAS)
+            self.assertIn('sin_replica', _usuarios_en_lectura(None))
+
+
+# =======================================================
+# POOL DE CONEXIONES (CONEXIONES FALSAS)
+# =======================================================
+
+class _ConexionFalsa:
+
+    def __init__(self, numero):
+        self.numero = numero
+        self.viva = True
+        self.cerrada = False
+
+
+class PoolConexionesTests(SimpleTestCase):
+
+    def _pool(self, **opciones):
+        self.conexiones = []
+
+        def crear():
+            conexion = _ConexionFalsa(len(self.conexiones) + 1)
+            self.conexiones.append(conexion)
+            return conexion
+
+        def cerrar(conexion):
+            conexion.cerrada = True
+
+        return PoolConexiones(crear, lambda c: c.viva, cerrar, **opciones)
+
+    def test_no_entrega_mas_conexiones_que_su_tamano(self):
+        pool = self._pool(tamano_maximo=3, espera_maxima=5)
+        candado = threading.Lock()
+        en_uso = {'actual': 0, 'maximo': 0}
+
+        def trabajar():
+            conexion = pool.obtener()
+            with candado:
+                en_uso['actual'] += 1
+                en_uso['maximo'] = max(en_uso['maximo'], en_uso['actual'])
+            time.sleep(0.02)
+            with candado:
+                en_uso['actual'] -= 1
+            pool.devolver(conexion)
+
+        hilos = [threading.Thread(target=trabajar) for _ in range(12)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        metricas = pool.metricas()
+        self.assertLessEqual(en_uso['maximo'], 3)
+        self.assertLessEqual(metricas['creadas'], 3)
+        self.assertEqual(metricas['entregas'], 12)
+        self.assertEqual(metricas['en_uso'], 0)
+
+    def test_reutiliza_la_conexion_devuelta(self):
+        pool = self._pool()
+        primera = pool.obtener()
+        pool.devolver(primera)
+        self.assertIs(pool.obtener(), primera)
+        self.assertEqual(pool.metricas()['creadas'], 1)
+
+    def test_reemplaza_una_conexion_caida(self):
+        pool = self._pool()
+        caida = pool.obtener()
+        pool.devolver(caida)
+        caida.viva = False
+
+        nueva = pool.obtener()
+        self.assertIsNot(nueva, caida)
+        self.assertTrue(caida.cerrada)
+        self.assertEqual(pool.metricas()['descartadas'], 1)
+        self.assertEqual(pool.metricas()['en_uso'], 1)
+
+    def test_agotado_tras_la_espera_maxima(self):
+        pool = self._pool(tamano_maximo=1, espera_maxima=0.05)
+        ocupada = pool.obtener()
+        with self.assertRaises(PoolAgotado):
+            pool.obtener()
+        self.assertEqual(pool.metricas()['agotado'], 1)
+
+        pool.devolver(ocupada)
+        self.assertIs(pool.obtener(), ocupada)
+
+    def test_descarta_conexiones_mas_viejas_que_la_edad_maxima(self):
+        pool = self._pool(edad_maxima=0.05)
+        vieja = pool.obtener()
+        pool.devolver(vieja)
+        time.sleep(0.1)
+
+        self.assertIsNot(pool.obtener(), vieja)
+        self.assertTrue(vieja.cerrada)
+        self.assertEqual(pool.metricas()['creadas'], 2)
+
+
+# =======================================================
+# CONTROL DE ADMISIÓN (COLA DE REPORTES)
+# =======================================================
+
+class ControladorAdmisionTests(SimpleTestCase):
+
+    def _esperar(self, condicion):
+        limite = time.monotonic() + 2
+        while not condicion() and time.monotonic() < limite:
+            time.sleep(0.005)
+
+    def test_dos_lugares_liberados_a_la_vez_admiten_a_dos_en_cola(self):
+        controlador = ControladorAdmision(maximo_concurrente=2, espera_maxima=5, envejecimiento=1000)
+        primero = controlador._entrar('a', PRIORIDAD_BAJA, '')
+        segundo = controlador._entrar('b', PRIORIDAD_BAJA, '')
+        admitidos = []
+
+        def esperar_turno(usuario, prioridad):
+            admitidos.append(controlador._entrar(usuario, prioridad, '').usuario)
+
+        # Al liberarse los lugares, el de prioridad baja puede despertar primero,
+        # ver que el siguiente es el de alta y volver a esperar
+        hilos = [threading.Thread(target=esperar_turno, args=('c', PRIORIDAD_ALTA))]
+        hilos[0].start()
+        self._esperar(lambda: len(controlador._cola) == 1)
+        hilos.append(threading.Thread(target=esperar_turno, args=('d', PRIORIDAD_BAJA)))
+        hilos[1].start()
+        self._esperar(lambda: len(controlador._cola) == 2)
+
+        # Ambos lugares se liberan antes de que despierte cualquiera de los dos
+        with controlador._condicion:
+            controlador._salir(primero)
+            controlador._salir(segundo)
+        inicio = time.monotonic()
+        for hilo in hilos:
+            hilo.join(timeout=10)
+
+        # Sin un aviso tras cada admisión, el que volvió a esperar sólo entraría
+        # al vencer su espera
+        self.assertLess(time.monotonic() - inicio, 1)
+        self.assertCountEqual(admitidos, ['c', 'd'])
+
+
+# =======================================================
+# INSTRUMENTACIÓN (PRESUPUESTO DE CONSULTAS / N+1)
+# =======================================================
+
+def _consultar(veces):
+    for _ in range(veces):
+        User.objects.filter(pk=0).exists()
+
+
+@override_settings(PRESUPUESTO_CONSULTAS={'prueba:vista': 3}, UMBRAL_CONSULTAS_REPETIDAS=5)
+class InstrumentacionTests(TestCase):
+
+    def setUp(self):
+        estadisticas.reiniciar()
+        avisos_n1.reiniciar()
+        self.addCleanup(estadisticas.reiniciar)
+        self.addCleanup(avisos_n1.reiniciar)
+
+    def _peticion(self, vista):
+        request = RequestFactory().get('/prueba/')
+        request.resolver_match = mock.Mock(view_name='prueba:vista')
+        return InstrumentacionMiddleware(lambda r: vista())(request)
+
+    def test_cuenta_las_consultas_del_streaming_hasta_cerrar_el_flujo(self):
+        def filas():
+            for i in range(4):
+                _consultar(1)
+                yield f"{i}\n"
+
+        response = self._peticion(lambda: StreamingHttpResponse(filas()))
+        # La vista aún no ha consultado nada: se registra al terminar el flujo
+        self.assertNotIn('prueba:vista', estadisticas.resumen())
+
+        with self.assertLogs('sma_inventario.rendimiento', 'WARNING') as registro:
+            self.assertEqual(b''.join(response.streaming_content), b'0\n1\n2\n3\n')
+        resumen = estadisticas.resumen()['prueba:vista']
+        self.assertEqual((resumen['consultas_max'], resumen['violaciones_presupuesto']), (4, 1))
+        self.assertIn('excedió su presupuesto', registro.output[0])
+
+    def test_cerrar_el_flujo_a_medias_registra_lo_consultado(self):
+        def filas():
+            while True:
+                _consultar(1)
+                yield "x\n"
+
+        response = self._peticion(lambda: StreamingHttpResponse(filas()))
+        contenido = iter(response.streaming_content)
+        next(contenido)
+        next(contenido)
+        # Fuera de cada fragmento el wrapper no queda instalado en la conexión
+        self.assertEqual(connection.execute_wrappers, [])
+        response.close()
+        self.assertEqual(estadisticas.resumen()['prueba:vista']['consultas_max'], 2)
+
+    def test_el_aviso_de_n_mas_1_no_se_repite_en_cada_peticion(self):
+        def vista():
+            _consultar(6)
+            return HttpResponse()
+
+        with self.assertLogs('sma_inventario.rendimiento', 'WARNING') as registro:
+            self._peticion(vista)
+            self._peticion(vista)
+        avisos = [linea for linea in registro.output if 'Posible N+1' in linea]
+        self.assertEqual(len(avisos), 1)
+        # Las estadísticas sí acumulan ambas peticiones
+        self.assertEqual(estadisticas.resumen()['prueba:vista']['consultas_repetidas'][0]['veces'], 12)
+
+    def test_limitador_vuelve_a_avisar_al_vencer_el_intervalo(self):
+        ahora = [100.0]
+        limitador = LimitadorAvisos(reloj=lambda: ahora[0])
+        self.assertTrue(limitador.permitir(('v', 'sql'), 60))
+        self.assertFalse(limitador.permitir(('v', 'sql'), 60))
+        self.assertTrue(limitador.permitir(('v', 'otra'), 60))
+        ahora[0] += 60
+        self.assertTrue(limitador.permitir(('v', 'sql'), 60))
@@ -38,4 +38,9 @@ urlpatterns = [
 
     # Dashboard general del sistema
     path('dashboard/', views.home_dashboard, name='dashboard'),
+
+    # Estadísticas de rendimiento por vista (solo Administrador)
+    path('rendimiento/', views.estadisticas_rendimiento, name='rendimiento'),
+    path('rendimiento/cache/', views.estadisticas_cache, name='rendimiento_cache'),
+    path('rendimiento/conexiones/', views.estadisticas_conexiones, name='rendimiento_conexiones'),
 ]
\ No newline at end of file
@@ -0,0 +1,69 @@
+# core/vendor.py
+
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core import checks
+from django.templatetags.static import static
+
+
+def dependencias_vendor():
+    return getattr(settings, 'VENDOR_ESTATICOS', {})
+
+
+@lru_cache(maxsize=None)
+def _vendorizado(destino):
+    return finders.find(destino) is not None
+
+
+def url_vendor(nombre):
+    """
+    URL de una dependencia de VENDOR_ESTATICOS: el archivo local (con hash de
+    manifest en producción). Mientras no se haya ejecutado
+    `vendorizar_estaticos` (o collectstatic después) se usa la URL del CDN en
+    lugar de un 500; `check --deploy` lo advierte.
+    """
+    dependencia = dependencias_vendor()[nombre]
+    if not _vendorizado(dependencia['destino']):
+        return dependencia['url']
+    try:
+        return static(dependencia['destino'])
+    except ValueError:
+        # Descargado pero sin collectstatic: el manifest no lo conoce
+        return dependencia['url']
+
+
+@checks.register(checks.Tags.staticfiles, deploy=True)
+def verificar_vendor(app_configs=None, **kwargs):
+    """
+    `manage.py check --deploy`: cada dependencia debe tener su sha256 fijado y
+    el archivo local descargado con ese mismo contenido. Un archivo faltante
+    es una advertencia: las páginas siguen cargando la dependencia del CDN.
+    """
+    errores = []
+    for nombre, dependencia in dependencias_vendor().items():
+        esperado = dependencia.get('sha256')
+        if not esperado:
+            errores.append(checks.Error(
+                f"{nombre}: sin sha256 fijado en VENDOR_ESTATICOS.",
+                hint="Ejecute `python manage.py vendorizar_estaticos --fijar` y copie el hash en settings.",
+                id='core.E001',
+            ))
+            continue
+        ruta = finders.find(dependencia['destino'])
+        if ruta is None:
+            errores.append(checks.Warning(
+                f"{nombre}: falta static/{dependencia['destino']}; se sirve desde el CDN.",
+                hint="Ejecute `python manage.py vendorizar_estaticos` antes de collectstatic.",
+                id='core.W002',
+            ))
+            continue
+        with open(ruta, 'rb') as archivo:
+            if hashlib.sha256(archivo.read()).hexdigest() != esperado:
+                errores.append(checks.Error(
+                    f"{nombre}: el contenido de {ruta} no coincide con su sha256.",
+                    id='core.E003',
+                ))
+    return errores
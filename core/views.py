@@ -5,7 +5,12 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.urls import reverse
+from django.http import JsonResponse
+from django.conf import settings
 from core.models import PerfilUsuario # Asegúrate de que este modelo exista
+from core.acceso import NIVEL_SIN_PERFIL, nivel_acceso_de, obtener_nivel_acceso, nivel_requerido
+from core.instrumentacion import avisos_n1, estadisticas
+from core.cache_datos import metricas_cache
 
 # ============================================================
 # 1. VISTAS PÚBLICAS
@@ -52,10 +57,9 @@ def login_view(request):
             # Asegúrate de volver a pasar el parámetro 'role' si es necesario
             return render(request, "core/login.html", {'role': rol})
 
-        # Verificar si tiene perfil
-        try:
-            nivel = user.perfilusuario.nivel_acceso
-        except PerfilUsuario.DoesNotExist:
+        # Verificar si tiene perfil (única lectura del perfil en el inicio de sesión)
+        nivel = nivel_acceso_de(user)
+        if nivel == NIVEL_SIN_PERFIL:
             messages.error(request, "El usuario no tiene un perfil de acceso.")
             return render(request, "core/login.html", {'role': rol})
 
@@ -110,15 +114,15 @@ def home_dashboard(request):
     Dashboard genérico. Redirige al dashboard específico según el nivel.
     Ruta: /dashboard/
     """
-    try:
-        nivel = request.user.perfilusuario.nivel_acceso
-        if nivel == 1:
-            return redirect("admin_sistema:usuarios")
-        elif nivel == 2:
-            return redirect("inventario:dashboard_responsable")
-        elif nivel == 3:
-            return redirect("inventario:dashboard_jefe")
-    except (PerfilUsuario.DoesNotExist, AttributeError):
+    # Nivel de NivelAccesoMiddleware: el perfil llega con el usuario, sin otra consulta
+    nivel = obtener_nivel_acceso(request)
+    if nivel == 1:
+        return redirect("admin_sistema:usuarios")
+    elif nivel == 2:
+        return redirect("inventario:dashboard_responsable")
+    elif nivel == 3:
+        return redirect("inventario:dashboard_jefe")
+    elif nivel == NIVEL_SIN_PERFIL:
         # Si no hay perfil, lo enviamos al login o a una página de error/aviso
         messages.error(request, "Tu cuenta no tiene un nivel de acceso asignado.")
         return redirect('core:login')
@@ -127,6 +131,52 @@ def home_dashboard(request):
     return redirect("inventario:dashboard")
 
 
+@login_required
+@nivel_requerido(1, login_url='/dashboard/')
+def estadisticas_rendimiento(request):
+    """
+    Estadísticas recientes por vista (consultas, tiempos, N+1) recogidas por
+    InstrumentacionMiddleware en este proceso. POST con 'reiniciar' las borra.
+    Ruta: /rendimiento/
+    """
+    if request.method == 'POST' and 'reiniciar' in request.POST:
+        estadisticas.reiniciar()
+        avisos_n1.reiniciar()
+
+    return JsonResponse(estadisticas.resumen(), json_dumps_params={'indent': 2})
+
+
+@login_required
+@nivel_requerido(1, login_url='/dashboard/')
+def estadisticas_cache(request):
+    """
+    Aciertos, fallos y tasa de aciertos por entrada de core.cache_datos en este
+    proceso. POST con 'reiniciar' las borra.
+    Ruta: /rendimiento/cache/
+    """
+    if request.method == 'POST' and 'reiniciar' in request.POST:
+        metricas_cache.reiniciar()
+
+    return JsonResponse(metricas_cache.resumen(), json_dumps_params={'indent': 2})
+
+
+@login_required
+@nivel_requerido(1, login_url='/dashboard/')
+def estadisticas_conexiones(request):
+    """
+    Métricas del pool de conexiones MySQL (core.mysql_pool) de este proceso:
+    en uso, libres, creadas, descartadas y tiempos de espera por alias.
+    Ruta: /rendimiento/conexiones/
+    """
+    usa_pool = any(bd['ENGINE'] == 'core.mysql_pool' for bd in settings.DATABASES.values())
+    if not usa_pool:
+        return JsonResponse({})
+
+    # Importación diferida: el backend MySQL sólo se carga si está en uso
+    from core.mysql_pool.base import metricas_pools
+    return JsonResponse(metricas_pools(), json_dumps_params={'indent': 2})
+
+
 def custom_logout_view(request):
     """
     Cierra la sesión y redirige a la página principal (core:index).
@@ -1,3 +1,46 @@
+# inventario/admin.py
+
+from django import forms
 from django.contrib import admin
 
-# Register your models here.
+from .codigos import CodigoInvalido, normalizar_codigo
+from .models import ElementoInventario
+
+
+class ElementoInventarioForm(forms.ModelForm):
+    """Normaliza el código igual que al escanear (inventario.codigos)."""
+
+    class Meta:
+        model = ElementoInventario
+        fields = '__all__'
+
+    def clean_codigo(self):
+        try:
+            return normalizar_codigo(self.cleaned_data.get('codigo'))
+        except CodigoInvalido as e:
+            raise forms.ValidationError(str(e))
+
+
+@admin.register(ElementoInventario)
+class ElementoInventarioAdmin(admin.ModelAdmin):
+    """
+    Alta y corrección de códigos en elementos existentes. El stock sólo cambia
+    por movimientos, así que aquí es de sólo lectura; para cargas masivas está
+    el comando asignar_codigos.
+    """
+    form = ElementoInventarioForm
+    list_display = ('id', 'codigo', 'descripcion', 'clase', 'unidad', 'stock_actual')
+    list_editable = ('codigo',)
+    list_select_related = ('clase',)
+    # '=codigo' es igualdad exacta: usa el índice único
+    search_fields = ('=codigo', 'descripcion')
+    raw_id_fields = ('clase', 'ubicacion_principal')
+    readonly_fields = ('stock_actual', 'modificado')
+    ordering = ('id',)
+    # Sin COUNT(*) del catálogo completo en cada página
+    show_full_result_count = False
+
+    def get_changelist_form(self, request, **kwargs):
+        # La edición desde el listado también normaliza el código
+        kwargs.setdefault('form', ElementoInventarioForm)
+        return super().get_changelist_form(request, **kwargs)
@@ -0,0 +1,154 @@
+# inventario/alertas.py
+"""
+Alertas de stock por umbral (stock_minimo / stock_maximo). Se evalúan de
+forma incremental en las confirmaciones que cambian stock, sólo para los
+elementos tocados; la tabla AlertaStock contiene únicamente las alertas
+abiertas, así que consultarlas nunca recorre el catálogo.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from core.cache_datos import invalidar_tablas
+from .models import AlertaStock, ElementoInventario
+
+TAMANO_LOTE_DEFAULT = 1000
+
+
+class UmbralInvalido(ValueError):
+    """Umbrales no numéricos, negativos o con mínimo mayor que máximo."""
+
+
+def leer_umbrales(minimo_texto, maximo_texto):
+    """Convierte los umbrales capturados (vacío = sin umbral) y los valida."""
+    def _convertir(texto, nombre):
+        texto = (texto or '').strip().replace(',', '.')
+        if not texto:
+            return None
+        try:
+            valor = Decimal(texto)
+        except InvalidOperation:
+            raise UmbralInvalido(f"El stock {nombre} debe ser un número válido.")
+        if valor < 0:
+            raise UmbralInvalido(f"El stock {nombre} no puede ser negativo.")
+        return valor.quantize(Decimal('0.01'))
+
+    minimo = _convertir(minimo_texto, 'mínimo')
+    maximo = _convertir(maximo_texto, 'máximo')
+    if minimo is not None and maximo is not None and minimo > maximo:
+        raise UmbralInvalido("El stock mínimo no puede ser mayor que el máximo.")
+    return minimo, maximo
+
+
+def estado_de(stock, minimo, maximo):
+    """(tipo, umbral) de la alerta que corresponde al stock, o None si está en rango."""
+    if minimo is not None and stock <= minimo:
+        return 'BAJO', minimo
+    if maximo is not None and stock > maximo:
+        return 'EXCESO', maximo
+    return None
+
+
+def evaluar(elementos):
+    """
+    Abre, actualiza o cierra las alertas de `elementos` (instancias con el
+    stock ya actualizado). Debe llamarse en la transacción que cambió el stock,
+    con los elementos bloqueados: así una alerta no queda desfasada de su stock.
+    Una consulta de lectura más una escritura por tipo de cambio.
+    """
+    por_id = {elemento.id: elemento for elemento in elementos}
+    if not por_id:
+        return
+    abiertas = {a.elemento_id: a for a in AlertaStock.objects.filter(elemento_id__in=por_id)}
+
+    ahora = timezone.now()
+    nuevas, cambiadas, cerrar = [], [], []
+    for elemento_id, elemento in por_id.items():
+        estado = estado_de(elemento.stock_actual, elemento.stock_minimo, elemento.stock_maximo)
+        alerta = abiertas.get(elemento_id)
+        if estado is None:
+            if alerta is not None:
+                cerrar.append(alerta.id)
+            continue
+        tipo, umbral = estado
+        if alerta is None:
+            nuevas.append(AlertaStock(
+                elemento_id=elemento_id, tipo=tipo, stock=elemento.stock_actual,
+                umbral=umbral, abierta_en=ahora,
+            ))
+        elif (alerta.tipo, alerta.stock, alerta.umbral) != (tipo, elemento.stock_actual, umbral):
+            if alerta.tipo != tipo:
+                # Pasó de bajo mínimo a sobre máximo (o al revés): es otra alerta
+                alerta.abierta_en = ahora
+            alerta.tipo, alerta.stock, alerta.umbral = tipo, elemento.stock_actual, umbral
+            alerta.actualizada_en = ahora
+            cambiadas.append(alerta)
+
+    if cerrar:
+        AlertaStock.objects.filter(id__in=cerrar).delete()
+    if nuevas:
+        AlertaStock.objects.bulk_create(nuevas)
+    if cambiadas:
+        AlertaStock.objects.bulk_update(cambiadas, ['tipo', 'stock', 'umbral', 'abierta_en', 'actualizada_en'])
+    if cerrar or nuevas or cambiadas:
+        # bulk_create/update no emiten señales: se invalida la caché de datos a mano
+        invalidar_tablas(AlertaStock._meta.db_table)
+
+
+def definir_umbrales(elemento_id, minimo, maximo):
+    """Asigna los umbrales del elemento y re-evalúa su alerta con el elemento bloqueado."""
+    with transaction.atomic():
+        elemento = ElementoInventario.objects.select_for_update().get(pk=elemento_id)
+        elemento.stock_minimo = minimo
+        elemento.stock_maximo = maximo
+        elemento.save(update_fields=['stock_minimo', 'stock_maximo', 'modificado'])
+        evaluar([elemento])
+    return elemento
+
+
+def recalcular_alertas(tamano_lote=TAMANO_LOTE_DEFAULT):
+    """
+    Reconstrucción completa (tras cargas masivas o bulk_create): cierra las
+    alertas de elementos sin umbrales y evalúa por lotes los que sí tienen.
+    Retorna el número de alertas abiertas al terminar.
+    """
+    sin_umbral = Q(elemento__stock_minimo__isnull=True, elemento__stock_maximo__isnull=True)
+    with transaction.atomic():
+        AlertaStock.objects.filter(sin_umbral).delete()
+
+    con_umbral = (
+        ElementoInventario.objects.filter(Q(stock_minimo__isnull=False) | Q(stock_maximo__isnull=False))
+        .only('id', 'stock_actual', 'stock_minimo', 'stock_maximo')
+        .order_by('id')
+    )
+    ultimo = 0
+    while True:
+        with transaction.atomic():
+            lote = list(con_umbral.select_for_update().filter(id__gt=ultimo)[:tamano_lote])
+            if not lote:
+                break
+            evaluar(lote)
+        ultimo = lote[-1].id
+
+    invalidar_tablas(AlertaStock._meta.db_table)
+    return AlertaStock.objects.count()
+
+
+def resumen_alertas(limite=5):
+    """Conteo por tipo y las `limite` alertas más recientes (widget del dashboard)."""
+    conteos = dict(
+        AlertaStock.objects.values_list('tipo').annotate(total=Count('id')).order_by()
+    )
+    recientes = (
+        AlertaStock.objects.select_related('elemento')
+        .order_by('-abierta_en', '-id')[:limite]
+    )
+    return {
+        'bajo': conteos.get('BAJO', 0),
+        'exceso': conteos.get('EXCESO', 0),
+        'total': sum(conteos.values()),
+        'recientes': list(recientes),
+    }
@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class InventarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'inventario'
\ No newline at end of file
+    name = 'inventario'
+
+    def ready(self):
+        # Registra la invalidación de caché por versión de tabla
+        import inventario.signals
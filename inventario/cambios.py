@@ -0,0 +1,310 @@
+# inventario/cambios.py
+"""
+Feed incremental de cambios para sistemas externos (ERP): en lugar de volver
+a descargar todo el historial, el cliente pide los cambios posteriores a un
+cursor opaco y guarda el cursor que recibe al final de cada página.
+
+El orden es el de confirmación, no el de los ids ni el de las marcas de
+tiempo: una transacción larga (un conteo aplicado, una confirmación que
+esperó un bloqueo) puede tener ids o marcas menores que otra ya visible. Cada
+transacción escribe las filas de RegistroCambio de sus movimientos y elementos
+sin secuencia (pendientes), junto con el cambio. Al confirmarse, una
+transacción corta bloquea el contador y les asigna la siguiente secuencia; la
+siguiente no existe hasta que la anterior está confirmada, así que el cursor
+(secuencia, id) nunca pasa por encima de un cambio pendiente. Si el proceso
+termina antes de asignarla, las filas siguen pendientes y el comando
+registrar_cambios_pendientes las numera.
+
+- Movimientos: libro de sólo inserción; cada uno aparece una vez.
+- Elementos: cada cambio mueve su fila del registro al final; el cliente
+  recibe el estado vigente del elemento.
+
+Las escrituras con señales se registran solas (inventario.signals); las de
+bulk_create/bulk_update deben llamar a registrar_cambios().
+"""
+
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+
+from core.paginacion import codificar_cursor, decodificar_cursor
+from .models import ElementoInventario, MovimientoInventario, RegistroCambio, SecuenciaCambios
+
+LIMITE_DEFAULT = 500
+LIMITE_MAXIMO_DEFAULT = 5000
+# Ids por consulta al registrar y al cargar las filas de una página
+TAMANO_LOTE = 1000
+
+logger = logging.getLogger('sma_inventario.cambios')
+
+MOVIMIENTO = 'MOVIMIENTO'
+ELEMENTO = 'ELEMENTO'
+
+# Ids escritos en la transacción en curso de este hilo, por tipo. Se registran
+# juntos al confirmar (un solo turno del contador por transacción).
+_pendientes = threading.local()
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no corresponde a este feed."""
+
+
+def _configuracion():
+    return getattr(settings, 'CAMBIOS_FEED', {})
+
+
+def limite_de(valor):
+    """Tamaño de página solicitado, acotado a [1, LIMITE_MAXIMO]."""
+    maximo = _configuracion().get('LIMITE_MAXIMO', LIMITE_MAXIMO_DEFAULT)
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        limite = LIMITE_DEFAULT
+    return max(1, min(limite, maximo))
+
+
+def _decimal(valor):
+    return f"{valor:.2f}" if valor is not None else None
+
+
+def _fecha(valor):
+    return valor.isoformat() if valor is not None else None
+
+
+def _en_lotes(valores):
+    valores = list(valores)
+    for inicio in range(0, len(valores), TAMANO_LOTE):
+        yield valores[inicio:inicio + TAMANO_LOTE]
+
+
+# --- Registro de cambios --------------------------------------------------------
+
+def registrar_cambios(tipo, ids):
+    """
+    Anota `ids` (de MOVIMIENTO o ELEMENTO) para el feed dentro de la
+    transacción actual: sus filas de RegistroCambio quedan pendientes
+    (secuencia nula) y se confirman o revierten junto con el cambio. Al
+    confirmarse reciben su secuencia (inmediatamente si no hay transacción).
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    _marcar_pendientes(tipo, ids)
+    if not hasattr(_pendientes, 'ids'):
+        _pendientes.ids = {}
+    _pendientes.ids.setdefault(tipo, set()).update(ids)
+    transaction.on_commit(_registrar_pendientes)
+
+
+def _marcar_pendientes(tipo, ids):
+    """
+    Deja las filas de `ids` sin secuencia (creándolas si faltan). Los elementos
+    ya están bloqueados por quien los escribe y los movimientos son nuevos:
+    no agrega esperas a la transacción de negocio.
+    """
+    for lote in _en_lotes(ids):
+        registros = RegistroCambio.objects.filter(tipo=tipo, objeto_id__in=lote)
+        if registros.update(secuencia=None) == len(lote):
+            continue
+        existentes = set(registros.values_list('objeto_id', flat=True))
+        RegistroCambio.objects.bulk_create([
+            RegistroCambio(tipo=tipo, objeto_id=objeto_id, secuencia=None)
+            for objeto_id in lote if objeto_id not in existentes
+        ])
+
+
+def _registrar_pendientes():
+    pendientes = getattr(_pendientes, 'ids', None)
+    if not pendientes:
+        # Otro callback de la misma confirmación ya los registró
+        return
+    _pendientes.ids = {}
+    try:
+        asignar_secuencia(pendientes)
+    except Exception:
+        # El cambio ya está confirmado y sus filas siguen pendientes: no se
+        # convierte en un 500; el comando registrar_cambios_pendientes las asigna
+        logger.exception("No se pudo asignar la secuencia del feed de cambios")
+
+
+def _siguiente_secuencia():
+    """
+    Turno del contador del feed (SecuenciaCambios). El bloqueo se mantiene
+    hasta confirmar: otra transacción no obtiene la secuencia siguiente
+    mientras ésta no sea visible.
+    """
+    contador, _ = SecuenciaCambios.objects.using(DEFAULT_DB_ALIAS).select_for_update().get_or_create(
+        pk=SecuenciaCambios.UNICA,
+    )
+    contador.ultima += 1
+    contador.save(update_fields=['ultima'])
+    return contador.ultima
+
+
+def asignar_secuencia(ids_por_tipo):
+    """
+    Da una nueva secuencia a las filas pendientes de {tipo: ids} en una
+    transacción corta. Sólo toca el contador y filas de RegistroCambio ya
+    confirmadas; las que otra confirmación ya numeró no cambian.
+    """
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        secuencia = _siguiente_secuencia()
+        for tipo, ids in ids_por_tipo.items():
+            for lote in _en_lotes(ids):
+                RegistroCambio.objects.filter(
+                    tipo=tipo, objeto_id__in=lote, secuencia__isnull=True,
+                ).update(secuencia=secuencia)
+    return secuencia
+
+
+def registrar_faltantes():
+    """
+    Reparación del feed: registra los movimientos y elementos que no tienen
+    fila (p. ej. cargas con bulk_create, que en MySQL no devuelven ids) y
+    numera con una sola secuencia todas las filas pendientes, incluidas las de
+    una confirmación cuyo proceso terminó antes de asignarlas.
+    Retorna cuántas filas recibieron secuencia.
+    """
+    for tipo, modelo in ((MOVIMIENTO, MovimientoInventario), (ELEMENTO, ElementoInventario)):
+        registrados = RegistroCambio.objects.filter(tipo=tipo).values('objeto_id')
+        faltantes = list(modelo.objects.exclude(id__in=registrados).order_by('id').values_list('id', flat=True))
+        if faltantes:
+            _marcar_pendientes(tipo, faltantes)
+
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if not RegistroCambio.objects.filter(secuencia__isnull=True).exists():
+            return 0
+        secuencia = _siguiente_secuencia()
+        return RegistroCambio.objects.filter(secuencia__isnull=True).update(secuencia=secuencia)
+
+
+# --- Recorrido del registro ---------------------------------------------------
+
+def _leer_cursor(cursor, nombre):
+    """(secuencia, id) del cursor, (0, 0) sin cursor; CursorInvalido si no es de este feed."""
+    if not cursor:
+        return 0, 0
+    valores = decodificar_cursor(cursor)
+    if not valores or len(valores) != 2 or not all(isinstance(v, int) for v in valores):
+        raise CursorInvalido(f"Cursor de {nombre} inválido.")
+    return tuple(valores)
+
+
+def _recorrer(tipo, desde, limite, cargar, serializar):
+    """
+    Página del registro de `tipo` posterior a `desde` (índice tipo, secuencia,
+    id). Las filas se cargan por lotes de ids (`cargar(ids)` -> {id: fila})
+    y se entregan en el orden del registro; las que ya no existen se omiten.
+    """
+    secuencia, registro_id = desde
+    registros = list(
+        RegistroCambio.objects.filter(tipo=tipo)
+        .filter(Q(secuencia__gt=secuencia) | Q(secuencia=secuencia, id__gt=registro_id))
+        .order_by('secuencia', 'id')
+        .values_list('secuencia', 'id', 'objeto_id')[:limite + 1]
+    )
+    mas = len(registros) > limite
+    registros = registros[:limite]
+
+    for lote in _en_lotes(registros):
+        filas = cargar([objeto_id for _, _, objeto_id in lote])
+        for _, _, objeto_id in lote:
+            if objeto_id in filas:
+                yield serializar(filas[objeto_id]), None
+
+    ultimo = registros[-1][:2] if registros else desde
+    yield None, (codificar_cursor(list(ultimo)), mas)
+
+
+# --- Movimientos --------------------------------------------------------------
+
+def _serializar_movimiento(fila):
+    return {
+        'id': fila['id'],
+        'elemento_id': fila['elemento_id'],
+        'tipo': fila['tipo'],
+        'cantidad': _decimal(fila['cantidad']),
+        'precio_unitario': _decimal(fila['precio_unitario']),
+        'fecha_movimiento': _fecha(fila['fecha_movimiento']),
+        'responsable': fila['responsable__username'],
+        'proveedor_id': fila['proveedor_id'],
+        'folio_documento': fila['folio_documento'],
+        'referencia': fila['referencia'],
+        'ubicacion_id': fila['ubicacion_id'],
+    }
+
+
+def _cargar_movimientos(ids):
+    filas = MovimientoInventario.objects.filter(id__in=ids).values(
+        'id', 'elemento_id', 'tipo', 'cantidad', 'precio_unitario', 'fecha_movimiento',
+        'responsable__username', 'proveedor_id', 'folio_documento', 'referencia', 'ubicacion_id',
+    )
+    return {fila['id']: fila for fila in filas}
+
+
+def pagina_movimientos(cursor, limite):
+    """
+    Movimientos registrados después del cursor, en orden de confirmación.
+    Valida el cursor de inmediato (lanza CursorInvalido) y retorna un
+    generador de (registro, None) por fila y, al final, (None, (cursor_siguiente, mas)).
+    """
+    desde = _leer_cursor(cursor, 'movimientos')
+    return _recorrer(MOVIMIENTO, desde, limite, _cargar_movimientos, _serializar_movimiento)
+
+
+# --- Elementos ----------------------------------------------------------------
+
+def _serializar_elemento(fila):
+    return {
+        'id': fila['id'],
+        'descripcion': fila['descripcion'],
+        'codigo': fila['codigo'],
+        'clase': fila['clase__nombre'],
+        'unidad': fila['unidad'],
+        'stock_actual': _decimal(fila['stock_actual']),
+        'costo_unitario': _decimal(fila['costo_unitario']),
+        'ubicacion': fila['ubicacion'],
+        'ubicacion_principal_id': fila['ubicacion_principal_id'],
+        'modificado': _fecha(fila['modificado']),
+    }
+
+
+def _cargar_elementos(ids):
+    filas = ElementoInventario.objects.filter(id__in=ids).values(
+        'id', 'descripcion', 'codigo', 'clase__nombre', 'unidad', 'stock_actual', 'costo_unitario',
+        'ubicacion', 'ubicacion_principal_id', 'modificado',
+    )
+    return {fila['id']: fila for fila in filas}
+
+
+def pagina_elementos(cursor, limite):
+    """Igual que pagina_movimientos() para elementos creados o modificados después del cursor."""
+    desde = _leer_cursor(cursor, 'elementos')
+    return _recorrer(ELEMENTO, desde, limite, _cargar_elementos, _serializar_elemento)
+
+
+# --- Formatos de salida -------------------------------------------------------
+
+def como_ndjson(pagina):
+    """Una línea JSON por registro y una última línea {"cursor", "mas"}."""
+    for registro, fin in pagina:
+        if registro is not None:
+            yield json.dumps(registro, ensure_ascii=False) + '\n'
+        else:
+            cursor, mas = fin
+            yield json.dumps({'cursor': cursor, 'mas': mas}) + '\n'
+
+
+def como_dict(pagina):
+    """La página completa en un dict (formato JSON)."""
+    cambios = []
+    for registro, fin in pagina:
+        if registro is not None:
+            cambios.append(registro)
+        else:
+            cursor, mas = fin
+    return {'cambios': cambios, 'cursor': cursor, 'mas': mas}
@@ -0,0 +1,112 @@
+# inventario/codigos.py
+"""
+Códigos SKU / de barras de los elementos. Se guardan normalizados (sin
+espacios y en mayúsculas) para que el escaneo sea una igualdad exacta sobre
+el índice único de ElementoInventario.codigo.
+"""
+
+import re
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache_datos import invalidar_tablas
+from .cambios import ELEMENTO, registrar_cambios
+from .models import ElementoInventario
+
+LONGITUD_MAXIMA = ElementoInventario._meta.get_field('codigo').max_length
+TAMANO_LOTE_DEFAULT = 1000
+_CARACTERES_VALIDOS = re.compile(r'^[A-Z0-9._/-]+$')
+
+
+class CodigoInvalido(ValueError):
+    """Código vacío, demasiado largo o con caracteres no admitidos."""
+
+
+def normalizar_codigo(texto):
+    """
+    Quita espacios (también los internos que agregan algunos lectores) y pasa
+    a mayúsculas. Retorna None si queda vacío; CodigoInvalido si no es válido.
+    """
+    codigo = re.sub(r'\s+', '', texto or '').upper()
+    if not codigo:
+        return None
+    if len(codigo) > LONGITUD_MAXIMA:
+        raise CodigoInvalido(f"El código no puede tener más de {LONGITUD_MAXIMA} caracteres.")
+    if not _CARACTERES_VALIDOS.match(codigo):
+        raise CodigoInvalido("El código sólo admite letras, números y los signos . _ / -")
+    return codigo
+
+
+def buscar_por_codigo(texto, queryset=None):
+    """
+    Elemento con ese código (una consulta por el índice único) o None si el
+    código no está asignado. CodigoInvalido si no puede ser un código.
+    """
+    codigo = normalizar_codigo(texto)
+    if codigo is None:
+        raise CodigoInvalido("Escanea o escribe un código.")
+    queryset = ElementoInventario.objects.all() if queryset is None else queryset
+    return queryset.filter(codigo=codigo).first()
+
+
+def asignar_codigos(filas, tamano_lote=TAMANO_LOTE_DEFAULT):
+    """
+    Asigna códigos a elementos existentes desde las filas de un CSV
+    (admin_sistema.importacion.leer_csv) con columnas `elemento` (id) y
+    `codigo`. Un código ya asignado a otro elemento, repetido en el archivo o
+    no válido se rechaza; el resto se guarda con bulk_update por lotes en una
+    transacción. Retorna (asignados, errores) con errores = [(linea, valor, motivo)].
+    """
+    codigos, errores = {}, []
+    vistos = {}
+
+    for linea, fila in filas:
+        elemento = fila.get('elemento', '')
+        if not elemento.isdigit():
+            errores.append((linea, elemento, "El id de elemento debe ser numérico."))
+            continue
+        try:
+            codigo = normalizar_codigo(fila.get('codigo'))
+        except CodigoInvalido as e:
+            errores.append((linea, fila.get('codigo', ''), str(e)))
+            continue
+        if codigo is None:
+            errores.append((linea, elemento, "Falta el código."))
+        elif vistos.setdefault(codigo, int(elemento)) != int(elemento):
+            errores.append((linea, codigo, "Código repetido en el archivo."))
+        elif int(elemento) in codigos:
+            errores.append((linea, elemento, "Elemento repetido en el archivo."))
+        else:
+            codigos[int(elemento)] = (linea, codigo)
+
+    # Una consulta para los elementos y otra para los códigos ya ocupados
+    existentes = set(ElementoInventario.objects.filter(id__in=codigos).values_list('id', flat=True))
+    ocupados = dict(
+        ElementoInventario.objects.filter(codigo__in={c for _, c in codigos.values()})
+        .values_list('codigo', 'id')
+    )
+    validos = {}
+    for elemento_id, (linea, codigo) in codigos.items():
+        if elemento_id not in existentes:
+            errores.append((linea, elemento_id, "No existe el elemento."))
+        elif ocupados.get(codigo, elemento_id) != elemento_id:
+            errores.append((linea, codigo, f"El código ya es del elemento {ocupados[codigo]}."))
+        else:
+            validos[elemento_id] = codigo
+
+    iterador = iter(sorted(validos))
+    with transaction.atomic():
+        while lote := list(islice(iterador, tamano_lote)):
+            ahora = timezone.now()
+            ElementoInventario.objects.bulk_update([
+                ElementoInventario(id=elemento_id, codigo=validos[elemento_id], modificado=ahora)
+                for elemento_id in lote
+            ], ['codigo', 'modificado'])
+            registrar_cambios(ELEMENTO, lote)
+        # bulk_update no emite post_save: se invalida la caché de datos a mano
+        if validos:
+            invalidar_tablas(ElementoInventario._meta.db_table)
+    errores.sort(key=lambda error: error[0])
+    return len(validos), errores
@@ -0,0 +1,216 @@
+# inventario/compras.py
+"""
+Mantenimiento y consulta de CompraMensualProveedor: las entradas confirmadas
+se acumulan por (proveedor, mes) y la analítica de proveedores lee sólo esa
+tabla (unas pocas filas por proveedor) en lugar de MovimientoInventario.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import DateTimeField, DecimalField, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from core.cache_datos import invalidar_tablas
+from .models import CompraMensualProveedor, MovimientoInventario
+
+CERO = Decimal('0.00')
+
+# Criterios de orden del listado de proveedores (?orden=...). Son claves de
+# paginación (core.paginacion): sin nulos y terminadas en 'id'.
+ORDENES_PROVEEDORES = {
+    'nombre': ('nombre', 'id'),
+    'importe': ('-compras_importe', 'nombre', 'id'),
+    'cantidad': ('-compras_cantidad', 'nombre', 'id'),
+    'partidas': ('-compras_partidas', 'nombre', 'id'),
+    'ultima_entrega': ('-orden_entrega', 'nombre', 'id'),
+}
+# Proveedores sin entregas quedan al final al ordenar por última entrega
+SIN_ENTREGA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def mes_de(fecha):
+    """Primer día del mes (hora local) de un datetime aware."""
+    return timezone.localtime(fecha).date().replace(day=1)
+
+
+def _limites_del_mes(mes):
+    """[inicio, fin) en hora local del mes que empieza en la fecha `mes`."""
+    siguiente = (mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return (
+        timezone.make_aware(datetime.combine(mes, time.min)),
+        timezone.make_aware(datetime.combine(siguiente, time.min)),
+    )
+
+
+def registrar_compras(lineas):
+    """
+    Acumula entradas en la tabla agregada. `lineas` son tuplas
+    (proveedor_id, cantidad, precio_unitario, fecha_movimiento): el mes es el
+    del movimiento guardado, igual que en recalcular_compras(), aunque la
+    confirmación cruce el cambio de mes. Debe llamarse dentro de la
+    transacción que crea los movimientos: si ésta se revierte, el agregado también.
+    """
+    por_mes = defaultdict(lambda: [CERO, CERO, 0, None])
+    for proveedor_id, cantidad, precio_unitario, fecha in lineas:
+        if proveedor_id is None:
+            continue
+        acumulado = por_mes[(proveedor_id, mes_de(fecha))]
+        acumulado[0] += cantidad * precio_unitario
+        acumulado[1] += cantidad
+        acumulado[2] += 1
+        acumulado[3] = max(acumulado[3] or fecha, fecha)
+
+    # Orden fijo de (proveedor, mes): dos confirmaciones concurrentes bloquean
+    # las filas agregadas en el mismo orden (sin interbloqueos)
+    for proveedor_id, mes in sorted(por_mes):
+        importe, cantidad, partidas, fecha = por_mes[(proveedor_id, mes)]
+        _acumular(proveedor_id, mes, importe, cantidad, partidas, fecha)
+
+    if por_mes:
+        invalidar_tablas(CompraMensualProveedor._meta.db_table)
+
+
+def descontar_compra(proveedor_id, cantidad, precio_unitario, fecha):
+    """
+    Revierte una entrada borrada (inventario.signals) en su fila agregada. La
+    última entrega del mes se vuelve a leer de las entradas que quedan; si no
+    queda ninguna, la fila se elimina como lo haría recalcular_compras().
+    """
+    if proveedor_id is None:
+        return
+    mes = mes_de(fecha)
+    fila = CompraMensualProveedor.objects.filter(proveedor_id=proveedor_id, mes=mes)
+    inicio, fin = _limites_del_mes(mes)
+    ultima = MovimientoInventario.objects.filter(
+        tipo='ENTRADA', proveedor_id=proveedor_id, fecha_movimiento__gte=inicio, fecha_movimiento__lt=fin,
+    ).aggregate(ultima=Max('fecha_movimiento'))['ultima']
+    if ultima is None:
+        fila.delete()
+    else:
+        fila.update(
+            importe=F('importe') - cantidad * precio_unitario,
+            cantidad=F('cantidad') - cantidad,
+            partidas=F('partidas') - 1,
+            ultima_entrega=ultima,
+        )
+    invalidar_tablas(CompraMensualProveedor._meta.db_table)
+
+
+def _acumular(proveedor_id, mes, importe, cantidad, partidas, fecha):
+    incrementos = {
+        'importe': F('importe') + importe,
+        'cantidad': F('cantidad') + cantidad,
+        'partidas': F('partidas') + partidas,
+        'ultima_entrega': Greatest(Coalesce('ultima_entrega', Value(fecha)), Value(fecha)),
+    }
+    fila = CompraMensualProveedor.objects.filter(proveedor_id=proveedor_id, mes=mes)
+    if fila.update(**incrementos):
+        return
+    try:
+        # Savepoint: si otra confirmación creó la fila primero, se actualiza la suya
+        with transaction.atomic():
+            CompraMensualProveedor.objects.create(
+                proveedor_id=proveedor_id, mes=mes, importe=importe,
+                cantidad=cantidad, partidas=partidas, ultima_entrega=fecha,
+            )
+    except IntegrityError:
+        fila.update(**incrementos)
+
+
+def recalcular_compras(tamano_lote=5000):
+    """
+    Reconstruye la tabla agregada desde el libro de movimientos. El mes se
+    calcula en Python con la zona horaria local (TruncMonth en MySQL requiere
+    las tablas de zonas horarias cargadas). Retorna el número de filas generadas.
+    """
+    grupos = {}
+    entradas = (
+        MovimientoInventario.objects.filter(tipo='ENTRADA', proveedor__isnull=False)
+        .values_list('proveedor_id', 'fecha_movimiento', 'cantidad', 'precio_unitario')
+        .order_by()
+    )
+    for proveedor_id, fecha, cantidad, precio_unitario in entradas.iterator(chunk_size=tamano_lote):
+        clave = (proveedor_id, mes_de(fecha))
+        fila = grupos.get(clave)
+        if fila is None:
+            fila = grupos[clave] = CompraMensualProveedor(
+                proveedor_id=proveedor_id, mes=clave[1], importe=CERO, cantidad=CERO,
+                partidas=0, ultima_entrega=fecha,
+            )
+        fila.importe += cantidad * precio_unitario
+        fila.cantidad += cantidad
+        fila.partidas += 1
+        fila.ultima_entrega = max(fila.ultima_entrega, fecha)
+
+    with transaction.atomic():
+        CompraMensualProveedor.objects.all().delete()
+        CompraMensualProveedor.objects.bulk_create(grupos.values(), batch_size=1000)
+        invalidar_tablas(CompraMensualProveedor._meta.db_table)
+    return len(grupos)
+
+
+def anotar_compras(queryset, anio=None):
+    """
+    Anota proveedores con las compras del año (`compras_importe`,
+    `compras_cantidad`, `compras_partidas`) y su `ultima_entrega` histórica,
+    desde la tabla agregada (un JOIN sobre ~12 filas por proveedor).
+    """
+    anio = anio or timezone.localdate().year
+    del_anio = Q(compras_mensuales__mes__year=anio)
+    cero = _valor_cero()
+    return queryset.annotate(
+        compras_importe=Coalesce(Sum('compras_mensuales__importe', filter=del_anio), cero),
+        compras_cantidad=Coalesce(Sum('compras_mensuales__cantidad', filter=del_anio), cero),
+        compras_partidas=Coalesce(Sum('compras_mensuales__partidas', filter=del_anio), 0),
+        ultima_entrega=Max('compras_mensuales__ultima_entrega'),
+        orden_entrega=Coalesce(
+            Max('compras_mensuales__ultima_entrega'), Value(SIN_ENTREGA, output_field=DateTimeField())
+        ),
+    )
+
+
+def adjuntar_compras(proveedores, anio=None):
+    """
+    Igual que anotar_compras() pero sobre una página ya cargada: una consulta
+    agrupada sólo para esos proveedores, sin agregar toda la tabla.
+    """
+    anio = anio or timezone.localdate().year
+    del_anio = Q(mes__year=anio)
+    cero = _valor_cero()
+    totales = {
+        fila['proveedor_id']: fila
+        for fila in CompraMensualProveedor.objects.filter(proveedor__in=[p.id for p in proveedores])
+        .values('proveedor_id')
+        .annotate(
+            importe=Coalesce(Sum('importe', filter=del_anio), cero),
+            cantidad=Coalesce(Sum('cantidad', filter=del_anio), cero),
+            partidas=Coalesce(Sum('partidas', filter=del_anio), 0),
+            ultima=Max('ultima_entrega'),
+        )
+        .order_by()
+    }
+    for proveedor in proveedores:
+        fila = totales.get(proveedor.id, {})
+        proveedor.compras_importe = fila.get('importe', CERO)
+        proveedor.compras_cantidad = fila.get('cantidad', CERO)
+        proveedor.compras_partidas = fila.get('partidas', 0)
+        proveedor.ultima_entrega = fila.get('ultima')
+    return proveedores
+
+
+def _valor_cero():
+    return Value(CERO, output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def tendencia_mensual(proveedor_id, meses=12):
+    """Últimos `meses` meses con compras del proveedor, del más antiguo al más reciente."""
+    filas = (
+        CompraMensualProveedor.objects.filter(proveedor_id=proveedor_id)
+        .order_by('-mes')
+        .values('mes', 'importe', 'cantidad', 'partidas', 'ultima_entrega')[:meses]
+    )
+    return list(reversed(filas))
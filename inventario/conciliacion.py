@@ -0,0 +1,149 @@
+# inventario/conciliacion.py
+"""
+Conciliación de ElementoInventario.stock_actual contra el libro de
+movimientos. La comparación trabaja por rangos de id para poder repartirse
+entre procesos; la corrección (pocas filas) se hace desde un solo proceso.
+
+MySQL corre en READ COMMITTED (el default del backend de Django): cada
+consulta ve lo confirmado hasta ese momento, así que los descuadres del
+recorrido se vuelven a comprobar con los elementos bloqueados antes de
+reportarlos o corregirlos.
+"""
+
+import os
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from core.cache_datos import invalidar_tablas
+from .alertas import evaluar as evaluar_alertas
+from .cambios import ELEMENTO, registrar_cambios
+from .models import ElementoInventario, ExistenciaUbicacion, MovimientoInventario
+from .ubicaciones import ajustar_en_principal
+
+TAMANO_LOTE_DEFAULT = 1000
+CERO = Decimal('0.00')
+
+Diferencia = namedtuple('Diferencia', 'elemento_id stock_actual stock_esperado')
+
+
+def rangos_de_ids(tamano_rango):
+    """Parte [min(id), max(id)] de elementos en rangos cerrados de `tamano_rango` ids."""
+    limites = ElementoInventario.objects.aggregate(minimo=Min('id'), maximo=Max('id'))
+    if limites['minimo'] is None:
+        return []
+    return [
+        (desde, min(desde + tamano_rango - 1, limites['maximo']))
+        for desde in range(limites['minimo'], limites['maximo'] + 1, tamano_rango)
+    ]
+
+
+def _esperado(filtro):
+    return dict(
+        MovimientoInventario.objects.filter(**filtro)
+        .neto_por_elemento()
+        .values_list('elemento_id', 'neto')
+    )
+
+
+def _bloquear_con_esperado(ids):
+    """
+    Bloquea los elementos `ids` y lee su neto de movimientos. Las confirmaciones
+    de entradas/salidas bloquean el elemento antes de escribir su movimiento,
+    así que con el bloqueo tomado el libro de esos elementos no cambia y ambas
+    lecturas concuerdan aun en READ COMMITTED. Debe llamarse en una transacción.
+    """
+    elementos = list(
+        ElementoInventario.objects.select_for_update().filter(id__in=ids).order_by('id')
+        .only('id', 'stock_actual', 'modificado', 'stock_minimo', 'stock_maximo', 'ubicacion_principal')
+    )
+    return elementos, _esperado({'elemento_id__in': ids})
+
+
+def confirmar_diferencias(diferencias, tamano_lote=TAMANO_LOTE_DEFAULT):
+    """
+    Vuelve a comparar los descuadres del recorrido con los elementos bloqueados
+    y descarta los que eran una confirmación a medio leer. Retorna las
+    diferencias vigentes con los valores releídos.
+    """
+    ids = [d.elemento_id for d in diferencias]
+    vigentes = []
+    for inicio in range(0, len(ids), tamano_lote):
+        with transaction.atomic():
+            elementos, esperado = _bloquear_con_esperado(ids[inicio:inicio + tamano_lote])
+        vigentes.extend(
+            Diferencia(elemento.id, elemento.stock_actual, esperado.get(elemento.id, CERO))
+            for elemento in elementos
+            if elemento.stock_actual != esperado.get(elemento.id, CERO)
+        )
+    return vigentes
+
+
+def corregir(ids, tamano_lote=TAMANO_LOTE_DEFAULT):
+    """
+    Re-calcula y corrige `ids` con las filas bloqueadas (_bloquear_con_esperado).
+    La diferencia se aplica también a la existencia de la ubicación principal
+    para que las existencias por ubicación sigan sumando el stock.
+    Retorna cuántos elementos se actualizaron.
+    """
+    corregidos = 0
+    for inicio in range(0, len(ids), tamano_lote):
+        with transaction.atomic():
+            elementos, esperado = _bloquear_con_esperado(ids[inicio:inicio + tamano_lote])
+            cambiados, deltas = [], {}
+            ahora = timezone.now()
+            for elemento in elementos:
+                valor = esperado.get(elemento.id, CERO)
+                if elemento.stock_actual != valor:
+                    deltas[elemento.id] = valor - elemento.stock_actual
+                    elemento.stock_actual = valor
+                    elemento.modificado = ahora
+                    cambiados.append(elemento)
+            ElementoInventario.objects.bulk_update(cambiados, ['stock_actual', 'modificado'])
+            ajustar_en_principal(cambiados, deltas)
+            evaluar_alertas(cambiados)
+            registrar_cambios(ELEMENTO, [elemento.id for elemento in cambiados])
+            corregidos += len(cambiados)
+
+    if corregidos:
+        # bulk_update no emite post_save: se invalida la caché de datos a mano
+        invalidar_tablas(ElementoInventario._meta.db_table, ExistenciaUbicacion._meta.db_table)
+    return corregidos
+
+
+def conciliar_rango(desde, hasta, tamano_lote=TAMANO_LOTE_DEFAULT):
+    """
+    Compara stock_actual con el neto de movimientos para los elementos con id
+    en [desde, hasta]: dos consultas (un GROUP BY sobre movimientos y la lectura
+    de stock_actual) sin bloquear; los descuadres encontrados se confirman
+    después con bloqueo (confirmar_diferencias), porque una confirmación entre
+    ambas lecturas parecería un descuadre. Retorna (elementos revisados, diferencias).
+    """
+    esperado = _esperado({'elemento_id__gte': desde, 'elemento_id__lte': hasta})
+    actuales = ElementoInventario.objects.filter(
+        id__gte=desde, id__lte=hasta
+    ).values_list('id', 'stock_actual')
+
+    revisados = 0
+    diferencias = []
+    for elemento_id, stock_actual in actuales.iterator(chunk_size=tamano_lote):
+        revisados += 1
+        valor = esperado.get(elemento_id, CERO)
+        if stock_actual != valor:
+            diferencias.append(Diferencia(elemento_id, stock_actual, valor))
+
+    return revisados, confirmar_diferencias(diferencias, tamano_lote)
+
+
+def inicializar_worker(settings_module):
+    """Initializer del pool: Django listo también con el método 'spawn'."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def conciliar_rango_en_worker(argumentos):
+    return conciliar_rango(*argumentos)
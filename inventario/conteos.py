@@ -0,0 +1,266 @@
+# inventario/conteos.py
+"""
+Conteos cíclicos: una sesión congela el stock esperado de un conjunto de
+elementos, recibe las cantidades contadas (captura o CSV) y al aplicarse
+registra todas las diferencias como movimientos de ajuste en una sola
+transacción, por lotes y con operaciones en bloque (sin una consulta por
+elemento), de modo que puede abarcar el almacén completo.
+"""
+
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from core.cache_datos import invalidar_tablas
+from .alertas import evaluar as evaluar_alertas
+from .cambios import ELEMENTO, MOVIMIENTO, registrar_cambios
+from .codigos import CodigoInvalido, normalizar_codigo
+from .models import (
+    ConteoCiclico, ElementoInventario, ExistenciaUbicacion, LineaConteo, MovimientoInventario,
+)
+from .ubicaciones import ajustar_en_principal
+
+TAMANO_LOTE_DEFAULT = 1000
+CERO = Decimal('0.00')
+
+
+class ConteoNoAbierto(Exception):
+    """La sesión ya se aplicó o se canceló: no admite más cambios."""
+
+    def __init__(self, conteo):
+        self.conteo = conteo
+        super().__init__(f"El conteo '{conteo.nombre}' está {conteo.get_estado_display().lower()}.")
+
+
+def _en_lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def _bloquear_abierto(conteo_id):
+    conteo = ConteoCiclico.objects.select_for_update().get(pk=conteo_id)
+    if conteo.estado != 'ABIERTO':
+        raise ConteoNoAbierto(conteo)
+    return conteo
+
+
+# --- Creación (congelar el stock esperado) -----------------------------------
+
+def crear_conteo(nombre, usuario, clase_id=None, ubicacion_id=None, tamano_lote=TAMANO_LOTE_DEFAULT):
+    """
+    Crea la sesión y una línea por elemento seleccionado con su stock_actual
+    como esperado. Los esperados salen de una sola consulta, que ve una foto
+    consistente del stock aun en READ COMMITTED (el nivel del backend MySQL de
+    Django); las inserciones por lotes van en la misma transacción.
+    Retorna (conteo, lineas).
+    """
+    elementos = ElementoInventario.objects.all()
+    if clase_id:
+        elementos = elementos.filter(clase_id=clase_id)
+    if ubicacion_id:
+        elementos = elementos.filter(ubicacion_principal_id=ubicacion_id)
+
+    with transaction.atomic():
+        conteo = ConteoCiclico.objects.create(
+            nombre=nombre, clase_id=clase_id or None, ubicacion_id=ubicacion_id or None, creado_por=usuario,
+        )
+        filas = elementos.order_by('id').values_list('id', 'stock_actual').iterator(chunk_size=tamano_lote)
+        lineas = 0
+        for lote in _en_lotes(filas, tamano_lote):
+            LineaConteo.objects.bulk_create([
+                LineaConteo(conteo=conteo, elemento_id=elemento_id, esperado=stock or CERO)
+                for elemento_id, stock in lote
+            ])
+            lineas += len(lote)
+    return conteo, lineas
+
+
+# --- Captura de cantidades ----------------------------------------------------
+
+def leer_cantidades(filas):
+    """
+    Convierte las filas de un CSV (admin_sistema.importacion.leer_csv) con
+    columnas `elemento` (id), `codigo` o `descripcion`, y `cantidad`. Códigos y
+    descripciones se resuelven en una consulta cada uno. Retorna
+    ({elemento_id: cantidad}, errores) con errores = [(linea, valor, motivo)].
+    """
+    cantidades, errores = {}, []
+    por_codigo, por_descripcion = [], []
+
+    for linea, fila in filas:
+        referencia = fila.get('elemento') or fila.get('codigo') or fila.get('descripcion', '')
+        try:
+            cantidad = Decimal(fila.get('cantidad', '').replace(',', '.'))
+            if not cantidad.is_finite():
+                raise InvalidOperation
+            cantidad = cantidad.quantize(Decimal('0.01'))
+        except InvalidOperation:
+            errores.append((linea, referencia, "Cantidad no válida."))
+            continue
+        if cantidad < 0:
+            errores.append((linea, referencia, "La cantidad no puede ser negativa."))
+            continue
+
+        if fila.get('elemento'):
+            if not fila['elemento'].isdigit():
+                errores.append((linea, referencia, "El id de elemento debe ser numérico."))
+            else:
+                cantidades[int(fila['elemento'])] = cantidad
+        elif fila.get('codigo'):
+            try:
+                por_codigo.append((linea, normalizar_codigo(fila['codigo']), cantidad))
+            except CodigoInvalido as e:
+                errores.append((linea, referencia, str(e)))
+        elif fila.get('descripcion'):
+            por_descripcion.append((linea, fila['descripcion'], cantidad))
+        else:
+            errores.append((linea, '', "Falta la columna elemento, codigo o descripcion."))
+
+    if por_codigo:
+        ids = dict(
+            ElementoInventario.objects.filter(codigo__in={c for _, c, _ in por_codigo})
+            .values_list('codigo', 'id')
+        )
+        for linea, codigo, cantidad in por_codigo:
+            if codigo in ids:
+                cantidades[ids[codigo]] = cantidad
+            else:
+                errores.append((linea, codigo, "No existe un elemento con ese código."))
+
+    if por_descripcion:
+        ids = dict(
+            ElementoInventario.objects.filter(descripcion__in={d for _, d, _ in por_descripcion})
+            .values_list('descripcion', 'id')
+        )
+        for linea, descripcion, cantidad in por_descripcion:
+            if descripcion in ids:
+                cantidades[ids[descripcion]] = cantidad
+            else:
+                errores.append((linea, descripcion, "No existe un elemento con esa descripción."))
+
+    return cantidades, errores
+
+
+def registrar_cantidades(conteo_id, cantidades, tamano_lote=TAMANO_LOTE_DEFAULT):
+    """
+    Guarda las cantidades contadas ({elemento_id: cantidad}) en las líneas de la
+    sesión con bulk_update por lotes. Un elemento contado de nuevo se sobrescribe.
+    Retorna (registradas, ids_fuera_de_la_sesion).
+    """
+    ahora = timezone.now()
+    registradas, encontrados = 0, set()
+    with transaction.atomic():
+        conteo = _bloquear_abierto(conteo_id)
+        for lote in _en_lotes(sorted(cantidades), tamano_lote):
+            lineas = list(LineaConteo.objects.filter(conteo=conteo, elemento_id__in=lote))
+            for linea in lineas:
+                linea.contado = cantidades[linea.elemento_id]
+                linea.contado_en = ahora
+                encontrados.add(linea.elemento_id)
+            LineaConteo.objects.bulk_update(lineas, ['contado', 'contado_en'])
+            registradas += len(lineas)
+    return registradas, sorted(set(cantidades) - encontrados)
+
+
+def resumen_conteo(conteo):
+    """Líneas totales, contadas y con diferencia (una consulta agregada)."""
+    return LineaConteo.objects.filter(conteo=conteo).aggregate(
+        total=Count('id'),
+        contadas=Count('id', filter=Q(contado__isnull=False)),
+        diferencias=Count('id', filter=Q(contado__isnull=False) & ~Q(contado=F('esperado'))),
+    )
+
+
+# --- Aplicación de diferencias ------------------------------------------------
+
+def aplicar_conteo(conteo_id, usuario, tamano_lote=TAMANO_LOTE_DEFAULT):
+    """
+    Registra las diferencias contado - esperado como movimientos de ajuste
+    (ENTRADA si sobra, SALIDA si falta) y las suma al stock actual: los
+    movimientos ocurridos después de congelar la sesión se conservan. Las
+    líneas sin contar no se ajustan. Todo en una transacción; cada lote
+    bloquea sus elementos en orden de id.
+    Un faltante mayor que el stock actual (salidas posteriores a la
+    congelación) sólo se ajusta hasta cero, igual que la existencia de la
+    ubicación principal. Retorna (ajustes, recortados, sin_existencia): los
+    ids de elemento de cada caso, para informarlos a quien aplica el conteo.
+    """
+    with transaction.atomic():
+        conteo = _bloquear_abierto(conteo_id)
+        # Sólo las líneas con diferencia (tuplas, no instancias); el recorrido
+        # escribe en las mismas tablas, así que se lee completo antes
+        diferencias = list(
+            LineaConteo.objects.filter(conteo=conteo, contado__isnull=False)
+            .exclude(contado=F('esperado'))
+            .order_by('elemento_id')
+            .values_list('elemento_id', 'esperado', 'contado')
+        )
+        folio = f"CC-{conteo.id}"
+        referencia = f"Ajuste por conteo cíclico: {conteo.nombre}"[:150]
+
+        ajustes = 0
+        recortados, sin_existencia = [], []
+        for lote in _en_lotes(diferencias, tamano_lote):
+            deltas = {elemento_id: contado - esperado for elemento_id, esperado, contado in lote}
+            # Cada lote se sella con su propia hora (la aplicación puede tardar)
+            ahora = timezone.now()
+            elementos = list(
+                ElementoInventario.objects.select_for_update().filter(id__in=deltas).order_by('id')
+            )
+            movimientos = []
+            for elemento in elementos:
+                # Nunca por debajo de cero (salidas posteriores a la congelación)
+                delta = max(deltas[elemento.id], -elemento.stock_actual)
+                if delta != deltas[elemento.id]:
+                    recortados.append(elemento.id)
+                deltas[elemento.id] = delta
+                if not delta:
+                    continue
+                elemento.stock_actual += delta
+                elemento.modificado = ahora
+                movimientos.append(MovimientoInventario(
+                    elemento=elemento,
+                    tipo='ENTRADA' if delta > 0 else 'SALIDA',
+                    cantidad=abs(delta),
+                    precio_unitario=elemento.costo_unitario,
+                    responsable=usuario,
+                    folio_documento=folio,
+                    referencia=referencia,
+                    ubicacion_id=elemento.ubicacion_principal_id,
+                ))
+
+            MovimientoInventario.objects.bulk_create(movimientos)
+            ElementoInventario.objects.bulk_update(elementos, ['stock_actual', 'modificado'])
+            sin_existencia.extend(ajustar_en_principal(elementos, deltas))
+            evaluar_alertas(elementos)
+            registrar_cambios(ELEMENTO, [elemento.id for elemento in elementos if deltas[elemento.id]])
+            ajustes += len(movimientos)
+
+        conteo.estado = 'APLICADO'
+        conteo.aplicado_por = usuario
+        conteo.aplicado_en = timezone.now()
+        conteo.save(update_fields=['estado', 'aplicado_por', 'aplicado_en'])
+
+        # bulk_create/update no emiten señales: se invalida la caché de datos a mano
+        # y se registran los cambios del feed (MySQL no devuelve los ids de
+        # bulk_create: los movimientos se leen por el folio del conteo)
+        invalidar_tablas(*(m._meta.db_table for m in (
+            ElementoInventario, MovimientoInventario, ExistenciaUbicacion,
+        )))
+        registrar_cambios(
+            MOVIMIENTO, MovimientoInventario.objects.filter(folio_documento=folio).values_list('id', flat=True)
+        )
+    return ajustes, recortados, sin_existencia
+
+
+def cancelar_conteo(conteo_id):
+    """Cierra la sesión sin ajustar nada."""
+    with transaction.atomic():
+        conteo = _bloquear_abierto(conteo_id)
+        conteo.estado = 'CANCELADO'
+        conteo.save(update_fields=['estado'])
+    return conteo
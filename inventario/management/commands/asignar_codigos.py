@@ -0,0 +1,40 @@
+# inventario/management/commands/asignar_codigos.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from admin_sistema.importacion import leer_csv
+from inventario.codigos import TAMANO_LOTE_DEFAULT, asignar_codigos
+
+
+class Command(BaseCommand):
+    help = (
+        "Asigna códigos SKU / de barras a elementos existentes desde un CSV con "
+        "columnas: elemento (id), codigo. Los códigos se normalizan como al escanear."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo CSV.")
+        parser.add_argument(
+            '--lote', type=int, default=TAMANO_LOTE_DEFAULT,
+            help="Elementos por cada bulk_update (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            filas = leer_csv(options['archivo'])
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+
+        try:
+            asignados, errores = asignar_codigos(filas, tamano_lote=options['lote'])
+        except IntegrityError:
+            # Otro proceso asignó uno de los códigos mientras tanto; no se guardó nada
+            raise CommandError("Un código se asignó a otro elemento durante la carga; vuelva a ejecutarla.")
+
+        for linea, valor, motivo in errores:
+            self.stderr.write(f"Línea {linea} ({valor or 'sin valor'}): {motivo}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{asignados} códigos asignados, {len(errores)} filas con error."
+        ))
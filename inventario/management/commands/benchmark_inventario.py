@@ -0,0 +1,176 @@
+# inventario/management/commands/benchmark_inventario.py
+
+import json
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.urls import reverse
+
+from core.benchmark import cliente_benchmark, formatear_resumen, medir, medir_memoria, resumen_tiempos
+from core.models import PerfilUsuario
+from inventario.models import ElementoInventario, Proveedor
+
+USUARIO_TEMPORAL = '__benchmark_inventario__'
+
+
+class _Rollback(Exception):
+    """Fuerza la reversión de los movimientos creados por el benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Recorre las vistas críticas de inventario (dashboard, reportes, "
+        "generadores de archivos y confirmación de entradas/salidas) con el "
+        "cliente de pruebas y reporta percentiles de latencia, consultas SQL y "
+        "pico de memoria. Funciona con SQLite (SMA_DB=sqlite) o MySQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=10)
+        parser.add_argument('--items', type=int, default=20,
+                            help="Ítems por carrito en las confirmaciones (default: %(default)s).")
+        parser.add_argument('--escenario', action='append', dest='escenarios',
+                            help="Ejecuta sólo los escenarios indicados (repetible).")
+        parser.add_argument('--sin-memoria', action='store_true',
+                            help="Omite la pasada con tracemalloc.")
+        parser.add_argument('--json', dest='salida_json',
+                            help="Guarda los resultados en este archivo JSON.")
+
+    def handle(self, *args, **options):
+        escenarios = self._escenarios(options['items'])
+        if options['escenarios']:
+            desconocidos = set(options['escenarios']) - set(escenarios)
+            if desconocidos:
+                raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+            escenarios = {k: v for k, v in escenarios.items() if k in options['escenarios']}
+
+        # Las advertencias N+1 del middleware se omiten salvo con -v 2
+        if options['verbosity'] < 2:
+            logging.getLogger('sma_inventario.rendimiento').setLevel(logging.ERROR)
+
+        dir_reportes = Path(settings.MEDIA_ROOT) / 'reports'
+        reportes_previos = set(dir_reportes.glob('*')) if dir_reportes.exists() else set()
+
+        self.stdout.write(
+            f"Benchmark de inventario contra {connection.vendor} "
+            f"({ElementoInventario.objects.count()} elementos, "
+            f"{options['iteraciones']} iteraciones por escenario):"
+        )
+
+        resultados = {}
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(USUARIO_TEMPORAL, password=None)
+                PerfilUsuario.objects.update_or_create(user=user, defaults={'nivel_acceso': 1})
+                self.client = cliente_benchmark()
+                self.client.force_login(user)
+
+                for nombre, escenario in escenarios.items():
+                    resultados[nombre] = self._ejecutar(
+                        nombre, escenario, options['iteraciones'], not options['sin_memoria']
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            # Los archivos generados por los escenarios de reportes no se conservan
+            if dir_reportes.exists():
+                for archivo in set(dir_reportes.glob('*')) - reportes_previos:
+                    archivo.unlink()
+
+        if options['salida_json']:
+            with open(options['salida_json'], 'w', encoding='utf-8') as f:
+                json.dump({'backend': connection.vendor, 'escenarios': resultados}, f, indent=2)
+            self.stdout.write(f"Resultados guardados en {options['salida_json']}")
+
+    # --- Escenarios ----------------------------------------------------------
+
+    def _escenarios(self, items):
+        """Cada escenario es (preparación, petición); la preparación no se mide."""
+        get = lambda url, params=None: (None, lambda: self.client.get(url, params or {}))
+        return {
+            'dashboard': get(reverse('inventario:dashboard')),
+            'dashboard (búsqueda)': get(
+                reverse('inventario:dashboard'), {'busqueda': 'Elemento 00', 'filtro_por': 'Descripcion'}
+            ),
+            'reportes': get(reverse('inventario:reportes')),
+            'reporte inventario CSV': get(reverse('inventario:generar_reporte'), {'formato': 'CSV'}),
+            'reporte inventario XLSX': get(reverse('inventario:generar_reporte'), {'formato': 'XLSX'}),
+            'reporte movimientos CSV': get(reverse('inventario:generar_reporte_movimientos'), {'formato': 'CSV'}),
+            'reporte movimientos XLSX': get(reverse('inventario:generar_reporte_movimientos'), {'formato': 'XLSX'}),
+            'confirmar entradas': (
+                lambda: self._llenar_carrito('entradas', items),
+                lambda: self._confirmar('entradas'),
+            ),
+            'confirmar salidas': (
+                lambda: self._llenar_carrito('salidas', items),
+                lambda: self._confirmar('salidas'),
+            ),
+        }
+
+    def _llenar_carrito(self, tipo, items):
+        """Agrega `items` elementos al carrito a través de la propia vista."""
+        url = reverse(f'inventario:{tipo}')
+        elementos = ElementoInventario.objects.order_by('id')
+        if tipo == 'salidas':
+            elementos = elementos.filter(stock_actual__gte=1)
+        ids = list(elementos.values_list('id', flat=True)[:items])
+        if not ids:
+            raise CommandError(f"No hay elementos disponibles para el escenario de {tipo}.")
+
+        datos = {'agregar_item': '1', 'cantidad': '1'}
+        if tipo == 'entradas':
+            proveedor = Proveedor.objects.order_by('id').values_list('id', flat=True).first()
+            if proveedor is None:
+                raise CommandError("Se requiere al menos un proveedor para el escenario de entradas.")
+            datos['proveedor_id'] = proveedor
+        else:
+            datos['destino_referencia'] = 'Benchmark'
+
+        for elemento_id in ids:
+            self.client.post(url, {**datos, 'descripcion': elemento_id})
+
+    def _confirmar(self, tipo):
+        url = reverse(f'inventario:{tipo}')
+        # El GET deja en sesión la clave de idempotencia del lote
+        self.client.get(url)
+        clave = self.client.session[f'{tipo}_temp_clave']
+        return self.client.post(url, {f'confirmar_{tipo}': '1', 'clave_confirmacion': clave})
+
+    # --- Ejecución -----------------------------------------------------------
+
+    def _ejecutar(self, nombre, escenario, iteraciones, con_memoria):
+        preparar, peticion = escenario
+        tiempos = []
+        consultas = 0
+        estado = None
+
+        def una_vez():
+            if preparar:
+                preparar()
+            return medir(peticion)
+
+        una_vez()  # calentamiento: plantillas, caché de sesión, etc.
+        for _ in range(iteraciones):
+            respuesta, ms, consultas = una_vez()
+            estado = respuesta.status_code
+            tiempos.append(ms)
+
+        pico_kb = None
+        if con_memoria:
+            if preparar:
+                preparar()
+            _, pico = medir_memoria(peticion)
+            pico_kb = round(pico / 1024, 1)
+
+        resumen = resumen_tiempos(tiempos)
+        linea = formatear_resumen(nombre, resumen, consultas)
+        if pico_kb is not None:
+            linea += f" memoria_pico={pico_kb}KB"
+        self.stdout.write(linea if estado in (200, 302) else self.style.ERROR(f"{linea} HTTP {estado}"))
+
+        return {**resumen, 'consultas': consultas, 'memoria_pico_kb': pico_kb, 'http': estado}
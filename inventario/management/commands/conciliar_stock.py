@@ -0,0 +1,76 @@
+# inventario/management/commands/conciliar_stock.py
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from inventario.conciliacion import (
+    TAMANO_LOTE_DEFAULT, conciliar_rango, conciliar_rango_en_worker, corregir, inicializar_worker,
+    rangos_de_ids,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Concilia ElementoInventario.stock_actual con el neto de "
+        "MovimientoInventario (entradas - salidas). Por defecto sólo reporta; "
+        "con --corregir actualiza los descuadres en lotes (bulk_update)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corregir', action='store_true')
+        parser.add_argument('--workers', type=int, default=1,
+                            help="Procesos en paralelo para la comparación; cada uno revisa un rango de ids.")
+        parser.add_argument('--tamano-rango', type=int, default=50000,
+                            help="Ids de elemento por rango (default: %(default)s).")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE_DEFAULT,
+                            help="Filas por bulk_update al corregir (default: %(default)s).")
+        parser.add_argument('--mostrar', type=int, default=20, help="Descuadres a listar.")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        rangos = rangos_de_ids(options['tamano_rango'])
+        tareas = [(desde, hasta, options['lote']) for desde, hasta in rangos]
+
+        if options['workers'] > 1 and len(tareas) > 1:
+            # Las conexiones abiertas no deben heredarse en los procesos hijos
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['workers'],
+                initializer=inicializar_worker,
+                initargs=(settings.SETTINGS_MODULE,),
+            ) as pool:
+                resultados = list(pool.map(conciliar_rango_en_worker, tareas))
+        else:
+            resultados = [conciliar_rango(*tarea) for tarea in tareas]
+
+        revisados = sum(r[0] for r in resultados)
+        diferencias = [d for r in resultados for d in r[1]]
+        corregidos = 0
+        if options['corregir'] and diferencias:
+            corregidos = corregir([d.elemento_id for d in diferencias], options['lote'])
+        duracion = time.perf_counter() - inicio
+
+        self.stdout.write(
+            f"Elementos revisados: {revisados} en {len(rangos)} rangos "
+            f"({options['workers']} workers, {duracion:.1f}s)"
+        )
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS("stock_actual coincide con el libro de movimientos."))
+            return
+
+        diferencias.sort(key=lambda d: abs(d.stock_actual - d.stock_esperado), reverse=True)
+        self.stdout.write(self.style.WARNING(f"Descuadres: {len(diferencias)}"))
+        for d in diferencias[:options['mostrar']]:
+            self.stdout.write(
+                f"  elemento {d.elemento_id}: stock_actual={d.stock_actual} "
+                f"esperado={d.stock_esperado} diferencia={d.stock_actual - d.stock_esperado}"
+            )
+
+        if options['corregir']:
+            self.stdout.write(self.style.SUCCESS(f"Corregidos: {corregidos}"))
+        else:
+            self.stdout.write("Ejecute con --corregir para actualizar stock_actual.")
@@ -0,0 +1,237 @@
+# inventario/management/commands/generar_datos_sinteticos.py
+
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.cache_datos import invalidar_tablas
+from core.models import PerfilUsuario
+from inventario.models import (
+    ClaseInventario, ElementoInventario, ExistenciaUbicacion, MovimientoInventario, Proveedor,
+)
+from inventario.alertas import recalcular_alertas
+from inventario.cambios import registrar_faltantes
+from inventario.compras import recalcular_compras
+from inventario.ubicaciones import obtener_o_crear_ubicacion
+
+UBICACIONES = ['Almacén Zona A', 'Almacén Zona B', 'Almacén Zona C', 'Almacén Zona D', 'Almacén Zona E']
+UNIDADES = ['PZA', 'KG', 'LT', 'CAJA', 'ROLLO', 'PAQ', 'MT']
+GIROS = ['Ferretería', 'Limpieza', 'Papelería', 'Eléctrico', 'Seguridad', 'Refacciones']
+PASSWORD_SINTETICO = 'Sintetico-2024'
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos a escala configurable (clases, proveedores, "
+        "usuarios con perfil, elementos y movimientos) usando inserciones masivas. "
+        "El stock_actual final queda consistente con los movimientos generados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clases', type=int, default=20)
+        parser.add_argument('--proveedores', type=int, default=200)
+        parser.add_argument('--usuarios', type=int, default=50)
+        parser.add_argument('--elementos', type=int, default=10000)
+        parser.add_argument('--movimientos', type=int, default=100000)
+        parser.add_argument('--dias', type=int, default=365,
+                            help="Días hacia atrás en los que se reparten los movimientos.")
+        parser.add_argument('--lote', type=int, default=5000,
+                            help="Filas por cada bulk_create (default: %(default)s).")
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--prefijo', default='SINT',
+                            help="Prefijo de nombres para identificar los datos generados.")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.prefijo = options['prefijo']
+        inicio = time.perf_counter()
+
+        clases = self._fase("Clases", self._generar_clases, options['clases'])
+        proveedores = self._fase("Proveedores", self._generar_proveedores, options['proveedores'])
+        usuarios = self._fase("Usuarios", self._generar_usuarios, options['usuarios'])
+        elementos = self._fase("Elementos", self._generar_elementos, options['elementos'], clases)
+        self._fase(
+            "Movimientos", self._generar_movimientos,
+            options['movimientos'], elementos, usuarios, proveedores, options['dias'],
+        )
+
+        # bulk_create() no pasa por la confirmación de entradas: se reconstruye el agregado
+        self._fase("Compras por proveedor", lambda: range(recalcular_compras()))
+        self._fase("Alertas de stock", lambda: range(recalcular_alertas()))
+        self._fase("Registro de cambios (feed)", lambda: range(registrar_faltantes()))
+
+        # bulk_create/update() no emiten señales: se invalida la caché de datos a mano
+        # (el feed de cambios se registró en la fase anterior)
+        invalidar_tablas(*(m._meta.db_table for m in (
+            ClaseInventario, Proveedor, ElementoInventario, MovimientoInventario, ExistenciaUbicacion,
+        )))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Datos sintéticos generados en {time.perf_counter() - inicio:.1f}s."
+        ))
+
+    def _fase(self, nombre, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        self.stdout.write(f"  {nombre}: {len(resultado)} registros ({time.perf_counter() - inicio:.1f}s)")
+        return resultado
+
+    def _en_lotes(self, objetos):
+        for inicio in range(0, len(objetos), self.lote):
+            yield objetos[inicio:inicio + self.lote]
+
+    # --- Catálogos -----------------------------------------------------------
+
+    def _generar_clases(self, cantidad):
+        nombres = [f"{self.prefijo} Clase {i:03d}" for i in range(cantidad)]
+        ClaseInventario.objects.bulk_create(
+            [ClaseInventario(nombre=n) for n in nombres], ignore_conflicts=True
+        )
+        return list(ClaseInventario.objects.filter(nombre__in=nombres).values_list('id', flat=True))
+
+    def _generar_proveedores(self, cantidad):
+        objetos = [
+            Proveedor(
+                nombre=f"{self.prefijo} Proveedor {i:06d}",
+                rfc=f"{self.prefijo}{i:010d}"[:20],
+                giro=self.rng.choice(GIROS),
+                contacto=f"55{self.rng.randint(10000000, 99999999)}",
+                activo=self.rng.random() > 0.1,
+            )
+            for i in range(cantidad)
+        ]
+        for lote in self._en_lotes(objetos):
+            Proveedor.objects.bulk_create(lote, ignore_conflicts=True)
+        return list(
+            Proveedor.objects.filter(rfc__startswith=self.prefijo).values_list('id', flat=True)
+        )
+
+    def _generar_usuarios(self, cantidad):
+        # Un solo hash para todos: PBKDF2 por usuario dominaría el tiempo total
+        password = make_password(PASSWORD_SINTETICO)
+        usernames = [f"{self.prefijo.lower()}_u{i:05d}" for i in range(cantidad)]
+
+        for lote in self._en_lotes(usernames):
+            User.objects.bulk_create(
+                [User(username=u, password=password, first_name=u.upper()) for u in lote],
+                ignore_conflicts=True,
+            )
+        ids = list(User.objects.filter(username__in=usernames).values_list('id', flat=True))
+
+        # bulk_create no dispara post_save: los perfiles se crean aquí
+        perfiles = [
+            PerfilUsuario(user_id=user_id, nivel_acceso=self.rng.choice((2, 3)), numero_empleado=f"E{user_id:06d}")
+            for user_id in ids
+        ]
+        for lote in self._en_lotes(perfiles):
+            PerfilUsuario.objects.bulk_create(lote, ignore_conflicts=True)
+        return ids
+
+    def _generar_elementos(self, cantidad, clases):
+        ubicaciones = [obtener_o_crear_ubicacion(nombre) for nombre in UBICACIONES]
+        existentes = ElementoInventario.objects.filter(descripcion__startswith=f"{self.prefijo} Elemento").count()
+        objetos = []
+        for i in range(existentes, existentes + cantidad):
+            ubicacion = self.rng.choice(ubicaciones)
+            objetos.append(ElementoInventario(
+                clase_id=self.rng.choice(clases),
+                descripcion=f"{self.prefijo} Elemento {i:07d}",
+                codigo=f"{self.prefijo}-{i:07d}".upper(),
+                unidad=self.rng.choice(UNIDADES),
+                ubicacion=ubicacion.nombre,
+                ubicacion_principal=ubicacion,
+                costo_unitario=Decimal(self.rng.randint(100, 500000)) / 100,
+                stock_actual=Decimal('0.00'),
+                # Umbral de alerta en parte del catálogo
+                stock_minimo=Decimal(self.rng.randint(1, 20)) if self.rng.random() < 0.3 else None,
+            ))
+        for lote in self._en_lotes(objetos):
+            with transaction.atomic():
+                ElementoInventario.objects.bulk_create(lote, ignore_conflicts=True)
+
+        return list(
+            ElementoInventario.objects.filter(descripcion__startswith=f"{self.prefijo} Elemento")
+            .values_list('id', 'stock_actual', 'costo_unitario', 'ubicacion_principal_id')
+        )
+
+    # --- Movimientos ---------------------------------------------------------
+
+    def _generar_movimientos(self, cantidad, elementos, usuarios, proveedores, dias):
+        if not elementos or not usuarios:
+            return []
+
+        stock = {elemento_id: stock_actual for elemento_id, stock_actual, _, _ in elementos}
+        costos = {elemento_id: costo for elemento_id, _, costo, _ in elementos}
+        ubicaciones = {elemento_id: ubicacion_id for elemento_id, _, _, ubicacion_id in elementos}
+        ids_elementos = list(stock)
+        ahora = timezone.now()
+        total_lotes = max(1, -(-cantidad // self.lote))
+        creados = 0
+
+        for numero_lote in range(total_lotes):
+            tamano = min(self.lote, cantidad - creados)
+            movimientos = []
+            for _ in range(tamano):
+                elemento_id = self.rng.choice(ids_elementos)
+                cantidad_mov = Decimal(self.rng.randint(1, 50))
+
+                # Sólo se genera una salida si hay stock suficiente
+                if stock[elemento_id] >= cantidad_mov and self.rng.random() < 0.45:
+                    tipo = 'SALIDA'
+                    stock[elemento_id] -= cantidad_mov
+                else:
+                    tipo = 'ENTRADA'
+                    stock[elemento_id] += cantidad_mov
+
+                movimientos.append(MovimientoInventario(
+                    elemento_id=elemento_id,
+                    tipo=tipo,
+                    cantidad=cantidad_mov,
+                    precio_unitario=costos[elemento_id],
+                    responsable_id=self.rng.choice(usuarios),
+                    proveedor_id=self.rng.choice(proveedores) if tipo == 'ENTRADA' and proveedores else None,
+                    folio_documento=f"{self.prefijo}-{numero_lote:05d}" if tipo == 'ENTRADA' else None,
+                    referencia=self.rng.choice(UBICACIONES) if tipo == 'SALIDA' else None,
+                    ubicacion_id=ubicaciones[elemento_id],
+                ))
+
+            with transaction.atomic():
+                ultimo_id = MovimientoInventario.objects.aggregate(m=Max('id'))['m'] or 0
+                MovimientoInventario.objects.bulk_create(movimientos)
+                # fecha_movimiento es auto_now_add: se reparte en el tiempo por lote
+                fecha_lote = ahora - timedelta(days=dias * (1 - numero_lote / total_lotes))
+                MovimientoInventario.objects.filter(id__gt=ultimo_id).update(fecha_movimiento=fecha_lote)
+
+            creados += tamano
+            if numero_lote % 20 == 0:
+                self.stdout.write(f"    ... {creados}/{cantidad} movimientos")
+
+        # stock_actual consistente con el historial generado
+        modificado = timezone.now()
+        actualizados = [ElementoInventario(id=i, stock_actual=s, modificado=modificado) for i, s in stock.items()]
+        for lote in self._en_lotes(actualizados):
+            with transaction.atomic():
+                ElementoInventario.objects.bulk_update(lote, ['stock_actual', 'modificado'], batch_size=1000)
+
+        # Todo el stock del elemento queda en su ubicación principal
+        existencias = [
+            ExistenciaUbicacion(elemento_id=i, ubicacion_id=ubicaciones[i], cantidad=s)
+            for i, s in stock.items() if ubicaciones[i] and s > 0
+        ]
+        with transaction.atomic():
+            ExistenciaUbicacion.objects.filter(
+                elemento__descripcion__startswith=f"{self.prefijo} Elemento"
+            ).delete()
+            for lote in self._en_lotes(existencias):
+                ExistenciaUbicacion.objects.bulk_create(lote)
+
+        return range(creados)
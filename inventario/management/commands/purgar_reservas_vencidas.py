@@ -0,0 +1,23 @@
+# inventario/management/commands/purgar_reservas_vencidas.py
+
+from django.core.management.base import BaseCommand
+
+from inventario.reservas import TAMANO_LOTE_PURGA_DEFAULT, purgar_reservas_vencidas
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra las reservas de stock vencidas (carritos abandonados). No cambian "
+        "el disponible, que ya las excluye; evita que se acumulen en la tabla. "
+        "Es seguro ejecutarlo periódicamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=TAMANO_LOTE_PURGA_DEFAULT,
+            help="Reservas por cada DELETE (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        borradas = purgar_reservas_vencidas(tamano_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"Reservas vencidas borradas: {borradas}."))
@@ -0,0 +1,27 @@
+# inventario/management/commands/recalcular_alertas_stock.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventario.alertas import TAMANO_LOTE_DEFAULT, recalcular_alertas
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye AlertaStock (alertas abiertas por umbral mínimo/máximo) "
+        "evaluando los elementos con umbrales. Normalmente se mantiene sola al "
+        "confirmar entradas y salidas; sirve tras cargas masivas o correcciones manuales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=TAMANO_LOTE_DEFAULT,
+                            help="Elementos por transacción (default: %(default)s).")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        abiertas = recalcular_alertas(tamano_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Alertas de stock recalculadas: {abiertas} abiertas "
+            f"en {time.perf_counter() - inicio:.1f}s."
+        ))
@@ -0,0 +1,23 @@
+# inventario/management/commands/recalcular_compras_proveedores.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventario.compras import recalcular_compras
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye CompraMensualProveedor (compras por proveedor y mes) desde "
+        "las ENTRADAS de MovimientoInventario. Normalmente se mantiene sola al "
+        "confirmar entradas; sirve tras cargas masivas o correcciones manuales."
+    )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        filas = recalcular_compras()
+        self.stdout.write(self.style.SUCCESS(
+            f"Compras por proveedor recalculadas: {filas} filas (proveedor, mes) "
+            f"en {time.perf_counter() - inicio:.1f}s."
+        ))
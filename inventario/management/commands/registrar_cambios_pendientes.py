@@ -0,0 +1,18 @@
+# inventario/management/commands/registrar_cambios_pendientes.py
+
+from django.core.management.base import BaseCommand
+
+from inventario.cambios import registrar_faltantes
+
+
+class Command(BaseCommand):
+    help = (
+        "Repara el feed de cambios: numera las filas de RegistroCambio que "
+        "quedaron sin secuencia (un proceso terminó entre la confirmación y la "
+        "asignación) y registra movimientos y elementos sin fila (cargas con "
+        "bulk_create). Es seguro ejecutarlo periódicamente."
+    )
+
+    def handle(self, *args, **options):
+        registrados = registrar_faltantes()
+        self.stdout.write(self.style.SUCCESS(f"Cambios registrados en el feed: {registrados}."))
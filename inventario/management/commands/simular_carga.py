@@ -0,0 +1,164 @@
+# inventario/management/commands/simular_carga.py
+
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmark import formatear_resumen, resumen_tiempos
+from core.models import PerfilUsuario
+from inventario.models import ElementoInventario, MovimientoInventario, Proveedor, ReservaStock
+from inventario.simulacion import simular_usuario
+
+PREFIJO_USUARIO = 'carga_u'
+PASSWORD_SIMULACION = 'Carga-Simulada-2024'
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula usuarios concurrentes que llenan y confirman carritos de "
+        "entradas/salidas contra un servidor en ejecución. Reporta throughput, "
+        "latencias, errores por bloqueo y verifica la consistencia del stock."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help="Servidor a probar; debe usar la misma base de datos que este comando.")
+        parser.add_argument('--usuarios', type=int, default=10, help="Usuarios simulados concurrentes.")
+        parser.add_argument('--ciclos', type=int, default=5, help="Carritos que confirma cada usuario.")
+        parser.add_argument('--items', type=int, default=5, help="Ítems por carrito.")
+        parser.add_argument('--cantidad', default='1', help="Cantidad por ítem.")
+        parser.add_argument('--proporcion-salidas', type=float, default=0.5)
+        parser.add_argument('--elementos', type=int, default=20,
+                            help="Tamaño del conjunto de elementos en disputa (menos = más contención).")
+        parser.add_argument('--modo', choices=('hilos', 'procesos'), default='hilos')
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        elementos = list(
+            ElementoInventario.objects.filter(stock_actual__gt=0)
+            .order_by('id').values_list('id', flat=True)[:options['elementos']]
+        )
+        proveedores = list(Proveedor.objects.order_by('id').values_list('id', flat=True)[:20])
+        if not elementos or not proveedores:
+            raise CommandError("Se requieren elementos con stock y proveedores (ver generar_datos_sinteticos).")
+
+        usernames = self._preparar_usuarios(options['usuarios'])
+        stock_inicial = dict(
+            ElementoInventario.objects.filter(id__in=elementos).values_list('id', 'stock_actual')
+        )
+        ultimo_movimiento = MovimientoInventario.objects.aggregate(m=Max('id'))['m'] or 0
+
+        rutas = {
+            'login': reverse('core:login'),
+            'entradas': reverse('inventario:entradas'),
+            'salidas': reverse('inventario:salidas'),
+        }
+        tareas = [
+            {
+                'url': options['url'], 'rutas': rutas, 'username': username,
+                'password': PASSWORD_SIMULACION, 'ciclos': options['ciclos'],
+                'items': options['items'], 'cantidad': options['cantidad'],
+                'proporcion_salidas': options['proporcion_salidas'],
+                'elementos': elementos, 'proveedores': proveedores,
+                'semilla': options['semilla'] * 1000 + i,
+            }
+            for i, username in enumerate(usernames)
+        ]
+
+        self.stdout.write(
+            f"Simulando {len(tareas)} usuarios ({options['modo']}) x {options['ciclos']} carritos "
+            f"x {options['items']} ítems sobre {len(elementos)} elementos contra {options['url']}..."
+        )
+        ejecutor = ProcessPoolExecutor if options['modo'] == 'procesos' else ThreadPoolExecutor
+        inicio = time.perf_counter()
+        with ejecutor(max_workers=len(tareas)) as pool:
+            resultados = list(pool.map(simular_usuario, tareas))
+        duracion = time.perf_counter() - inicio
+
+        self._reportar(resultados, duracion)
+        self._verificar_consistencia(elementos, stock_inicial, ultimo_movimiento, usernames)
+
+    def _preparar_usuarios(self, cantidad):
+        """Usuarios de simulación reutilizables (sus movimientos los protegen del borrado)."""
+        usernames = [f"{PREFIJO_USUARIO}{i:03d}" for i in range(cantidad)]
+        existentes = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        for username in usernames:
+            if username not in existentes:
+                User.objects.create_user(username, password=PASSWORD_SIMULACION)
+        for user_id in User.objects.filter(username__in=usernames).values_list('id', flat=True):
+            PerfilUsuario.objects.update_or_create(user_id=user_id, defaults={'nivel_acceso': 2})
+        return usernames
+
+    def _reportar(self, resultados, duracion):
+        latencias = {'login': [], 'agregar': [], 'confirmar': []}
+        errores = Counter()
+        detalles = []
+        confirmados = items = rechazos = 0
+        for r in resultados:
+            for operacion, valores in r['latencias'].items():
+                latencias[operacion].extend(valores)
+            errores.update(r['errores'])
+            detalles.extend(r['detalle_errores'])
+            confirmados += r['confirmados']
+            items += r['items_confirmados']
+            rechazos += r['rechazos_carrito']
+
+        intentos = len(latencias['confirmar'])
+        self.stdout.write(f"Duración: {duracion:.2f}s")
+        self.stdout.write(
+            f"Throughput: {confirmados / duracion:.2f} carritos/s, {items / duracion:.2f} ítems/s "
+            f"({confirmados}/{intentos} confirmaciones exitosas)"
+        )
+        for operacion, valores in latencias.items():
+            if valores:
+                self.stdout.write(formatear_resumen(operacion, resumen_tiempos(valores)))
+
+        self.stdout.write(f"Ítems rechazados al agregar (stock reservado/insuficiente): {rechazos}")
+        estilo = self.style.WARNING if errores['bloqueo'] or errores['http'] or errores['otro'] else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"Errores al confirmar: bloqueo={errores['bloqueo']} stock={errores['stock']} "
+            f"otros={errores['otro']} http={errores['http']}"
+        ))
+        for detalle in detalles[:5]:
+            self.stdout.write(f"  - {detalle}")
+
+    def _verificar_consistencia(self, elementos, stock_inicial, ultimo_movimiento, usernames):
+        """stock final == stock inicial + entradas - salidas registradas durante la simulación."""
+        netos = dict(
+            MovimientoInventario.objects.filter(id__gt=ultimo_movimiento, elemento_id__in=elementos)
+            .neto_por_elemento()
+            .values_list('elemento_id', 'neto')
+        )
+        stock_final = dict(
+            ElementoInventario.objects.filter(id__in=elementos).values_list('id', 'stock_actual')
+        )
+
+        inconsistentes = [
+            (elemento_id, stock_inicial[elemento_id], netos.get(elemento_id, Decimal('0')), stock_final[elemento_id])
+            for elemento_id in elementos
+            if stock_inicial[elemento_id] + netos.get(elemento_id, Decimal('0')) != stock_final[elemento_id]
+        ]
+        negativos = [elemento_id for elemento_id in elementos if stock_final[elemento_id] < 0]
+        reservas = ReservaStock.objects.filter(
+            responsable__username__in=usernames, expira__gt=timezone.now()
+        ).count()
+
+        if inconsistentes or negativos:
+            self.stdout.write(self.style.ERROR(
+                f"Stock INCONSISTENTE: {len(inconsistentes)} elementos descuadrados, {len(negativos)} negativos."
+            ))
+            for elemento_id, inicial, neto, final in inconsistentes[:10]:
+                self.stdout.write(f"  - elemento {elemento_id}: {inicial} + {neto} != {final}")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Stock consistente en {len(elementos)} elementos ({len(netos)} con movimientos)."
+            ))
+        if reservas:
+            self.stdout.write(self.style.WARNING(f"Reservas vigentes de usuarios simulados: {reservas}"))
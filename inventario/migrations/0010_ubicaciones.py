@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0009_confirmacionlote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ubicacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('almacen', models.CharField(max_length=60)),
+                ('zona', models.CharField(blank=True, default='', max_length=60)),
+                ('activa', models.BooleanField(default=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['almacen', 'zona'], name='ubicacion_almacen_zona_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='elementoinventario',
+            name='ubicacion_principal',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='elementos', to='inventario.ubicacion'),
+        ),
+        migrations.AddField(
+            model_name='movimientoinventario',
+            name='ubicacion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movimientos', to='inventario.ubicacion'),
+        ),
+        migrations.CreateModel(
+            name='ExistenciaUbicacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('elemento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='existencias', to='inventario.elementoinventario')),
+                ('ubicacion', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='existencias', to='inventario.ubicacion')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ubicacion', 'elemento'], name='existencia_ubicacion_elem_idx')],
+                'constraints': [models.UniqueConstraint(fields=('elemento', 'ubicacion'), name='existencia_elemento_ubicacion_uniq')],
+            },
+        ),
+    ]
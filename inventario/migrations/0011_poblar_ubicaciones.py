@@ -0,0 +1,73 @@
+import re
+
+from django.db import migrations
+
+# Misma regla que inventario.ubicaciones.separar_ubicacion (copiada: las
+# migraciones no deben depender del código actual de la app)
+_SEPARADOR = re.compile(
+    r'\s*[-/,|>]\s*|\s+(?=(?:zona|pasillo|anaquel|estante|rack|nivel|secci[oó]n|area|área)\b)',
+    re.IGNORECASE,
+)
+TAMANO_LOTE = 1000
+
+
+def _separar(texto):
+    nombre = ' '.join((texto or '').split())
+    if not nombre:
+        return None
+    partes = _SEPARADOR.split(nombre, maxsplit=1)
+    zona = partes[1].strip() if len(partes) > 1 else ''
+    return nombre[:100], partes[0].strip()[:60], zona[:60]
+
+
+def poblar_ubicaciones(apps, schema_editor):
+    """
+    Crea una Ubicacion por cada texto distinto de ElementoInventario.ubicacion
+    (sin distinguir mayúsculas ni espacios), la asigna como ubicacion_principal
+    y registra allí el stock_actual de cada elemento.
+    """
+    Ubicacion = apps.get_model('inventario', 'Ubicacion')
+    ElementoInventario = apps.get_model('inventario', 'ElementoInventario')
+    ExistenciaUbicacion = apps.get_model('inventario', 'ExistenciaUbicacion')
+
+    por_clave = {}
+    textos = ElementoInventario.objects.values_list('ubicacion', flat=True).distinct()
+    for texto in textos:
+        separado = _separar(texto)
+        if separado is None:
+            continue
+        nombre, almacen, zona = separado
+        clave = nombre.casefold()
+        if clave not in por_clave:
+            por_clave[clave] = Ubicacion.objects.create(nombre=nombre, almacen=almacen, zona=zona)
+        ElementoInventario.objects.filter(ubicacion=texto).update(ubicacion_principal=por_clave[clave])
+
+    # Todo el stock actual se asume en la ubicación principal del elemento
+    existencias = []
+    elementos = ElementoInventario.objects.filter(
+        ubicacion_principal__isnull=False, stock_actual__gt=0
+    ).values_list('id', 'ubicacion_principal_id', 'stock_actual')
+    for elemento_id, ubicacion_id, stock in elementos.iterator(chunk_size=TAMANO_LOTE):
+        existencias.append(ExistenciaUbicacion(elemento_id=elemento_id, ubicacion_id=ubicacion_id, cantidad=stock))
+        if len(existencias) >= TAMANO_LOTE:
+            ExistenciaUbicacion.objects.bulk_create(existencias)
+            existencias = []
+    ExistenciaUbicacion.objects.bulk_create(existencias)
+
+
+def vaciar_ubicaciones(apps, schema_editor):
+    apps.get_model('inventario', 'ExistenciaUbicacion').objects.all().delete()
+    apps.get_model('inventario', 'MovimientoInventario').objects.update(ubicacion=None)
+    apps.get_model('inventario', 'ElementoInventario').objects.update(ubicacion_principal=None)
+    apps.get_model('inventario', 'Ubicacion').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0010_ubicaciones'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_ubicaciones, vaciar_ubicaciones),
+    ]
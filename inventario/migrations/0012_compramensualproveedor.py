@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0011_poblar_ubicaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompraMensualProveedor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('importe', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('cantidad', models.DecimalField(decimal_places=2, default=0.0, max_digits=14)),
+                ('partidas', models.PositiveIntegerField(default=0)),
+                ('ultima_entrega', models.DateTimeField(blank=True, null=True)),
+                ('proveedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compras_mensuales', to='inventario.proveedor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['mes'], name='compra_mes_idx')],
+                'constraints': [models.UniqueConstraint(fields=('proveedor', 'mes'), name='compra_proveedor_mes_uniq')],
+            },
+        ),
+    ]
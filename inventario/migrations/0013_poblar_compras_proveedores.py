@@ -0,0 +1,48 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def poblar_compras(apps, schema_editor):
+    """Acumula las entradas existentes por proveedor y mes (hora local)."""
+    MovimientoInventario = apps.get_model('inventario', 'MovimientoInventario')
+    CompraMensualProveedor = apps.get_model('inventario', 'CompraMensualProveedor')
+
+    grupos = defaultdict(lambda: [Decimal('0.00'), Decimal('0.00'), 0, None])
+    entradas = MovimientoInventario.objects.filter(
+        tipo='ENTRADA', proveedor__isnull=False
+    ).values_list('proveedor_id', 'fecha_movimiento', 'cantidad', 'precio_unitario')
+    for proveedor_id, fecha, cantidad, precio_unitario in entradas.iterator(chunk_size=5000):
+        grupo = grupos[(proveedor_id, timezone.localtime(fecha).date().replace(day=1))]
+        grupo[0] += cantidad * precio_unitario
+        grupo[1] += cantidad
+        grupo[2] += 1
+        grupo[3] = fecha if grupo[3] is None else max(grupo[3], fecha)
+
+    CompraMensualProveedor.objects.bulk_create(
+        [
+            CompraMensualProveedor(
+                proveedor_id=proveedor_id, mes=mes, importe=importe,
+                cantidad=cantidad, partidas=partidas, ultima_entrega=ultima,
+            )
+            for (proveedor_id, mes), (importe, cantidad, partidas, ultima) in grupos.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def vaciar_compras(apps, schema_editor):
+    apps.get_model('inventario', 'CompraMensualProveedor').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0012_compramensualproveedor'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_compras, vaciar_compras),
+    ]
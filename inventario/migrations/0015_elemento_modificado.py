@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0014_indices_proveedor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='elementoinventario',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='elementoinventario',
+            index=models.Index(fields=['modificado', 'id'], name='elemento_modificado_idx'),
+        ),
+    ]
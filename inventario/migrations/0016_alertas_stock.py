@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0015_elemento_modificado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='elementoinventario',
+            name='stock_maximo',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='elementoinventario',
+            name='stock_minimo',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='AlertaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('BAJO', 'Bajo mínimo'), ('EXCESO', 'Sobre máximo')], max_length=10)),
+                ('stock', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('umbral', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('abierta_en', models.DateTimeField()),
+                ('actualizada_en', models.DateTimeField(auto_now=True)),
+                ('elemento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='alerta_stock', to='inventario.elementoinventario')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['abierta_en', 'id'], name='alerta_abierta_idx'), models.Index(fields=['tipo', 'abierta_en', 'id'], name='alerta_tipo_abierta_idx')],
+            },
+        ),
+    ]
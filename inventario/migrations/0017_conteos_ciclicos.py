@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0016_alertas_stock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConteoCiclico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100)),
+                ('estado', models.CharField(choices=[('ABIERTO', 'Abierto'), ('APLICADO', 'Aplicado'), ('CANCELADO', 'Cancelado')], default='ABIERTO', max_length=10)),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('aplicado_en', models.DateTimeField(blank=True, null=True)),
+                ('aplicado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='conteos_aplicados', to=settings.AUTH_USER_MODEL)),
+                ('clase', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventario.claseinventario')),
+                ('creado_por', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='conteos_creados', to=settings.AUTH_USER_MODEL)),
+                ('ubicacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='inventario.ubicacion')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LineaConteo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('esperado', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('contado', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('contado_en', models.DateTimeField(blank=True, null=True)),
+                ('conteo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lineas', to='inventario.conteociclico')),
+                ('elemento', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='lineas_conteo', to='inventario.elementoinventario')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='conteociclico',
+            index=models.Index(fields=['estado', 'creado_en'], name='conteo_estado_creado_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='lineaconteo',
+            constraint=models.UniqueConstraint(fields=('conteo', 'elemento'), name='linea_conteo_elemento_uniq'),
+        ),
+    ]
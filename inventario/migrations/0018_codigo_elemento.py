@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0017_conteos_ciclicos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='elementoinventario',
+            name='codigo',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+    ]
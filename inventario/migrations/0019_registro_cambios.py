@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:12
+
+from django.db import migrations, models
+from django.utils import timezone
+
+TAMANO_LOTE = 5000
+
+
+def registrar_existentes(apps, schema_editor):
+    """
+    Todo lo existente entra al feed con la secuencia 1, en el orden que el
+    feed anterior usaba (movimientos por id, elementos por modificado e id).
+    """
+    RegistroCambio = apps.get_model('inventario', 'RegistroCambio')
+    VersionDatos = apps.get_model('core', 'VersionDatos')
+    origenes = (
+        ('MOVIMIENTO', apps.get_model('inventario', 'MovimientoInventario').objects.order_by('id')),
+        ('ELEMENTO', apps.get_model('inventario', 'ElementoInventario').objects.order_by('modificado', 'id')),
+    )
+    for tipo, filas in origenes:
+        lote = []
+        for objeto_id in filas.values_list('id', flat=True).iterator(chunk_size=TAMANO_LOTE):
+            lote.append(RegistroCambio(tipo=tipo, objeto_id=objeto_id, secuencia=1))
+            if len(lote) == TAMANO_LOTE:
+                RegistroCambio.objects.bulk_create(lote)
+                lote = []
+        RegistroCambio.objects.bulk_create(lote)
+
+    # Contador de secuencias (inventario.cambios._siguiente_secuencia)
+    VersionDatos.objects.update_or_create(
+        tabla=RegistroCambio._meta.db_table, defaults={'version': 1, 'modificado': timezone.now()},
+    )
+
+
+def vaciar_registro(apps, schema_editor):
+    apps.get_model('core', 'VersionDatos').objects.filter(
+        tabla=apps.get_model('inventario', 'RegistroCambio')._meta.db_table
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0018_codigo_elemento'),
+        ('core', '0004_version_datos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('MOVIMIENTO', 'Movimiento'), ('ELEMENTO', 'Elemento')], max_length=10)),
+                ('objeto_id', models.PositiveBigIntegerField()),
+                ('secuencia', models.PositiveBigIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tipo', 'secuencia', 'id'], name='registro_cambio_secuencia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='registro_cambio_objeto_uniq')],
+            },
+        ),
+        migrations.RunPython(registrar_existentes, vaciar_registro),
+    ]
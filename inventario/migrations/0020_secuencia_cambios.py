@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 21:05
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Fila de core.VersionDatos que la migración 0019 usaba como contador del feed
+TABLA_REGISTRO = 'inventario_registrocambio'
+
+
+def mover_contador(apps, schema_editor):
+    VersionDatos = apps.get_model('core', 'VersionDatos')
+    SecuenciaCambios = apps.get_model('inventario', 'SecuenciaCambios')
+    anterior = VersionDatos.objects.filter(tabla=TABLA_REGISTRO).first()
+    SecuenciaCambios.objects.create(pk=1, ultima=anterior.version if anterior else 1)
+    VersionDatos.objects.filter(tabla=TABLA_REGISTRO).delete()
+
+
+def restaurar_contador(apps, schema_editor):
+    contador = apps.get_model('inventario', 'SecuenciaCambios').objects.filter(pk=1).first()
+    apps.get_model('core', 'VersionDatos').objects.update_or_create(
+        tabla=TABLA_REGISTRO,
+        defaults={'version': contador.ultima if contador else 1, 'modificado': timezone.now()},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0019_registro_cambios'),
+        ('core', '0004_version_datos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaCambios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='registrocambio',
+            name='secuencia',
+            field=models.PositiveBigIntegerField(null=True),
+        ),
+        migrations.RunPython(mover_contador, restaurar_contador),
+    ]
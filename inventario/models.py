@@ -1,5 +1,7 @@
 # inventario/models.py
 from django.db import models
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
 from django.contrib.auth.models import User 
 
 # --- Modelos de Clasificación y Proveedor ---
@@ -32,6 +34,35 @@ class Proveedor(models.Model):
     ) 
     activo = models.BooleanField(default=True, verbose_name="Estado Activo")
 
+    class Meta:
+        indexes = [
+            # Listado paginado por (nombre, id) y búsqueda por prefijo de nombre
+            models.Index(fields=['nombre', 'id'], name='proveedor_nombre_idx'),
+            # Filtro Activos/Inactivos sin perder el orden por nombre
+            models.Index(fields=['activo', 'nombre', 'id'], name='proveedor_activo_nombre_idx'),
+            models.Index(fields=['giro'], name='proveedor_giro_idx'),
+        ]
+
+    def __str__(self):
+        return self.nombre
+
+# --- Modelo de Ubicaciones (Almacén / Zona) ---
+
+class Ubicacion(models.Model):
+    """
+    Ubicación física normalizada: almacén y, opcionalmente, zona/pasillo/anaquel.
+    `nombre` es la etiqueta completa (única) que antes se capturaba como texto libre.
+    """
+    nombre = models.CharField(max_length=100, unique=True)
+    almacen = models.CharField(max_length=60)
+    zona = models.CharField(max_length=60, blank=True, default='')
+    activa = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['almacen', 'zona'], name='ubicacion_almacen_zona_idx'),
+        ]
+
     def __str__(self):
         return self.nombre
 
@@ -41,18 +72,78 @@ class ElementoInventario(models.Model):
     """El maestro de elementos (productos) que se manejan en el sistema."""
     clase = models.ForeignKey(ClaseInventario, on_delete=models.PROTECT)
     descripcion = models.CharField(max_length=250, unique=True)
+    # SKU / código de barras (inventario.codigos); su índice único resuelve un
+    # escaneo en una sola búsqueda. Nulo en elementos aún sin código
+    codigo = models.CharField(max_length=50, unique=True, null=True, blank=True)
     unidad = models.CharField(max_length=10)
     stock_actual = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     
     # Se recomienda mantener NOT NULL si es un campo esencial
     ubicacion = models.CharField(max_length=100) 
+    # Ubicación normalizada de `ubicacion` (texto); las existencias por
+    # ubicación viven en ExistenciaUbicacion
+    ubicacion_principal = models.ForeignKey(
+        Ubicacion,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='elementos',
+    )
     
     costo_unitario = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
 
+    # Umbrales de alerta (inventario.alertas); nulos = sin umbral
+    stock_minimo = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    stock_maximo = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    # Última escritura del elemento. update()/bulk_update() no la asignan
+    # solos: deben incluirla. El orden del feed lo da RegistroCambio.
+    modificado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['modificado', 'id'], name='elemento_modificado_idx'),
+        ]
+
     def __str__(self):
         return self.descripcion
 
 # --- Modelo de Movimientos ---
+
+class MovimientoInventarioQuerySet(models.QuerySet):
+
+    def con_responsable_display(self):
+        """
+        Anota `responsable_display` resuelto en SQL: nombre a mostrar del perfil,
+        luego nombre completo y por último el username. Evita instanciar User
+        por cada fila en listados y exportaciones.
+        """
+        nombre_completo = Trim(Concat(
+            'responsable__first_name', Value(' '), 'responsable__last_name',
+            output_field=models.CharField(),
+        ))
+        return self.annotate(
+            responsable_display=Coalesce(
+                NullIf('responsable__perfilusuario__nombre_visualizacion', Value('')),
+                NullIf(nombre_completo, Value('')),
+                'responsable__username',
+                output_field=models.CharField(),
+            )
+        )
+
+    def neto_por_elemento(self):
+        """
+        Stock neto (entradas - salidas) por elemento en un solo GROUP BY:
+        filas {'elemento_id', 'neto'}. Es el stock_actual esperado según el libro.
+        """
+        return self.values('elemento_id').annotate(
+            neto=Sum(Case(
+                When(tipo='ENTRADA', then=F('cantidad')),
+                default=-F('cantidad'),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            ))
+        ).order_by()
+
     
 class MovimientoInventario(models.Model):
     """Registro de Entradas y Salidas."""
@@ -98,26 +189,36 @@ class MovimientoInventario(models.Model):
         verbose_name="Destino/Referencia de Salida"
     ) 
 
+    # Ubicación donde entró / de donde salió el stock (nula en movimientos
+    # anteriores a las ubicaciones normalizadas)
+    ubicacion = models.ForeignKey(
+        Ubicacion,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='movimientos',
+    )
+
+    objects = MovimientoInventarioQuerySet.as_manager()
+
     # 🚀 MÉTODO PARA PERSONALIZAR EL RESPONSABLE 🚀
     def get_responsable_display(self):
         """
-        Devuelve el nombre personalizado (ej. 'Lizeth') para usuarios específicos, 
-        o el nombre completo del usuario si no hay un mapeo.
+        Devuelve el nombre a mostrar del responsable (PerfilUsuario.nombre_visualizacion),
+        o el nombre completo del usuario si no lo tiene.
+        Si el queryset usó con_responsable_display(), se usa el valor ya calculado en SQL.
         """
-        # Define el mapeo de nombres de usuario a nombres de visualización
-        nombre_mapeado = {
-            'lmartinez': 'Lizeth',
-            'hola': 'hola',
-            'lzamora': 'Juan',
-        }
-        
+        if hasattr(self, 'responsable_display'):
+            return self.responsable_display
+
         username = self.responsable.username
         
-        # 1. Verificar si el username está en el mapeo
-        if username in nombre_mapeado:
-            return nombre_mapeado[username]
+        # 1. Verificar si el perfil define un nombre a mostrar
+        perfil = getattr(self.responsable, 'perfilusuario', None)
+        if perfil is not None and perfil.nombre_visualizacion:
+            return perfil.nombre_visualizacion
             
-        # 2. Si no está en el mapeo, intentar devolver el nombre completo (First Name + Last Name)
+        # 2. Si no lo tiene, intentar devolver el nombre completo (First Name + Last Name)
         full_name = self.responsable.get_full_name()
         if full_name:
             return full_name
@@ -126,4 +227,254 @@ class MovimientoInventario(models.Model):
         return username
 
     def __str__(self):
-        return f"{self.tipo} de {self.elemento.descripcion} ({self.cantidad}) el {self.fecha_movimiento.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"{self.tipo} de {self.elemento.descripcion} ({self.cantidad}) el {self.fecha_movimiento.strftime('%Y-%m-%d')}"
+
+
+# --- Modelo de Existencias por Ubicación ---
+
+class ExistenciaUbicacion(models.Model):
+    """
+    Stock de un elemento en una ubicación. La suma por elemento no supera
+    stock_actual: el stock de elementos sin ubicación no se desglosa.
+    """
+    elemento = models.ForeignKey(
+        ElementoInventario,
+        on_delete=models.CASCADE,
+        related_name='existencias'
+    )
+    ubicacion = models.ForeignKey(
+        Ubicacion,
+        on_delete=models.PROTECT,
+        related_name='existencias'
+    )
+    cantidad = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['elemento', 'ubicacion'], name='existencia_elemento_ubicacion_uniq'),
+        ]
+        indexes = [
+            # Consultas por ubicación ("qué hay en la Zona B")
+            models.Index(fields=['ubicacion', 'elemento'], name='existencia_ubicacion_elem_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.elemento_id} en {self.ubicacion_id}: {self.cantidad}"
+
+
+# --- Modelo de Alertas de Stock ---
+
+class AlertaStock(models.Model):
+    """
+    Alerta abierta de un elemento fuera de sus umbrales (bajo el mínimo o
+    sobre el máximo). La fila sólo existe mientras la alerta está abierta:
+    inventario.alertas la crea, actualiza o borra al cambiar el stock.
+    """
+    TIPO_CHOICES = (
+        ('BAJO', 'Bajo mínimo'),
+        ('EXCESO', 'Sobre máximo'),
+    )
+    elemento = models.OneToOneField(
+        ElementoInventario,
+        on_delete=models.CASCADE,
+        related_name='alerta_stock'
+    )
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    stock = models.DecimalField(max_digits=10, decimal_places=2)
+    umbral = models.DecimalField(max_digits=10, decimal_places=2)
+    abierta_en = models.DateTimeField()
+    actualizada_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Listado y widget: más recientes primero, con o sin filtro por tipo
+            models.Index(fields=['abierta_en', 'id'], name='alerta_abierta_idx'),
+            models.Index(fields=['tipo', 'abierta_en', 'id'], name='alerta_tipo_abierta_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} de {self.elemento_id}: {self.stock} (umbral {self.umbral})"
+
+
+# --- Modelos de Conteo Cíclico ---
+
+class ConteoCiclico(models.Model):
+    """
+    Sesión de conteo físico. Al crearse congela el stock esperado de los
+    elementos elegidos (una LineaConteo por elemento); al aplicarse registra
+    las diferencias como movimientos de ajuste (inventario.conteos).
+    """
+    ESTADO_CHOICES = (
+        ('ABIERTO', 'Abierto'),
+        ('APLICADO', 'Aplicado'),
+        ('CANCELADO', 'Cancelado'),
+    )
+    nombre = models.CharField(max_length=100)
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='ABIERTO')
+
+    # Criterios de selección (nulos = todo el catálogo)
+    clase = models.ForeignKey(ClaseInventario, on_delete=models.SET_NULL, null=True, blank=True)
+    ubicacion = models.ForeignKey(Ubicacion, on_delete=models.SET_NULL, null=True, blank=True)
+
+    creado_por = models.ForeignKey(User, on_delete=models.PROTECT, related_name='conteos_creados')
+    creado_en = models.DateTimeField(auto_now_add=True)
+    aplicado_por = models.ForeignKey(
+        User, on_delete=models.PROTECT, null=True, blank=True, related_name='conteos_aplicados'
+    )
+    aplicado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'creado_en'], name='conteo_estado_creado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Conteo {self.id}: {self.nombre} ({self.estado})"
+
+
+class LineaConteo(models.Model):
+    """Elemento de una sesión: stock esperado (congelado) y cantidad contada."""
+    conteo = models.ForeignKey(ConteoCiclico, on_delete=models.CASCADE, related_name='lineas')
+    elemento = models.ForeignKey(ElementoInventario, on_delete=models.PROTECT, related_name='lineas_conteo')
+    esperado = models.DecimalField(max_digits=10, decimal_places=2)
+    contado = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    contado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # También es el índice del listado por sesión (conteo, elemento)
+            models.UniqueConstraint(fields=['conteo', 'elemento'], name='linea_conteo_elemento_uniq'),
+        ]
+
+    @property
+    def diferencia(self):
+        """contado - esperado; None mientras no se cuente."""
+        if self.contado is None:
+            return None
+        return self.contado - self.esperado
+
+    def __str__(self):
+        return f"{self.elemento_id} en conteo {self.conteo_id}: {self.contado} / {self.esperado}"
+
+
+# --- Modelo de Compras Agregadas por Proveedor ---
+
+class CompraMensualProveedor(models.Model):
+    """
+    Entradas agregadas por proveedor y mes (primer día del mes, hora local).
+    Se actualiza al confirmar entradas (inventario.compras) para que la
+    analítica de proveedores no recorra MovimientoInventario.
+    """
+    proveedor = models.ForeignKey(
+        Proveedor,
+        on_delete=models.CASCADE,
+        related_name='compras_mensuales'
+    )
+    mes = models.DateField()
+    importe = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    cantidad = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
+    partidas = models.PositiveIntegerField(default=0)
+    ultima_entrega = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['proveedor', 'mes'], name='compra_proveedor_mes_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['mes'], name='compra_mes_idx'),
+        ]
+
+    def __str__(self):
+        return f"Compras de {self.proveedor_id} en {self.mes:%Y-%m}: {self.importe}"
+
+
+# --- Modelo de Reservas de Stock (Carrito de Salidas) ---
+
+class ReservaStock(models.Model):
+    """
+    Apartado temporal de stock para una línea del carrito de salidas.
+    Disponible = stock_actual - reservas vigentes (expira > ahora).
+    """
+    elemento = models.ForeignKey(
+        ElementoInventario,
+        on_delete=models.CASCADE,
+        related_name='reservas'
+    )
+    cantidad = models.DecimalField(max_digits=10, decimal_places=2)
+    responsable = models.ForeignKey(User, on_delete=models.CASCADE)
+    creada = models.DateTimeField(auto_now_add=True)
+    expira = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['elemento', 'expira'], name='reserva_elemento_expira_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reserva de {self.cantidad} ({self.elemento_id}) hasta {self.expira:%Y-%m-%d %H:%M}"
+
+
+# --- Modelo de Confirmaciones Idempotentes (Entradas/Salidas) ---
+
+class ConfirmacionLote(models.Model):
+    """
+    Registro de cada confirmación de carrito, identificada por la clave
+    emitida junto con el carrito. El índice único sobre `clave` impide que un
+    doble envío del formulario vuelva a registrar los movimientos.
+    """
+    clave = models.CharField(max_length=64, unique=True)
+    tipo = models.CharField(max_length=10, choices=MovimientoInventario.TIPO_MOVIMIENTO_CHOICES)
+    responsable = models.ForeignKey(User, on_delete=models.CASCADE)
+    items_procesados = models.PositiveIntegerField(default=0)
+    mensaje = models.CharField(max_length=255, blank=True, default='')
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Confirmación {self.tipo} {self.clave} ({self.items_procesados} ítems)"
+
+
+# --- Modelo del Registro de Cambios (Feed para el ERP) ---
+
+class RegistroCambio(models.Model):
+    """
+    Posición de un movimiento o elemento en el feed de cambios
+    (inventario.cambios). La fila se escribe sin secuencia en la transacción
+    del cambio; `secuencia` se asigna al confirmarse, bajo el bloqueo de
+    SecuenciaCambios: las secuencias se vuelven visibles en orden, sin huecos
+    que otra transacción llene después. Un elemento tiene una sola fila, que
+    avanza con cada cambio.
+    """
+    TIPO_CHOICES = (
+        ('MOVIMIENTO', 'Movimiento'),
+        ('ELEMENTO', 'Elemento'),
+    )
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    objeto_id = models.PositiveBigIntegerField()
+    # Nula mientras el cambio espera su secuencia (inventario.cambios)
+    secuencia = models.PositiveBigIntegerField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='registro_cambio_objeto_uniq'),
+        ]
+        indexes = [
+            # Recorrido del feed: (secuencia, id) posterior al cursor
+            models.Index(fields=['tipo', 'secuencia', 'id'], name='registro_cambio_secuencia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.objeto_id} en {self.secuencia}"
+
+
+class SecuenciaCambios(models.Model):
+    """
+    Contador del feed de cambios (inventario.cambios): una sola fila cuyo
+    bloqueo ordena la asignación de secuencias. Es independiente de
+    core.VersionDatos, que sólo versiona la caché de datos.
+    """
+    UNICA = 1
+
+    ultima = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Feed de cambios en {self.ultima}"
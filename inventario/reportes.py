@@ -0,0 +1,301 @@
+# inventario/reportes.py
+"""
+Generación de archivos de reporte (XLSX/CSV). Se importa de forma diferida
+desde las vistas de reportes para que openpyxl no se cargue al arrancar cada
+worker ni en los comandos de gestión que no generan reportes.
+"""
+
+import csv
+import os
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from openpyxl import Workbook
+
+# --- FUNCIÓN AUXILIAR PARA GENERAR EXCEL Y GUARDAR (¡CORREGIDA!) ---
+
+def generar_excel_y_guardar(reporte_data, tipo_reporte):
+
+    """Genera un archivo XLSX, lo GUARDA en el disco (MEDIA_ROOT/reports)
+
+    y retorna el nombre del archivo generado. """
+
+    try:
+
+        REPORTS_DIR = os.path.join(settings.MEDIA_ROOT, 'reports')
+
+        # Asegurarse de que el directorio de reportes exista
+
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+
+        workbook = Workbook()
+
+        sheet = workbook.active
+
+        sheet.title = "Inventario General"
+
+        # Encabezados SOLICITADOS: ID, Clase, Descripción, Unidad, Existencia, Costo
+
+        headers = [
+
+            "ID", "Clase", "Descripción", "Unidad", "Existencia", "Costo"
+
+        ]
+
+        sheet.append(headers)
+
+
+        # Llenar datos
+
+        for item in reporte_data:
+
+            # Uso de Decimal para manejar stock y costo, evitando None
+
+            stock = item.stock_actual if item.stock_actual is not None else Decimal('0.00')
+
+            costo = item.costo_unitario if item.costo_unitario is not None else Decimal('0.00')
+
+           
+
+            # Fila de datos con el orden y campos deseados (6 columnas)
+
+            row = [
+
+                item.id,
+
+                item.clase.nombre, # Clase
+
+                item.descripcion, # Descripción
+
+                item.unidad, # Unidad
+
+                float(stock), # Existencia (Stock Actual)
+
+                float(costo), # Costo (Costo Unitario)
+
+            ]
+
+            sheet.append(row)
+
+
+
+        # 1. Generar nombre de archivo
+
+        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+
+        filename = f"{tipo_reporte.replace(' ', '_')}_{timestamp}.xlsx"
+
+        file_path = os.path.join(REPORTS_DIR, filename)
+
+
+        # 2. Guardar el libro directamente en la ruta del disco
+
+        workbook.save(file_path)
+
+        return filename
+
+    except Exception as e:
+
+        # Esto imprimirá el error exacto si ocurre uno, ayudando a la depuración.
+
+        print(f"Error al guardar el archivo de Excel: {e}")
+
+        return None 
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+
+# --- FUNCIÓN AUXILIAR PARA GENERAR CSV DE INVENTARIO Y GUARDAR ---
+def generar_csv_y_guardar(reporte_data, tipo_reporte):
+    """Genera un archivo CSV, lo GUARDA en el disco (MEDIA_ROOT/reports)
+    y retorna el nombre del archivo generado.
+    """
+    try:
+        REPORTS_DIR = os.path.join(settings.MEDIA_ROOT, 'reports')
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        
+        # 1. Generar nombre de archivo
+        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+        # Cambiamos la extensión a .csv
+        filename = f"{tipo_reporte.replace(' ', '_')}_{timestamp}.csv"
+        file_path = os.path.join(REPORTS_DIR, filename)
+
+        # 2. Definir encabezados (igual que el XLSX)
+        headers = [
+            "ID", "Clase", "Descripcion", "Unidad", "Existencia", "Costo"
+        ]
+        
+        # 3. Escribir el archivo CSV
+        # Usamos 'w' y 'newline=""' y 'encoding="utf-8"' para compatibilidad
+        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+            # Usamos el delimitador de coma estándar
+            writer = csv.writer(csvfile)
+            
+            # Escribir encabezados
+            writer.writerow(headers)
+            
+            # Escribir datos
+            for item in reporte_data:
+                stock = item.stock_actual if item.stock_actual is not None else Decimal('0.00')
+                costo = item.costo_unitario if item.costo_unitario is not None else Decimal('0.00')
+                
+                # Fila de datos (similar a XLSX)
+                row = [
+                    item.id,
+                    item.clase.nombre,
+                    item.descripcion,
+                    item.unidad,
+                    float(stock),
+                    float(costo),
+                ]
+                writer.writerow(row)
+                
+        return filename
+
+    except Exception as e:
+        # Aquí también es vital imprimir el error si ocurre
+        print(f"Error al guardar el archivo CSV de Inventario: {e}")
+        return None
+        
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+
+
+# --- FUNCIÓN AUXILIAR PARA GENERAR EXCEL DE MOVIMIENTOS Y GUARDAR (FORMATO SIMPLIFICADO) ---
+
+
+def generar_excel_movimientos_y_guardar(movimientos_data):
+    """Genera un archivo XLSX para movimientos con formato simplificado: 
+    Fecha, Ubicación, Destino/Referencia, Cantidad.
+    """
+    
+    tipo_reporte = "Reporte_de_Movimientos_Simplificado" # Usamos underscores directamente
+
+    try:
+        REPORTS_DIR = os.path.join(settings.MEDIA_ROOT, 'reports')
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.title = "Movimientos Simples"
+        
+        # 1. ENCABEZADOS DESEADOS
+        headers = [
+            "Fecha", 
+            "Ubicación (Almacén)", 
+            "Destino/Referencia", 
+            "Elemento", 
+            "Cantidad",
+            "Responsable"
+        ]
+        sheet.append(headers)
+
+        # Llenar datos
+        for item in movimientos_data:
+            
+            # Verificación de la relación crítica
+            elemento_descripcion = item.elemento.descripcion if item.elemento else "Elemento Desconocido"
+            elemento_ubicacion = item.elemento.ubicacion if item.elemento and item.elemento.ubicacion else "N/A"
+
+            # Conversión y manejo de Nulos
+            cantidad = item.cantidad if item.cantidad is not None else Decimal('0.00')
+            fecha_str = item.fecha_movimiento.strftime('%Y-%m-%d %H:%M:%S') if item.fecha_movimiento else ""
+            
+            # Formatear la cantidad para indicar ENTRADA o SALIDA
+            if item.tipo == 'SALIDA':
+                # Si es salida, la cantidad es negativa
+                cantidad_formateada = float(cantidad) * -1
+            else:
+                # Si es entrada, la cantidad es positiva
+                cantidad_formateada = float(cantidad)
+            
+            # 2. FILA DE DATOS
+            row = [
+                fecha_str,                             
+                elemento_ubicacion,                    # Ubicación (Manejada para evitar None)
+                item.referencia or "",                 # Destino/Referencia
+                elemento_descripcion,                  # Elemento (Manejada para evitar None)
+                cantidad_formateada,
+                item.responsable_display,              # Responsable (resuelto en SQL)
+            ]
+            sheet.append(row)
+
+        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"{tipo_reporte}_{timestamp}.xlsx"
+        file_path = os.path.join(REPORTS_DIR, filename)
+
+        workbook.save(file_path)
+        return filename
+
+    except Exception as e:
+        # Esto imprimirá el error exacto en tu consola de Django
+        print(f"Error fatal al generar el Excel de Movimientos: {e}") 
+        return None
+    
+
+# -----------------------------------------------------------------------------
+# -----------------------------------------------------------------------------
+
+# --- FUNCIÓN AUXILIAR PARA GENERAR CSV DE MOVIMIENTOS Y GUARDAR ---
+def generar_csv_movimientos_y_guardar(movimientos_data):
+    """Genera un archivo CSV para movimientos con formato simplificado:
+    Fecha, Ubicación, Destino/Referencia, Cantidad.
+    """
+    tipo_reporte = "Reporte_de_Movimientos_Simplificado"
+
+    try:
+        REPORTS_DIR = os.path.join(settings.MEDIA_ROOT, 'reports')
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        
+        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+        # Cambiamos la extensión a .csv
+        filename = f"{tipo_reporte}_{timestamp}.csv"
+        file_path = os.path.join(REPORTS_DIR, filename)
+
+        # 1. ENCABEZADOS DESEADOS
+        headers = [
+            "Fecha",
+            "Ubicacion (Almacen)",
+            "Destino/Referencia",
+            "Elemento",
+            "Cantidad",
+            "Responsable"
+        ]
+        
+        # 2. Escribir el archivo CSV
+        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(headers)
+
+            # Llenar datos
+            for item in movimientos_data:
+                elemento_descripcion = item.elemento.descripcion if item.elemento else "Elemento Desconocido"
+                # 🚨 CORRECCIÓN APLICADA: Forzar a cadena la relación 'ubicacion' para el CSV writer
+                elemento_ubicacion = str(item.elemento.ubicacion) if item.elemento and item.elemento.ubicacion else "N/A"
+                
+                cantidad = item.cantidad if item.cantidad is not None else Decimal('0.00')
+                fecha_str = item.fecha_movimiento.strftime('%Y-%m-%d %H:%M:%S') if item.fecha_movimiento else ""
+                
+                if item.tipo == 'SALIDA':
+                    cantidad_formateada = float(cantidad) * -1
+                else:
+                    cantidad_formateada = float(cantidad)
+                
+                # 3. FILA DE DATOS
+                row = [
+                    fecha_str,
+                    elemento_ubicacion,
+                    item.referencia or "",
+                    elemento_descripcion,
+                    cantidad_formateada,
+                    item.responsable_display,
+                ]
+                writer.writerow(row)
+
+        return filename
+
+    except Exception as e:
+        # 🚨 DEBUG CRÍTICO: Imprimir el error
+        print(f"Error fatal al generar el CSV de Movimientos: {e}")
+        return None
@@ -0,0 +1,129 @@
+# inventario/reservas.py
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ElementoInventario, ReservaStock
+
+# Minutos que una línea del carrito de salidas mantiene apartado el stock.
+MINUTOS_RESERVA_DEFAULT = 30
+# Reservas vencidas borradas por cada DELETE en la purga periódica
+TAMANO_LOTE_PURGA_DEFAULT = 1000
+
+
+class StockInsuficiente(Exception):
+    """Se lanza cuando la cantidad solicitada supera el stock disponible."""
+
+    def __init__(self, elemento, disponible, solicitado):
+        self.elemento = elemento
+        self.disponible = disponible
+        self.solicitado = solicitado
+        super().__init__(
+            f"Stock insuficiente para '{elemento.descripcion}'. "
+            f"Disponible: {disponible}, Solicitado: {solicitado}."
+        )
+
+
+def _duracion_reserva():
+    minutos = getattr(settings, 'RESERVA_STOCK_MINUTOS', MINUTOS_RESERVA_DEFAULT)
+    return timedelta(minutes=minutos)
+
+
+def _reservado_subquery(ahora, excluir_ids=None):
+    """Subconsulta con la suma de reservas vigentes por elemento."""
+    reservas = ReservaStock.objects.filter(
+        elemento=OuterRef('pk'),
+        expira__gt=ahora,
+    )
+    if excluir_ids:
+        reservas = reservas.exclude(pk__in=excluir_ids)
+
+    return Subquery(
+        reservas.values('elemento').annotate(total=Sum('cantidad')).values('total')[:1],
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def anotar_disponible(queryset, excluir_ids=None):
+    """
+    Anota cada elemento con `stock_reservado` y `stock_disponible`
+    (stock_actual - reservas vigentes) en una sola consulta.
+    """
+    cero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=10, decimal_places=2))
+    reservado = Coalesce(_reservado_subquery(timezone.now(), excluir_ids), cero)
+    return queryset.annotate(
+        stock_reservado=reservado,
+    ).annotate(
+        stock_disponible=Coalesce('stock_actual', cero) - reservado,
+    )
+
+
+def reservar_stock(elemento_id, cantidad, usuario):
+    """
+    Crea una reserva temporal para una línea del carrito de salidas.
+
+    El elemento se bloquea sólo durante la validación, de modo que dos carritos
+    no puedan apartar el mismo stock a la vez. Retorna (reserva, elemento).
+    """
+    with transaction.atomic():
+        elemento = anotar_disponible(
+            ElementoInventario.objects.select_for_update()
+        ).get(pk=elemento_id)
+
+        # Las reservas vencidas de este elemento ya no cuentan; se limpian aquí
+        # aprovechando el índice (elemento, expira).
+        ReservaStock.objects.filter(elemento=elemento, expira__lte=timezone.now()).delete()
+
+        if cantidad > elemento.stock_disponible:
+            raise StockInsuficiente(elemento, elemento.stock_disponible, cantidad)
+
+        reserva = ReservaStock.objects.create(
+            elemento=elemento,
+            cantidad=cantidad,
+            responsable=usuario,
+            expira=timezone.now() + _duracion_reserva(),
+        )
+    return reserva, elemento
+
+
+def liberar_reservas(ids_reserva, usuario):
+    """Elimina las reservas indicadas (p. ej. al quitar una línea del carrito)."""
+    ids = [i for i in ids_reserva if i]
+    if ids:
+        ReservaStock.objects.filter(pk__in=ids, responsable=usuario).delete()
+
+
+def purgar_reservas_vencidas(tamano_lote=TAMANO_LOTE_PURGA_DEFAULT):
+    """
+    Borra las reservas vencidas de todos los elementos, en lotes por pk para
+    no bloquear la tabla en un solo DELETE. Las vencidas ya no cuentan en el
+    disponible (expira > ahora); esto sólo evita que se acumulen las de
+    elementos que nadie vuelve a reservar. Retorna cuántas se borraron.
+    """
+    ahora = timezone.now()
+    borradas = 0
+    while True:
+        ids = list(
+            ReservaStock.objects.filter(expira__lte=ahora).values_list('pk', flat=True)[:tamano_lote]
+        )
+        if not ids:
+            return borradas
+        borradas += ReservaStock.objects.filter(pk__in=ids).delete()[0]
+
+
+def disponible_para_confirmar(elemento_id, ids_propios):
+    """
+    Stock disponible para una confirmación: descuenta las reservas vigentes de
+    otros carritos pero no las del propio (que se van a consumir).
+    Debe llamarse dentro de una transacción; bloquea la fila del elemento.
+    """
+    return anotar_disponible(
+        ElementoInventario.objects.select_for_update(),
+        excluir_ids=ids_propios,
+    ).get(pk=elemento_id)
@@ -0,0 +1,54 @@
+# inventario/signals.py
+
+from django.db.models.signals import post_delete, post_save
+
+from core.cache_datos import invalidar_tablas
+from .cambios import ELEMENTO, MOVIMIENTO, registrar_cambios
+from .compras import descontar_compra
+from .models import (
+    ClaseInventario, ElementoInventario, ExistenciaUbicacion, MovimientoInventario, Proveedor, Ubicacion,
+)
+
+# Modelos cuyas escrituras invalidan los datos cacheados del inventario.
+# bulk_create/update() no emiten señales: quien los use debe llamar a invalidar_tablas().
+MODELOS_VERSIONADOS = (
+    ClaseInventario, ElementoInventario, MovimientoInventario, Proveedor, Ubicacion, ExistenciaUbicacion,
+)
+
+
+def invalidar_version_de_tabla(sender, raw=False, **kwargs):
+    if not raw:
+        invalidar_tablas(sender._meta.db_table)
+
+
+for modelo in MODELOS_VERSIONADOS:
+    post_save.connect(invalidar_version_de_tabla, sender=modelo, dispatch_uid=f'version_{modelo._meta.db_table}_save')
+    post_delete.connect(invalidar_version_de_tabla, sender=modelo, dispatch_uid=f'version_{modelo._meta.db_table}_delete')
+
+
+# Feed de cambios para el ERP (inventario.cambios): la secuencia se asigna al
+# confirmar. bulk_create/update() deben llamar a registrar_cambios() a mano.
+
+def registrar_movimiento(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        registrar_cambios(MOVIMIENTO, [instance.pk])
+
+
+def registrar_elemento(sender, instance, raw=False, **kwargs):
+    if not raw:
+        registrar_cambios(ELEMENTO, [instance.pk])
+
+
+post_save.connect(registrar_movimiento, sender=MovimientoInventario, dispatch_uid='cambios_movimiento_save')
+post_save.connect(registrar_elemento, sender=ElementoInventario, dispatch_uid='cambios_elemento_save')
+
+
+# Analítica de proveedores (inventario.compras): una entrada borrada se
+# descuenta de su mes para que el agregado siga igual a recalcular_compras()
+
+def descontar_entrada(sender, instance, **kwargs):
+    if instance.tipo == 'ENTRADA':
+        descontar_compra(instance.proveedor_id, instance.cantidad, instance.precio_unitario, instance.fecha_movimiento)
+
+
+post_delete.connect(descontar_entrada, sender=MovimientoInventario, dispatch_uid='compras_movimiento_delete')
@@ -0,0 +1,160 @@
+# inventario/simulacion.py
+"""
+Usuario simulado para pruebas de carga contra un servidor real (runserver,
+gunicorn...). Sólo usa la biblioteca estándar para poder ejecutarse tanto en
+hilos como en procesos hijos sin inicializar Django.
+"""
+
+import html
+import http.cookiejar
+import random
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+_PATRON_CLAVE = re.compile(r'name="clave_confirmacion"\s+value="([^"]*)"')
+_PATRON_MENSAJE = re.compile(r'class="alert alert-([\w ]+)"[^>]*>(.*?)</li>', re.S)
+
+# Textos de error del motor cuando una transacción espera o pierde un bloqueo
+_ERRORES_BLOQUEO = ('lock wait', 'deadlock', 'database is locked', '1205', '1213')
+
+
+class _SinRedireccion(urllib.request.HTTPRedirectHandler):
+    """Permite medir el POST por sí solo; la redirección se sigue aparte."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class SesionSimulada:
+    """Navegador mínimo: cookies de sesión y token CSRF de Django."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _SinRedireccion,
+        )
+
+    def _csrf(self):
+        return next((c.value for c in self.cookies if c.name == 'csrftoken'), '')
+
+    def _abrir(self, solicitud):
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(solicitud, timeout=self.timeout) as respuesta:
+                cuerpo = respuesta.read().decode('utf-8', 'replace')
+                estado = respuesta.status
+        except urllib.error.HTTPError as e:
+            # Las redirecciones no seguidas también llegan aquí (302)
+            cuerpo = e.read().decode('utf-8', 'replace')
+            estado = e.code
+        return estado, cuerpo, (time.perf_counter() - inicio) * 1000
+
+    def get(self, ruta):
+        return self._abrir(urllib.request.Request(self.base_url + ruta))
+
+    def post(self, ruta, datos):
+        datos = {**datos, 'csrfmiddlewaretoken': self._csrf()}
+        solicitud = urllib.request.Request(
+            self.base_url + ruta,
+            data=urllib.parse.urlencode(datos).encode(),
+            headers={'Referer': self.base_url + ruta},
+        )
+        return self._abrir(solicitud)
+
+
+def _mensajes(cuerpo):
+    return [(tipo.strip(), html.unescape(texto).strip()) for tipo, texto in _PATRON_MENSAJE.findall(cuerpo)]
+
+
+def _clasificar_error(texto):
+    texto = texto.lower()
+    if any(patron in texto for patron in _ERRORES_BLOQUEO):
+        return 'bloqueo'
+    if 'stock' in texto:
+        return 'stock'
+    return 'otro'
+
+
+def simular_usuario(parametros):
+    """
+    Ejecuta los ciclos de un usuario simulado: login, llenado del carrito con
+    POST a gestion_entradas / gestion_salidas y confirmación. Retorna un dict
+    con latencias (ms) por operación y contadores de resultados.
+    """
+    rng = random.Random(parametros['semilla'])
+    sesion = SesionSimulada(parametros['url'])
+    rutas = parametros['rutas']
+    resultado = {
+        'latencias': {'login': [], 'agregar': [], 'confirmar': []},
+        'confirmados': 0, 'items_confirmados': 0, 'rechazos_carrito': 0,
+        'errores': {'bloqueo': 0, 'stock': 0, 'otro': 0, 'http': 0},
+        'detalle_errores': [],
+    }
+
+    def error(tipo, detalle):
+        resultado['errores'][tipo] += 1
+        if len(resultado['detalle_errores']) < 5:
+            resultado['detalle_errores'].append(detalle[:200])
+
+    sesion.get(rutas['login'])
+    estado, _, ms = sesion.post(rutas['login'], {
+        'username': parametros['username'], 'password': parametros['password'],
+    })
+    resultado['latencias']['login'].append(ms)
+    if estado != 302:
+        error('http', f"login HTTP {estado}")
+        return resultado
+
+    for _ in range(parametros['ciclos']):
+        tipo = 'salidas' if rng.random() < parametros['proporcion_salidas'] else 'entradas'
+        ruta = rutas[tipo]
+
+        for elemento_id in rng.sample(parametros['elementos'], min(parametros['items'], len(parametros['elementos']))):
+            datos = {'agregar_item': '1', 'descripcion': elemento_id, 'cantidad': parametros['cantidad']}
+            if tipo == 'entradas':
+                datos['proveedor_id'] = rng.choice(parametros['proveedores'])
+            else:
+                datos['destino_referencia'] = 'Simulación de carga'
+            estado, _, ms = sesion.post(ruta, datos)
+            resultado['latencias']['agregar'].append(ms)
+            if estado != 302:
+                error('http', f"agregar {tipo} HTTP {estado}")
+
+        # El GET muestra los rechazos al agregar y trae la clave del lote
+        estado, cuerpo, _ = sesion.get(ruta)
+        resultado['rechazos_carrito'] += sum(1 for nivel, _ in _mensajes(cuerpo) if 'error' in nivel)
+        clave = _PATRON_CLAVE.search(cuerpo)
+        items_carrito = cuerpo.count('name="item_index"')
+        if items_carrito == 0:
+            continue
+
+        estado, _, ms = sesion.post(ruta, {
+            f'confirmar_{tipo}': '1', 'clave_confirmacion': clave.group(1) if clave else '',
+        })
+        resultado['latencias']['confirmar'].append(ms)
+        confirmado = False
+        if estado != 302:
+            error('http', f"confirmar {tipo} HTTP {estado}")
+            cuerpo = ''
+        else:
+            _, cuerpo, _ = sesion.get(ruta)
+
+        for nivel, texto in _mensajes(cuerpo):
+            if 'success' in nivel:
+                confirmado = True
+                resultado['confirmados'] += 1
+                resultado['items_confirmados'] += items_carrito
+            elif 'error' in nivel:
+                error(_clasificar_error(texto), texto)
+
+        if not confirmado:
+            # Un carrito rechazado se vacía para no arrastrarlo al siguiente ciclo
+            for _ in range(items_carrito):
+                sesion.post(ruta, {'eliminar_item': '1', 'item_index': 0})
+
+    return resultado
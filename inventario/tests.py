@@ -1,3 +1,775 @@
-from django.test import TestCase
+# inventario/tests.py
 
-# Create your tests here.
+import json
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from core.models import VersionDatos
+from core.paginacion import codificar_cursor, paginar_por_clave
+from . import cambios
+from .cambios import MOVIMIENTO, CursorInvalido, asignar_secuencia, como_dict, pagina_elementos, pagina_movimientos
+from .models import (
+    ClaseInventario, CompraMensualProveedor, ConfirmacionLote, ConteoCiclico, ElementoInventario,
+    ExistenciaUbicacion, LineaConteo, MovimientoInventario, Proveedor, RegistroCambio, ReservaStock,
+    SecuenciaCambios, Ubicacion,
+)
+from .compras import ORDENES_PROVEEDORES, recalcular_compras
+from .conciliacion import Diferencia, confirmar_diferencias
+from .codigos import CodigoInvalido, asignar_codigos, normalizar_codigo
+from .conteos import aplicar_conteo, crear_conteo
+from .reservas import StockInsuficiente, anotar_disponible, disponible_para_confirmar, reservar_stock
+
+
+# Las vistas renderizan {% static %}: sin collectstatic no hay manifiesto
+SIN_MANIFIESTO = override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+def _crear_elemento(descripcion='Guantes de nitrilo', stock='10.00', **extra):
+    clase = extra.pop('clase', None) or ClaseInventario.objects.get_or_create(nombre='Material de Limpieza')[0]
+    return ElementoInventario.objects.create(
+        clase=clase, descripcion=descripcion, unidad='PZA', ubicacion='',
+        stock_actual=Decimal(stock), **extra,
+    )
+
+
+def _crear_usuario(username='almacen', nivel=3):
+    # El PerfilUsuario se crea por señal con el nivel por defecto
+    usuario = User.objects.create_user(username=username, password='clave-de-prueba')
+    usuario.perfilusuario.nivel_acceso = nivel
+    usuario.perfilusuario.save()
+    return usuario
+
+
+# =======================================================
+# RESERVAS DE STOCK (CARRITO DE SALIDAS)
+# =======================================================
+
+@SIN_MANIFIESTO
+class ReservasStockTests(TestCase):
+
+    def setUp(self):
+        self.elemento = _crear_elemento()
+        self.usuario = _crear_usuario()
+        self.otro = _crear_usuario('otro_almacen')
+
+    def _disponible(self):
+        return anotar_disponible(ElementoInventario.objects.all()).get(pk=self.elemento.pk).stock_disponible
+
+    def test_disponible_descuenta_reservas_vigentes(self):
+        reservar_stock(self.elemento.pk, Decimal('4'), self.usuario)
+        reservar_stock(self.elemento.pk, Decimal('3'), self.otro)
+        self.assertEqual(self._disponible(), Decimal('3.00'))
+
+    def test_no_se_reserva_mas_que_lo_disponible(self):
+        reservar_stock(self.elemento.pk, Decimal('8'), self.otro)
+        with self.assertRaises(StockInsuficiente):
+            reservar_stock(self.elemento.pk, Decimal('3'), self.usuario)
+        self.assertEqual(ReservaStock.objects.count(), 1)
+
+    def test_reservas_vencidas_no_cuentan_y_se_limpian(self):
+        reserva, _ = reservar_stock(self.elemento.pk, Decimal('8'), self.otro)
+        ReservaStock.objects.filter(pk=reserva.pk).update(expira=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self._disponible(), Decimal('10.00'))
+
+        reservar_stock(self.elemento.pk, Decimal('9'), self.usuario)
+        self.assertFalse(ReservaStock.objects.filter(pk=reserva.pk).exists())
+
+    def test_una_reserva_vencida_no_retiene_stock_al_confirmar(self):
+        # Nadie vuelve a reservar el elemento: la fila vencida sigue en la tabla
+        reserva, _ = reservar_stock(self.elemento.pk, Decimal('8'), self.otro)
+        ReservaStock.objects.filter(pk=reserva.pk).update(expira=timezone.now() - timedelta(minutes=1))
+        with transaction.atomic():
+            elemento = disponible_para_confirmar(self.elemento.pk, [])
+        self.assertEqual((elemento.stock_reservado, elemento.stock_disponible), (Decimal('0.00'), Decimal('10.00')))
+
+    def test_la_purga_borra_solo_las_reservas_vencidas(self):
+        otro_elemento = _crear_elemento('Cubrebocas')
+        vigente, _ = reservar_stock(otro_elemento.pk, Decimal('2'), self.usuario)
+        vencida = timezone.now() - timedelta(minutes=1)
+        ReservaStock.objects.bulk_create([
+            ReservaStock(elemento=elemento, cantidad=Decimal('1'), responsable=self.otro, expira=vencida)
+            for elemento in (self.elemento, self.elemento, otro_elemento)
+        ])
+
+        salida = StringIO()
+        call_command('purgar_reservas_vencidas', lote=2, stdout=salida)
+        self.assertIn('Reservas vencidas borradas: 3.', salida.getvalue())
+        self.assertEqual(list(ReservaStock.objects.values_list('pk', flat=True)), [vigente.pk])
+
+    def test_confirmar_consume_las_reservas_del_carrito(self):
+        self.client.force_login(self.usuario)
+        self.client.post(reverse('inventario:salidas'), {
+            'agregar_item': '1', 'descripcion': self.elemento.pk,
+            'cantidad': '6', 'destino_referencia': 'Almacén Zona A',
+        })
+        self.assertEqual(self._disponible(), Decimal('4.00'))
+
+        self.client.post(reverse('inventario:salidas'), {'confirmar_salidas': '1'})
+        self.elemento.refresh_from_db()
+        self.assertEqual(self.elemento.stock_actual, Decimal('4.00'))
+        self.assertFalse(ReservaStock.objects.exists())
+
+    def test_lo_apartado_por_otro_carrito_no_se_agrega(self):
+        reservar_stock(self.elemento.pk, Decimal('7'), self.otro)
+        self.client.force_login(self.usuario)
+        self.client.post(reverse('inventario:salidas'), {
+            'agregar_item': '1', 'descripcion': self.elemento.pk,
+            'cantidad': '5', 'destino_referencia': 'Almacén Zona A',
+        })
+        self.assertEqual(self.client.session.get('salidas_temp', []), [])
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+
+# =======================================================
+# CONFIRMACIÓN IDEMPOTENTE (CLAVE POR CARRITO)
+# =======================================================
+
+@SIN_MANIFIESTO
+class ConfirmacionIdempotenteTests(TestCase):
+
+    def setUp(self):
+        self.elemento = _crear_elemento()
+        self.proveedor = Proveedor.objects.create(nombre='Distribuidora Norte')
+        self.usuario = _crear_usuario()
+        self.client.force_login(self.usuario)
+
+    def _carrito_con_clave(self, url, datos, session_key):
+        self.client.post(url, {'agregar_item': '1', **datos})
+        self.client.get(url)
+        return self.client.session[f'{session_key}_clave']
+
+    def test_doble_envio_de_salidas_registra_una_sola_vez(self):
+        url = reverse('inventario:salidas')
+        clave = self._carrito_con_clave(url, {
+            'descripcion': self.elemento.pk, 'cantidad': '2', 'destino_referencia': 'Almacén Zona A',
+        }, 'salidas_temp')
+
+        self.client.post(url, {'confirmar_salidas': '1', 'clave_confirmacion': clave})
+        respuesta = self.client.post(url, {'confirmar_salidas': '1', 'clave_confirmacion': clave}, follow=True)
+
+        self.elemento.refresh_from_db()
+        self.assertEqual(self.elemento.stock_actual, Decimal('8.00'))
+        self.assertEqual(MovimientoInventario.objects.count(), 1)
+        self.assertEqual(ConfirmacionLote.objects.filter(clave=clave).count(), 1)
+        mensajes = [str(m) for m in respuesta.context['messages']]
+        self.assertIn(ConfirmacionLote.objects.get(clave=clave).mensaje, mensajes)
+
+    def test_doble_envio_de_entradas_registra_una_sola_vez(self):
+        url = reverse('inventario:entradas')
+        clave = self._carrito_con_clave(url, {
+            'descripcion': self.elemento.pk, 'cantidad': '5', 'proveedor_id': self.proveedor.pk,
+        }, 'entradas_temp')
+
+        self.client.post(url, {'confirmar_entradas': '1', 'clave_confirmacion': clave})
+        self.client.post(url, {'confirmar_entradas': '1', 'clave_confirmacion': clave})
+
+        self.elemento.refresh_from_db()
+        self.assertEqual(self.elemento.stock_actual, Decimal('15.00'))
+        self.assertEqual(MovimientoInventario.objects.count(), 1)
+
+    def test_envio_duplicado_no_toca_los_elementos(self):
+        url = reverse('inventario:salidas')
+        clave = self._carrito_con_clave(url, {
+            'descripcion': self.elemento.pk, 'cantidad': '2', 'destino_referencia': 'Almacén Zona A',
+        }, 'salidas_temp')
+        self.client.post(url, {'confirmar_salidas': '1', 'clave_confirmacion': clave})
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(url, {'confirmar_salidas': '1', 'clave_confirmacion': clave})
+        tabla = ElementoInventario._meta.db_table
+        self.assertFalse([c['sql'] for c in consultas.captured_queries if tabla in c['sql']])
+
+    def test_clave_de_otro_usuario_no_repite_su_resultado(self):
+        url = reverse('inventario:salidas')
+        ConfirmacionLote.objects.create(
+            clave='a' * 32, tipo='SALIDA', responsable=_crear_usuario('otro_almacen'), mensaje='Ajeno',
+        )
+        self.client.post(url, {
+            'agregar_item': '1', 'descripcion': self.elemento.pk,
+            'cantidad': '2', 'destino_referencia': 'Almacén Zona A',
+        })
+        respuesta = self.client.post(url, {'confirmar_salidas': '1', 'clave_confirmacion': 'a' * 32}, follow=True)
+
+        self.assertNotIn('Ajeno', [str(m) for m in respuesta.context['messages']])
+        self.assertFalse(MovimientoInventario.objects.exists())
+
+
+# =======================================================
+# EXISTENCIAS POR UBICACIÓN Y TRANSFERENCIAS
+# =======================================================
+
+@SIN_MANIFIESTO
+class UbicacionesTests(TestCase):
+
+    def setUp(self):
+        self.zona_a = Ubicacion.objects.create(nombre='Almacén Zona A', almacen='Almacén', zona='Zona A')
+        self.zona_b = Ubicacion.objects.create(nombre='Almacén Zona B', almacen='Almacén', zona='Zona B')
+        self.elemento = _crear_elemento(ubicacion_principal=self.zona_a)
+        ExistenciaUbicacion.objects.create(elemento=self.elemento, ubicacion=self.zona_a, cantidad=Decimal('10.00'))
+        self.client.force_login(_crear_usuario())
+
+    def _agregar_salida(self, cantidad, ubicacion=None):
+        self.client.post(reverse('inventario:salidas'), {
+            'agregar_item': '1', 'descripcion': self.elemento.pk, 'cantidad': cantidad,
+            'destino_referencia': 'Almacén Zona C', 'ubicacion_id': ubicacion.pk if ubicacion else '',
+        })
+        return self.client.session.get('salidas_temp', [])
+
+    def _existencia(self, ubicacion):
+        return ExistenciaUbicacion.objects.get(elemento=self.elemento, ubicacion=ubicacion).cantidad
+
+    def test_salida_de_una_ubicacion_sin_existencia_no_se_agrega(self):
+        self.assertEqual(self._agregar_salida('2', self.zona_b), [])
+        self.assertFalse(ReservaStock.objects.exists())
+
+    def test_el_carrito_descuenta_lo_ya_retirado_de_la_ubicacion(self):
+        self.assertEqual(len(self._agregar_salida('6')), 1)
+        self.assertEqual(len(self._agregar_salida('6')), 1)
+        self.assertEqual(ReservaStock.objects.count(), 1)
+
+    def test_transferir_mueve_la_existencia_sin_cambiar_el_stock(self):
+        self.client.post(reverse('inventario:ubicaciones'), {
+            'elemento_id': self.elemento.pk, 'origen_id': self.zona_a.pk,
+            'destino_id': self.zona_b.pk, 'cantidad': '4',
+        })
+        self.assertEqual(self._existencia(self.zona_a), Decimal('6.00'))
+        self.assertEqual(self._existencia(self.zona_b), Decimal('4.00'))
+        self.elemento.refresh_from_db()
+        self.assertEqual(self.elemento.stock_actual, Decimal('10.00'))
+
+        # Lo transferido ya puede salir desde la nueva ubicación
+        self.assertEqual(len(self._agregar_salida('4', self.zona_b)), 1)
+
+    def test_transferir_mas_de_lo_existente_no_cambia_nada(self):
+        respuesta = self.client.post(reverse('inventario:ubicaciones'), {
+            'elemento_id': self.elemento.pk, 'origen_id': self.zona_a.pk,
+            'destino_id': self.zona_b.pk, 'cantidad': '11',
+        }, follow=True)
+        self.assertEqual(self._existencia(self.zona_a), Decimal('10.00'))
+        self.assertFalse(ExistenciaUbicacion.objects.filter(ubicacion=self.zona_b).exists())
+        self.assertIn('Existencia insuficiente', ' '.join(str(m) for m in respuesta.context['messages']))
+
+    def test_lista_las_existencias_de_la_ubicacion(self):
+        respuesta = self.client.get(reverse('inventario:ubicaciones'), {'ubicacion_id': self.zona_a.pk})
+        self.assertEqual([e.elemento_id for e in respuesta.context['existencias']], [self.elemento.pk])
+
+
+# =======================================================
+# ALERTAS DE STOCK (UMBRALES)
+# =======================================================
+
+@SIN_MANIFIESTO
+class AlertasStockTests(TestCase):
+
+    def setUp(self):
+        self.elemento = _crear_elemento(codigo='GN-001')
+        self.client.force_login(_crear_usuario())
+
+    def _definir(self, **datos):
+        return self.client.post(reverse('inventario:alertas_stock'), datos, follow=True)
+
+    def test_define_umbrales_por_codigo_escaneado(self):
+        self._definir(codigo=' gn-001 ', stock_minimo='12', stock_maximo='')
+        self.elemento.refresh_from_db()
+        self.assertEqual(self.elemento.stock_minimo, Decimal('12.00'))
+        self.assertIsNone(self.elemento.stock_maximo)
+
+    def test_define_umbrales_desde_la_fila_de_la_alerta(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._definir(elemento_id=self.elemento.pk, stock_minimo='12', stock_maximo='30')
+        fila = self.client.get(reverse('inventario:alertas_stock'))
+        self.assertContains(fila, f'name="elemento_id" value="{self.elemento.pk}"')
+        self.assertContains(fila, 'value="12.00"')
+
+        respuesta = self._definir(elemento_id=self.elemento.pk, stock_minimo='5', stock_maximo='30')
+        self.elemento.refresh_from_db()
+        self.assertEqual(self.elemento.stock_minimo, Decimal('5.00'))
+        self.assertIn('actualizados', ' '.join(str(m) for m in respuesta.context['messages']))
+
+    def test_elemento_inexistente_no_define_nada(self):
+        respuesta = self._definir(codigo='NO-EXISTE', stock_minimo='5', stock_maximo='')
+        self.assertIn("No hay un elemento con el código", ' '.join(str(m) for m in respuesta.context['messages']))
+
+    def test_la_pagina_no_carga_el_catalogo(self):
+        for numero in range(5):
+            _crear_elemento(f'Elemento {numero}')
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('inventario:alertas_stock'))
+        self.assertNotIn('elementos', respuesta.context)
+        tabla = ElementoInventario._meta.db_table
+        self.assertFalse([q['sql'] for q in consultas.captured_queries if f'FROM "{tabla}"' in q['sql']])
+
+
+# =======================================================
+# CONTEOS CÍCLICOS
+# =======================================================
+
+@SIN_MANIFIESTO
+class ConteosCiclicosTests(TestCase):
+
+    def setUp(self):
+        self.usuario = _crear_usuario()
+        self.client.force_login(self.usuario)
+
+    def test_cada_lote_se_sella_con_su_hora(self):
+        primero, segundo = _crear_elemento('Guantes'), _crear_elemento('Cubrebocas')
+        conteo, _ = crear_conteo('Mensual', self.usuario)
+        LineaConteo.objects.filter(conteo=conteo).update(contado=Decimal('7.00'))
+
+        self.assertEqual(aplicar_conteo(conteo.id, self.usuario, tamano_lote=1), (2, [], []))
+        primero.refresh_from_db()
+        segundo.refresh_from_db()
+        conteo.refresh_from_db()
+        self.assertEqual((primero.stock_actual, segundo.stock_actual), (Decimal('7.00'), Decimal('7.00')))
+        self.assertLess(primero.modificado, segundo.modificado)
+        self.assertLessEqual(segundo.modificado, conteo.aplicado_en)
+
+    def test_informa_los_ajustes_recortados(self):
+        zona = Ubicacion.objects.create(nombre='Almacén Zona A', almacen='Almacén', zona='Zona A')
+        recortado = _crear_elemento('Guantes', ubicacion_principal=zona)
+        ExistenciaUbicacion.objects.create(elemento=recortado, ubicacion=zona, cantidad=Decimal('10.00'))
+        sin_existencia = _crear_elemento('Cubrebocas', ubicacion_principal=zona)
+        ExistenciaUbicacion.objects.create(elemento=sin_existencia, ubicacion=zona, cantidad=Decimal('1.00'))
+        conteo, _ = crear_conteo('Mensual', self.usuario)
+        LineaConteo.objects.filter(conteo=conteo, elemento=recortado).update(contado=Decimal('2.00'))
+        LineaConteo.objects.filter(conteo=conteo, elemento=sin_existencia).update(contado=Decimal('6.00'))
+        # Salida posterior a la congelación: quedan 3 y el conteo pide restar 8
+        ElementoInventario.objects.filter(pk=recortado.pk).update(stock_actual=Decimal('3.00'))
+
+        respuesta = self.client.post(reverse('inventario:conteo_detalle', args=[conteo.id]), {'aplicar': '1'}, follow=True)
+        mensajes = [str(m) for m in respuesta.context['messages']]
+        self.assertIn(f"hasta stock 0 (ids: {recortado.pk})", mensajes[1])
+        self.assertIn(f"quedó en 0 (ids: {sin_existencia.pk})", mensajes[2])
+        recortado.refresh_from_db()
+        self.assertEqual(recortado.stock_actual, Decimal('0.00'))
+
+    def test_criterio_inexistente_es_404(self):
+        for datos in ({'clase_id': '999'}, {'ubicacion_id': '999'}, {'clase_id': 'x'}):
+            respuesta = self.client.post(reverse('inventario:conteos'), {'nombre': 'Mensual', **datos})
+            self.assertEqual(respuesta.status_code, 404)
+        self.assertFalse(ConteoCiclico.objects.exists())
+
+    def test_crea_el_conteo_de_la_clase(self):
+        elemento = _crear_elemento()
+        _crear_elemento('Papel', clase=ClaseInventario.objects.create(nombre='Papelería'))
+        self.client.post(reverse('inventario:conteos'), {'nombre': 'Limpieza', 'clase_id': elemento.clase_id})
+        conteo = ConteoCiclico.objects.get()
+        self.assertEqual(list(conteo.lineas.values_list('elemento_id', flat=True)), [elemento.id])
+
+
+# =======================================================
+# CÓDIGOS (ESCANEO Y ASIGNACIÓN)
+# =======================================================
+
+@SIN_MANIFIESTO
+class CodigosTests(TestCase):
+
+    def setUp(self):
+        self.elemento = _crear_elemento()
+        self.otro = _crear_elemento('Cubrebocas', codigo='CB-01')
+
+    def test_normaliza_espacios_y_mayusculas(self):
+        self.assertEqual(normalizar_codigo(' gn 001\t'), 'GN001')
+        self.assertIsNone(normalizar_codigo('   '))
+        with self.assertRaises(CodigoInvalido):
+            normalizar_codigo('GN#001')
+
+    def test_asigna_codigos_y_rechaza_los_ocupados(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            asignados, errores = asignar_codigos([
+                (2, {'elemento': str(self.elemento.pk), 'codigo': ' gn-001 '}),
+                (3, {'elemento': str(self.elemento.pk), 'codigo': 'GN-002'}),
+                (4, {'elemento': '999999', 'codigo': 'XX-1'}),
+                (5, {'elemento': str(_crear_elemento('Papel').pk), 'codigo': 'cb-01'}),
+            ])
+        self.assertEqual(asignados, 1)
+        self.assertEqual([linea for linea, _, _ in errores], [3, 4, 5])
+        self.assertIn(f'elemento {self.otro.pk}', errores[-1][2])
+        self.elemento.refresh_from_db()
+        self.assertEqual(self.elemento.codigo, 'GN-001')
+        self.assertTrue(RegistroCambio.objects.filter(objeto_id=self.elemento.pk).exists())
+
+    def test_comando_desde_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as archivo:
+            archivo.write(f"elemento,codigo\n{self.elemento.pk},gn-001\n{self.otro.pk},CB#02\n")
+        salida, errores = StringIO(), StringIO()
+        call_command('asignar_codigos', archivo.name, stdout=salida, stderr=errores)
+        self.assertIn('1 códigos asignados, 1 filas con error', salida.getvalue())
+        self.assertIn('Línea 3', errores.getvalue())
+        self.otro.refresh_from_db()
+        self.assertEqual(self.otro.codigo, 'CB-01')
+
+    def test_el_admin_normaliza_el_codigo(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='clave-de-prueba'))
+        listado = self.client.get(reverse('admin:inventario_elementoinventario_changelist'), {'q': 'CB-01'})
+        self.assertEqual(list(listado.context['cl'].result_list), [self.otro])
+
+        url = reverse('admin:inventario_elementoinventario_change', args=[self.elemento.pk])
+        respuesta = self.client.post(url, {
+            'clase': self.elemento.clase_id, 'descripcion': self.elemento.descripcion, 'codigo': ' gn 001 ',
+            'unidad': 'PZA', 'ubicacion': 'Almacén', 'costo_unitario': '0.00',
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        self.elemento.refresh_from_db()
+        self.assertEqual(self.elemento.codigo, 'GN001')
+
+    def test_escanear_agrega_al_carrito(self):
+        self.client.force_login(_crear_usuario())
+        self.client.post(reverse('inventario:escanear', args=['salidas']), {
+            'codigo': 'cb-01', 'cantidad': '2', 'destino_referencia': 'Almacén Zona C',
+        })
+        self.assertEqual(len(self.client.session.get('salidas_temp', [])), 1)
+
+        respuesta = self.client.post(reverse('inventario:escanear', args=['salidas']), {'codigo': 'NO-EXISTE'}, follow=True)
+        self.assertIn("No hay un elemento con el código", ' '.join(str(m) for m in respuesta.context['messages']))
+
+
+# =======================================================
+# CONCILIACIÓN DE STOCK CONTRA EL LIBRO DE MOVIMIENTOS
+# =======================================================
+
+class ConciliacionTests(TestCase):
+
+    def setUp(self):
+        self.usuario = _crear_usuario()
+        self.zona_a = Ubicacion.objects.create(nombre='Almacén Zona A', almacen='Almacén', zona='Zona A')
+        # stock_actual 10, pero el libro sólo respalda 7
+        self.elemento = _crear_elemento(ubicacion_principal=self.zona_a)
+        ExistenciaUbicacion.objects.create(elemento=self.elemento, ubicacion=self.zona_a, cantidad=Decimal('10.00'))
+        self._movimiento(self.elemento, 'ENTRADA', '9')
+        self._movimiento(self.elemento, 'SALIDA', '2')
+        self.cuadrado = _crear_elemento('Cubrebocas', stock='4.00')
+        self._movimiento(self.cuadrado, 'ENTRADA', '4')
+
+    def _movimiento(self, elemento, tipo, cantidad):
+        MovimientoInventario.objects.create(
+            elemento=elemento, tipo=tipo, cantidad=Decimal(cantidad), responsable=self.usuario,
+        )
+
+    def _conciliar(self, *argumentos):
+        salida = StringIO()
+        call_command('conciliar_stock', *argumentos, stdout=salida)
+        return salida.getvalue()
+
+    def test_el_reporte_lista_el_descuadre_sin_corregirlo(self):
+        salida = self._conciliar()
+        self.assertIn('Elementos revisados: 2', salida)
+        self.assertIn('Descuadres: 1', salida)
+        self.assertIn(f'elemento {self.elemento.pk}: stock_actual=10.00 esperado=7', salida)
+        self.elemento.refresh_from_db()
+        self.assertEqual(self.elemento.stock_actual, Decimal('10.00'))
+
+    def test_corregir_deja_el_stock_y_la_ubicacion_como_el_libro(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIn('Corregidos: 1', self._conciliar('--corregir'))
+        self.elemento.refresh_from_db()
+        self.assertEqual(self.elemento.stock_actual, Decimal('7.00'))
+        self.assertEqual(
+            ExistenciaUbicacion.objects.get(elemento=self.elemento, ubicacion=self.zona_a).cantidad, Decimal('7.00'),
+        )
+        self.assertIn('coincide con el libro', self._conciliar())
+
+    def test_un_descuadre_que_ya_cuadra_no_se_reporta(self):
+        # Confirmación entre las dos lecturas del recorrido: al releer con bloqueo ya cuadra
+        self._movimiento(self.elemento, 'ENTRADA', '3')
+        obsoleta = Diferencia(self.elemento.pk, Decimal('10.00'), Decimal('7.00'))
+        self.assertEqual(confirmar_diferencias([obsoleta]), [])
+
+
+# =======================================================
+# COMPRAS MENSUALES POR PROVEEDOR (AGREGADO INCREMENTAL)
+# =======================================================
+
+@SIN_MANIFIESTO
+class ComprasMensualesTests(TestCase):
+
+    def setUp(self):
+        self.elemento = _crear_elemento(costo_unitario=Decimal('2.50'))
+        self.proveedor = Proveedor.objects.create(nombre='Distribuidora Norte', rfc='DNO010101AAA')
+        self.otro = Proveedor.objects.create(nombre='Abarrotes Sur', rfc='ASU010101AAA')
+        self.client.force_login(_crear_usuario())
+
+    def _confirmar(self, proveedor, cantidad, cuando):
+        # La hora del servidor se fija para la captura y la confirmación
+        with mock.patch('django.utils.timezone.now', return_value=cuando):
+            for datos in (
+                {'agregar_item': '1', 'descripcion': self.elemento.pk, 'cantidad': cantidad, 'proveedor_id': proveedor.pk},
+                {'confirmar_entradas': '1'},
+            ):
+                self.client.post(reverse('inventario:entradas'), datos)
+
+    def _agregado(self):
+        return list(
+            CompraMensualProveedor.objects.order_by('proveedor_id', 'mes')
+            .values_list('proveedor_id', 'mes', 'importe', 'cantidad', 'partidas', 'ultima_entrega')
+        )
+
+    def test_el_incremental_es_igual_a_la_reconstruccion(self):
+        zona = timezone.get_current_timezone()
+        # 31 de enero 23:59 en hora local ya es 1 de febrero en UTC
+        fin_de_enero = timezone.make_aware(datetime(2026, 1, 31, 23, 59, 30), zona)
+        self._confirmar(self.proveedor, '4', fin_de_enero)
+        self._confirmar(self.proveedor, '1', fin_de_enero + timedelta(minutes=1))
+        self._confirmar(self.proveedor, '2', fin_de_enero + timedelta(days=1))
+        self._confirmar(self.otro, '3', fin_de_enero + timedelta(days=2))
+        self.assertEqual(MovimientoInventario.objects.count(), 4)
+        self.assertEqual([fila[1].month for fila in self._agregado()], [1, 2, 2])
+
+        # Reverso de la última entrada de febrero del proveedor y baja del otro proveedor
+        MovimientoInventario.objects.filter(proveedor=self.proveedor).latest('fecha_movimiento').delete()
+        self.otro.delete()
+
+        incremental = self._agregado()
+        recalcular_compras()
+        self.assertEqual(incremental, self._agregado())
+        self.assertEqual(
+            [(fila[1].month, fila[3], fila[4]) for fila in incremental], [(1, Decimal('4.00'), 1), (2, Decimal('1.00'), 1)],
+        )
+
+
+# =======================================================
+# LISTADOS CON PAGINACIÓN POR CLAVE
+# =======================================================
+
+@SIN_MANIFIESTO
+class PaginacionListadosTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(_crear_usuario())
+        # 60 proveedores (más de una página de 50) con empates en importe y última entrega
+        entrega = timezone.now().replace(microsecond=0)
+        mes = timezone.localdate().replace(day=1)
+        for numero in range(60):
+            proveedor = Proveedor.objects.create(nombre=f'Proveedor {numero % 7}', rfc=f'PRV{numero:03d}')
+            if numero % 4:
+                CompraMensualProveedor.objects.create(
+                    proveedor=proveedor, mes=mes, importe=Decimal('10.50') * (numero % 3),
+                    cantidad=Decimal(numero % 3), partidas=numero % 3,
+                    ultima_entrega=entrega - timedelta(days=numero % 2),
+                )
+
+    def _recorrer(self, orden):
+        ids, params, paginas = [], {'orden': orden}, []
+        while True:
+            pagina = self.client.get(reverse('inventario:proveedores'), params).context['pagina']
+            ids.extend(p.id for p in pagina)
+            paginas.append((params, pagina))
+            if not pagina.tiene_siguiente:
+                return ids, paginas
+            params = {'orden': orden, 'cursor': pagina.cursor_siguiente}
+
+    def test_ordenes_por_columnas_anotadas_sin_huecos_ni_repetidos(self):
+        for orden in ORDENES_PROVEEDORES:
+            ids, paginas = self._recorrer(orden)
+            self.assertEqual(len(paginas), 2, orden)
+            self.assertEqual(sorted(ids), sorted(Proveedor.objects.values_list('id', flat=True)), orden)
+            self.assertEqual(len(ids), len(set(ids)), orden)
+
+            # La página anterior de la segunda es la primera
+            anterior = self.client.get(reverse('inventario:proveedores'), {
+                'orden': orden, 'cursor': paginas[1][1].cursor_anterior, 'dir': 'anterior',
+            }).context['pagina']
+            self.assertEqual([p.id for p in anterior], [p.id for p in paginas[0][1]], orden)
+
+    def test_cursor_alterado_muestra_la_primera_pagina(self):
+        primera = [p.id for p in self.client.get(reverse('inventario:proveedores'), {'orden': 'importe'}).context['pagina']]
+        for cursor in ('%%%', codificar_cursor(['mucho', 'Proveedor 1', 3]), codificar_cursor([1])):
+            respuesta = self.client.get(reverse('inventario:proveedores'), {'orden': 'importe', 'cursor': cursor})
+            self.assertEqual([p.id for p in respuesta.context['pagina']], primera)
+
+    def test_decimal_descendente_con_empates(self):
+        for numero in range(9):
+            _crear_elemento(f'Elemento {numero}', stock=str(Decimal('1.25') * (numero % 3)))
+        esperado = list(ElementoInventario.objects.order_by('-stock_actual', 'id').values_list('id', flat=True))
+        ids, cursor = [], None
+        while True:
+            pagina = paginar_por_clave(ElementoInventario.objects.all(), ('-stock_actual', 'id'), cursor=cursor, tamano=2)
+            ids.extend(e.id for e in pagina)
+            if not pagina.tiene_siguiente:
+                break
+            cursor = pagina.cursor_siguiente
+        self.assertEqual(ids, esperado)
+
+
+# =======================================================
+# FEED DE CAMBIOS (ORDEN DE CONFIRMACIÓN)
+# =======================================================
+
+class FeedCambiosTests(TestCase):
+
+    def setUp(self):
+        # Lo anotado por transacciones de otras pruebas (revertidas) no cuenta
+        cambios._pendientes.ids = {}
+        self.usuario = _crear_usuario()
+        self.elemento = _crear_elemento()
+
+    def _movimiento(self):
+        return MovimientoInventario.objects.create(
+            elemento=self.elemento, tipo='ENTRADA', cantidad=Decimal('1.00'), responsable=self.usuario,
+        )
+
+    def _ids(self, pagina):
+        datos = como_dict(pagina)
+        return [c['id'] for c in datos['cambios']], datos['cursor']
+
+    def test_una_transaccion_larga_no_queda_atras_del_cursor(self):
+        # El movimiento de id menor se confirma después que el de id mayor
+        largo, corto = self._movimiento(), self._movimiento()
+        asignar_secuencia({MOVIMIENTO: [corto.id]})
+        ids, cursor = self._ids(pagina_movimientos(None, 10))
+        self.assertEqual(ids, [corto.id])
+
+        asignar_secuencia({MOVIMIENTO: [largo.id]})
+        ids, _ = self._ids(pagina_movimientos(cursor, 10))
+        self.assertEqual(ids, [largo.id])
+
+    def test_la_secuencia_se_asigna_al_confirmar(self):
+        ultima = SecuenciaCambios.objects.get().ultima
+        with self.captureOnCommitCallbacks() as callbacks:
+            movimiento = self._movimiento()
+        # La fila se escribe con el cambio, pendiente y fuera del feed
+        self.assertIsNone(RegistroCambio.objects.get(objeto_id=movimiento.id, tipo=MOVIMIENTO).secuencia)
+        self.assertEqual(self._ids(pagina_movimientos(None, 10))[0], [])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._ids(pagina_movimientos(None, 10))[0], [movimiento.id])
+        self.assertEqual(SecuenciaCambios.objects.get().ultima, ultima + 1)
+        self.assertFalse(VersionDatos.objects.filter(tabla=RegistroCambio._meta.db_table).exists())
+
+    def test_un_fallo_al_asignar_no_es_un_500_y_se_repara(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._movimiento()
+        _, cursor = self._ids(pagina_elementos(None, 10))
+
+        # El proceso falla tras confirmar la modificación del elemento
+        with mock.patch.object(cambios, 'asignar_secuencia', side_effect=RuntimeError('sin conexión')):
+            with self.assertLogs('sma_inventario.cambios', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.elemento.stock_actual = Decimal('3.00')
+                    self.elemento.save()
+        self.assertEqual(self._ids(pagina_elementos(cursor, 10))[0], [])
+
+        salida = StringIO()
+        call_command('registrar_cambios_pendientes', stdout=salida)
+        self.assertIn('registrados en el feed: 1', salida.getvalue())
+        self.assertEqual(self._ids(pagina_elementos(cursor, 10))[0], [self.elemento.id])
+
+    def test_un_elemento_modificado_reaparece_una_vez_tras_el_cursor(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            otro = _crear_elemento('Cubrebocas')
+        ids, cursor = self._ids(pagina_elementos(None, 10))
+        self.assertEqual(ids, [self.elemento.id, otro.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for stock in ('5.00', '6.00'):
+                self.elemento.stock_actual = Decimal(stock)
+                self.elemento.save()
+        ids, cursor = self._ids(pagina_elementos(cursor, 10))
+        self.assertEqual(ids, [self.elemento.id])
+        self.assertEqual(self._ids(pagina_elementos(cursor, 10))[0], [])
+
+    def test_paginas_cortas_indican_que_hay_mas(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            movimientos = [self._movimiento().id for _ in range(3)]
+        primera = como_dict(pagina_movimientos(None, 2))
+        self.assertTrue(primera['mas'])
+        segunda = como_dict(pagina_movimientos(primera['cursor'], 2))
+        self.assertEqual([c['id'] for c in primera['cambios'] + segunda['cambios']], movimientos)
+        self.assertFalse(segunda['mas'])
+
+    def test_cursor_ajeno_es_invalido(self):
+        with self.assertRaises(CursorInvalido):
+            pagina_movimientos('no-es-un-cursor', 10)
+
+
+# =======================================================
+# NOMBRE DEL RESPONSABLE RESUELTO EN SQL
+# =======================================================
+
+class ResponsableDisplayTests(TestCase):
+
+    def setUp(self):
+        self.elemento = _crear_elemento()
+
+    def _movimiento_de(self, usuario):
+        return MovimientoInventario.objects.create(
+            elemento=self.elemento, tipo='ENTRADA', cantidad=Decimal('1.00'), responsable=usuario,
+        )
+
+    def test_prefiere_nombre_del_perfil_luego_nombre_completo_y_username(self):
+        con_perfil = _crear_usuario('jlopez')
+        con_perfil.perfilusuario.nombre_visualizacion = 'Jefe López'
+        con_perfil.perfilusuario.save()
+        con_nombre = User.objects.create_user('mruiz', first_name='María', last_name='Ruiz')
+        solo_username = User.objects.create_user('temporal', first_name=' ')
+        movimientos = {
+            self._movimiento_de(usuario).id: esperado
+            for usuario, esperado in (
+                (con_perfil, 'Jefe López'), (con_nombre, 'María Ruiz'), (solo_username, 'temporal'),
+            )
+        }
+
+        anotados = MovimientoInventario.objects.con_responsable_display()
+        self.assertEqual({m.id: m.responsable_display for m in anotados}, movimientos)
+        # Sin anotar, el método del modelo da el mismo resultado
+        for movimiento in MovimientoInventario.objects.all():
+            self.assertEqual(movimiento.get_responsable_display(), movimientos[movimiento.id])
+
+    def test_listar_no_consulta_el_usuario_por_fila(self):
+        for i in range(3):
+            self._movimiento_de(User.objects.create_user(f'usuario{i}'))
+
+        with self.assertNumQueries(1):
+            nombres = [m.get_responsable_display() for m in MovimientoInventario.objects.con_responsable_display()]
+        self.assertCountEqual(nombres, ['usuario0', 'usuario1', 'usuario2'])
+
+
+# =======================================================
+# REPORTES CON IMPORTACIÓN DIFERIDA (OPENPYXL)
+# =======================================================
+
+class ReportesDiferidosTests(TestCase):
+
+    def test_el_arranque_de_un_worker_no_carga_openpyxl(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = f"{directorio}/arranque.json"
+            call_command('benchmark_arranque', repeticiones=1, salida_json=archivo, stdout=StringIO())
+            with open(archivo, encoding='utf-8') as f:
+                vigilados = json.load(f)['vigilados']
+        self.assertFalse(vigilados['openpyxl'])
+        if 'mysql' not in settings.DATABASES['default']['ENGINE']:
+            self.assertFalse(vigilados['pymysql'])
+
+    def test_el_reporte_de_movimientos_se_genera_al_pedirlo(self):
+        usuario = _crear_usuario('jefe', nivel=1)
+        MovimientoInventario.objects.create(
+            elemento=_crear_elemento(), tipo='SALIDA', cantidad=Decimal('2.00'), responsable=usuario,
+        )
+        self.client.force_login(usuario)
+
+        with tempfile.TemporaryDirectory() as directorio, self.settings(MEDIA_ROOT=directorio):
+            respuesta = self.client.get(reverse('inventario:generar_reporte_movimientos'), {'formato': 'XLSX'})
+            self.assertEqual(respuesta.status_code, 302)
+            nombre = respuesta['Location'].rstrip('/').rsplit('/', 1)[-1]
+            hoja = load_workbook(Path(directorio) / 'reports' / nombre).active
+            filas = list(hoja.iter_rows(values_only=True))
+        self.assertEqual(filas[0][-1], 'Responsable')
+        self.assertEqual((filas[1][-2], filas[1][-1]), (-2.0, 'jefe'))
@@ -0,0 +1,150 @@
+# inventario/ubicaciones.py
+
+import re
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+
+from core.cache_datos import invalidar_tablas
+from .models import ElementoInventario, ExistenciaUbicacion, Ubicacion
+
+# "Almacén Zona A", "Almacén Central - Pasillo 3", "Bodega 2 / Anaquel B"...
+# El almacén termina en un separador o antes de la primera palabra de subdivisión.
+_SEPARADOR = re.compile(
+    r'\s*[-/,|>]\s*|\s+(?=(?:zona|pasillo|anaquel|estante|rack|nivel|secci[oó]n|area|área)\b)',
+    re.IGNORECASE,
+)
+
+
+class ExistenciaInsuficiente(Exception):
+    """La ubicación no tiene la cantidad que se intenta retirar o transferir."""
+
+    def __init__(self, elemento, ubicacion, disponible, solicitado):
+        self.elemento = elemento
+        self.ubicacion = ubicacion
+        self.disponible = disponible
+        self.solicitado = solicitado
+        super().__init__(
+            f"Existencia insuficiente de '{elemento.descripcion}' en {ubicacion}. "
+            f"Disponible: {disponible}, Solicitado: {solicitado}."
+        )
+
+
+def separar_ubicacion(texto):
+    """
+    Normaliza un texto libre de ubicación. Retorna (nombre, almacen, zona) o
+    None si está vacío. La migración 0011 aplica la misma regla.
+    """
+    nombre = ' '.join((texto or '').split())
+    if not nombre:
+        return None
+    partes = _SEPARADOR.split(nombre, maxsplit=1)
+    almacen = partes[0].strip()
+    zona = partes[1].strip() if len(partes) > 1 else ''
+    return nombre[:100], almacen[:60], zona[:60]
+
+
+def obtener_o_crear_ubicacion(texto):
+    """Ubicacion correspondiente a `texto` (sin distinguir mayúsculas), creándola si no existe."""
+    separado = separar_ubicacion(texto)
+    if separado is None:
+        return None
+    nombre, almacen, zona = separado
+    existente = Ubicacion.objects.filter(nombre__iexact=nombre).first()
+    if existente:
+        return existente
+    ubicacion, _ = Ubicacion.objects.get_or_create(
+        nombre=nombre, defaults={'almacen': almacen, 'zona': zona}
+    )
+    return ubicacion
+
+
+def existencias_en(ubicacion_id):
+    """
+    Existencias con stock de una ubicación (índice ubicacion, elemento). Se
+    pagina por `elemento_id`, único dentro de la ubicación.
+    """
+    return (
+        ExistenciaUbicacion.objects.filter(ubicacion_id=ubicacion_id, cantidad__gt=0)
+        .select_related('elemento')
+    )
+
+
+def existencia_de(elemento_id, ubicacion_id):
+    """Cantidad del elemento en la ubicación (una fila por el índice único)."""
+    return (
+        ExistenciaUbicacion.objects.filter(elemento_id=elemento_id, ubicacion_id=ubicacion_id)
+        .values_list('cantidad', flat=True).first()
+    ) or Decimal('0.00')
+
+
+def sumar_existencia(elemento, ubicacion_id, cantidad):
+    """
+    Suma (o resta, con cantidad negativa) en la existencia del elemento en la
+    ubicación. Debe llamarse con el elemento ya bloqueado (select_for_update),
+    como hacen las confirmaciones: así la fila de existencia no tiene otros escritores.
+    """
+    actualizadas = ExistenciaUbicacion.objects.filter(
+        elemento=elemento, ubicacion_id=ubicacion_id
+    ).update(cantidad=F('cantidad') + cantidad)
+    if actualizadas:
+        # update() no emite post_save
+        invalidar_tablas(ExistenciaUbicacion._meta.db_table)
+    else:
+        ExistenciaUbicacion.objects.create(elemento=elemento, ubicacion_id=ubicacion_id, cantidad=cantidad)
+
+
+def retirar_existencia(elemento, ubicacion_id, cantidad):
+    """Resta `cantidad` de la ubicación validando que alcance (elemento bloqueado)."""
+    disponible = existencia_de(elemento.pk, ubicacion_id)
+    if cantidad > disponible:
+        raise ExistenciaInsuficiente(elemento, Ubicacion.objects.get(pk=ubicacion_id), disponible, cantidad)
+    sumar_existencia(elemento, ubicacion_id, -cantidad)
+
+
+def transferir(elemento_id, origen_id, destino_id, cantidad):
+    """
+    Mueve `cantidad` del elemento entre ubicaciones. stock_actual no cambia.
+    Se bloquea primero el elemento (mismo orden que entradas/salidas) y luego
+    sólo se tocan sus dos filas de existencia por el índice único.
+    """
+    if origen_id == destino_id:
+        return
+    with transaction.atomic():
+        elemento = ElementoInventario.objects.select_for_update().get(pk=elemento_id)
+        retirar_existencia(elemento, origen_id, cantidad)
+        sumar_existencia(elemento, destino_id, cantidad)
+
+
+def ajustar_en_principal(elementos, deltas):
+    """
+    Aplica los ajustes de stock ({elemento_id: delta}) a la existencia de la
+    ubicación principal de cada elemento (una lectura y una escritura en bloque
+    por lote), sin bajar de cero. Los elementos deben estar bloqueados.
+    Retorna los ids cuya existencia no alcanzó para todo el ajuste.
+    """
+    principal = {e.id: e.ubicacion_principal_id for e in elementos if e.ubicacion_principal_id and deltas[e.id]}
+    if not principal:
+        return []
+    existentes = {
+        existencia.elemento_id: existencia
+        for existencia in ExistenciaUbicacion.objects.filter(
+            elemento_id__in=principal, ubicacion_id=F('elemento__ubicacion_principal_id')
+        )
+    }
+    nuevas, insuficientes = [], []
+    for elemento_id, ubicacion_id in principal.items():
+        existencia = existentes.get(elemento_id)
+        disponible = existencia.cantidad if existencia is not None else Decimal('0.00')
+        if disponible + deltas[elemento_id] < 0:
+            insuficientes.append(elemento_id)
+        if existencia is not None:
+            existencia.cantidad = max(existencia.cantidad + deltas[elemento_id], Decimal('0.00'))
+        elif deltas[elemento_id] > 0:
+            nuevas.append(ExistenciaUbicacion(
+                elemento_id=elemento_id, ubicacion_id=ubicacion_id, cantidad=deltas[elemento_id],
+            ))
+    ExistenciaUbicacion.objects.bulk_update(existentes.values(), ['cantidad'])
+    ExistenciaUbicacion.objects.bulk_create(nuevas)
+    return sorted(insuficientes)
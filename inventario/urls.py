@@ -13,11 +13,18 @@ urlpatterns = [
     path('dashboard/', views.inventario_dashboard, name='dashboard'),
     path('entradas/', views.gestion_entradas, name='entradas'),
     path('salidas/', views.gestion_salidas, name='salidas'),
+    # Lector de códigos: agrega el elemento escaneado al carrito ('entradas' o 'salidas')
+    path('escanear/<str:carrito>/', views.escanear_codigo, name='escanear'),
     path('crear_producto/', views.crear_producto, name='crear_producto'), 
     path('gestion_inventario/', views.gestion_inventario, name='gestion_inventario'), 
+    path('alertas/', views.alertas_stock, name='alertas_stock'),
+    path('ubicaciones/', views.existencias_ubicaciones, name='ubicaciones'),
+    path('conteos/', views.conteos_ciclicos, name='conteos'),
+    path('conteos/<int:conteo_id>/', views.conteo_detalle, name='conteo_detalle'),
     path('proveedores/', views.gestion_proveedores, name='proveedores'), 
     path('proveedor/editar/<int:proveedor_id>/', views.editar_proveedor, name='proveedor_editar'),
     path('proveedor/eliminar/<int:proveedor_id>/', views.eliminar_proveedor, name='proveedor_eliminar'),
+    path('proveedor/<int:proveedor_id>/compras/', views.compras_proveedor, name='proveedor_compras'),
     
     # -------------------------------------------------------------------------
     # --- URLs de REPORTES (Corregidas y Optimizadas) ---
@@ -31,7 +38,14 @@ urlpatterns = [
     
     # 3. 🆕 RUTA AÑADIDA: Para generar el reporte de MOVIMIENTOS
     path('reportes/movimientos/generar/', views.generar_reporte_movimientos, name='generar_reporte_movimientos'),
+
+    # Estado de la cola de generación de reportes (JSON)
+    path('reportes/estado/', views.estado_reportes, name='estado_reportes'),
     
+    # Feed incremental de cambios para el ERP (NDJSON/JSON con cursor)
+    path('cambios/movimientos/', views.cambios_movimientos, name='cambios_movimientos'),
+    path('cambios/elementos/', views.cambios_elementos, name='cambios_elementos'),
+
     # 4. Ruta para descargar el archivo (Usada por ambos generadores)
     # NOTA: filename capturará el nombre completo del archivo.
     path('reportes/descargar/<str:filename>/', views.descargar_reporte, name='descargar_reporte'),
@@ -1,29 +1,77 @@
 # inventario/views.py
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.db import IntegrityError, transaction
 from django.contrib import messages
-from django.db.models import Q, Sum, F
+from django.db.models import Count, Q, Sum, F
 from django.utils import timezone
+from django.utils.http import urlencode
 from django.http import HttpResponse, FileResponse 
 from django.http import HttpResponse, FileResponse, Http404 
+from django.http import JsonResponse, StreamingHttpResponse
 from pathlib import Path 
 import json
 import uuid
 from django.views.decorators.http import require_POST
 from decimal import Decimal
 from datetime import timedelta
-import os 
-import csv
 from django.conf import settings 
 
-# NUEVAS IMPORTACIONES PARA GENERACIÓN DE REPORTES
-import io 
-from openpyxl import Workbook 
+# La generación de archivos (openpyxl) vive en inventario/reportes.py y se
+# importa dentro de las vistas que la usan, no al cargar este módulo.
 
 # Importa SOLO los modelos que existen en models.py.
-from .models import ElementoInventario, ClaseInventario, Proveedor, MovimientoInventario
+from .models import (
+    ElementoInventario, ClaseInventario, Proveedor, MovimientoInventario, ConfirmacionLote, Ubicacion,
+    CompraMensualProveedor, AlertaStock, ConteoCiclico,
+)
+from .compras import (
+    ORDENES_PROVEEDORES, adjuntar_compras, anotar_compras, registrar_compras, tendencia_mensual,
+)
+from core.cache_datos import obtener_o_calcular
+from core.condicional import condicional_por_version
+from core.paginacion import paginar_por_clave
+from core.db_router import lecturas_en_replica
+from core.admision import con_admision, controlador_reportes
+from core.acceso import nivel_requerido, obtener_nivel_acceso
+from admin_sistema.importacion import leer_csv
+from .alertas import (
+    UmbralInvalido, definir_umbrales, leer_umbrales, resumen_alertas, evaluar as evaluar_alertas,
+)
+from .codigos import CodigoInvalido, buscar_por_codigo, normalizar_codigo
+from .conteos import (
+    ConteoNoAbierto, aplicar_conteo, cancelar_conteo, crear_conteo, leer_cantidades,
+    registrar_cantidades, resumen_conteo,
+)
+from .cambios import (
+    CursorInvalido, como_dict, como_ndjson, limite_de, pagina_elementos, pagina_movimientos,
+)
+from .reservas import (
+    StockInsuficiente, anotar_disponible, reservar_stock, liberar_reservas,
+    disponible_para_confirmar,
+)
+from .ubicaciones import (
+    ExistenciaInsuficiente, existencia_de, existencias_en, obtener_o_crear_ubicacion, retirar_existencia,
+    sumar_existencia, transferir,
+)
+
+# Tablas de las que dependen los datos cacheados (ver core.cache_datos)
+TABLAS_TABLA_INVENTARIO = (ElementoInventario._meta.db_table, ClaseInventario._meta.db_table)
+TABLAS_REPORTES = TABLAS_TABLA_INVENTARIO + (MovimientoInventario._meta.db_table,)
+TABLAS_DASHBOARD = TABLAS_REPORTES + (Ubicacion._meta.db_table, AlertaStock._meta.db_table)
+
+# Destinos del selector de salidas (captura manual y escaneo)
+DESTINOS_SALIDA = tuple(f"Almacén Zona {zona}" for zona in 'ABCDE')
+
+
+def _mtime_reportes(request):
+    """La lista de archivos de reportes_dashboard cambia al generar o borrar reportes."""
+    try:
+        return Path(settings.REPORTS_DIR).stat().st_mtime
+    except OSError:
+        return None
 
 # -----------------------------------------------------------------------------
 # 🚀 VISTA DE DASHBOARD (Optimización Aplicada)
@@ -31,6 +79,8 @@ from .models import ElementoInventario, ClaseInventario, Proveedor, MovimientoIn
 # -----------------------------------------------------------------------------
 
 @login_required
+@condicional_por_version(*TABLAS_DASHBOARD)
+@lecturas_en_replica(*TABLAS_DASHBOARD)
 def inventario_dashboard(request):
     """Muestra el inventario general (stock actual) y el registro de movimientos, aplicando filtrado."""
     
@@ -42,11 +92,11 @@ def inventario_dashboard(request):
     # Inventario: Optimizada (clase)
     inventario_base = ElementoInventario.objects.select_related('clase')
     
-    # MOVIMIENTOS: Optimizada para el Elemento (ubicacion) y el Responsable (nombre)
+    # MOVIMIENTOS: Optimizada para el Elemento (ubicacion); el nombre del Responsable
+    # se resuelve en SQL como columna plana (sin instanciar User por fila)
     movimientos_base = MovimientoInventario.objects.select_related(
-        'elemento', 
-        'responsable'
-    ).order_by('-fecha_movimiento')
+        'elemento', 'ubicacion'
+    ).con_responsable_display().order_by('-fecha_movimiento')
     
     inventario_list = inventario_base
     movimientos_list = movimientos_base
@@ -81,8 +131,10 @@ def inventario_dashboard(request):
             inventario_list = inventario_base.order_by('id') 
 
         elif current_filter == 'Ubicacion':
+            # El texto se busca en el catálogo de ubicaciones (pocas filas) y los
+            # elementos se filtran por la llave foránea indexada
             inventario_list = inventario_list.filter(
-                ubicacion__icontains=current_search
+                ubicacion_principal__in=Ubicacion.objects.filter(nombre__icontains=current_search)
             ).order_by('descripcion')
             movimientos_list = movimientos_base[:50] 
             
@@ -96,22 +148,20 @@ def inventario_dashboard(request):
         'movimientos_list': movimientos_list,
         'current_search': current_search,
         'current_filter': current_filter,
+        # La tabla de inventario se cachea por versión de estas tablas ({% cache_datos %})
+        'tablas_inventario': TABLAS_TABLA_INVENTARIO,
+        # Widget de alertas: sólo lee la tabla de alertas abiertas
+        'alertas': resumen_alertas(),
     }
     return render(request, 'inventario/dashboard.html', context)
 
 
-
-# -----------------------------------------------------------------------------
-# ✅ VISTA CORREGIDA 1: DASHBOARD DE REPORTES (KPIs y Gráfico)
-# -----------------------------------------------------------------------------
-
-@login_required
-def reportes_dashboard(request):
+def _calcular_kpis_reportes():
     """
-    Calcula KPIs, datos para el gráfico y lista los reportes generados 
-    (XLSX, CSV, PDF) para descarga.
+    KPIs, datos del gráfico y categorías de reportes_dashboard. El resultado se
+    cachea por versión de tablas; la ventana de 30 días se refresca al expirar
+    la entrada (CACHE_DATOS_TIMEOUT).
     """
-    
     # 1. --- Lógica de KPIs ---
     
     # a. Valor Total del Inventario
@@ -151,6 +201,31 @@ def reportes_dashboard(request):
         'data': [float(item['valor_total_clase']) for item in datos_grafico_qs],
     }
     
+    return {
+        'valor_inventario': valor_inventario_total.quantize(Decimal('0.01')),
+        'valor_entradas': valor_entradas_recientes.quantize(Decimal('0.01')),
+        'valor_salidas': valor_salidas_recientes.quantize(Decimal('0.01')),
+        'datos_grafico_json': json.dumps(datos_grafico),
+        'categorias': list(ClaseInventario.objects.all().order_by('nombre')),
+    }
+
+
+# -----------------------------------------------------------------------------
+# ✅ VISTA CORREGIDA 1: DASHBOARD DE REPORTES (KPIs y Gráfico)
+# -----------------------------------------------------------------------------
+
+@login_required
+@condicional_por_version(*TABLAS_REPORTES, extra=_mtime_reportes)
+@lecturas_en_replica(*TABLAS_REPORTES)
+def reportes_dashboard(request):
+    """
+    Calcula KPIs, datos para el gráfico y lista los reportes generados 
+    (XLSX, CSV, PDF) para descarga.
+    """
+    
+    # 1 y 2. --- KPIs y gráfico: cacheados hasta que cambien inventario o movimientos ---
+    datos = obtener_o_calcular('reportes_kpis', TABLAS_REPORTES, _calcular_kpis_reportes)
+
     # -------------------------------------------------------------------------
     # 🎯 CORRECCIÓN: Obtener listado de reportes generados para la tabla 
     # Usando settings.REPORTS_DIR y Pathlib para robustez.
@@ -190,11 +265,7 @@ def reportes_dashboard(request):
     # --- 4. Preparar Contexto y Renderizar ---
     
     context = {
-        'valor_inventario': valor_inventario_total.quantize(Decimal('0.01')),
-        'valor_entradas': valor_entradas_recientes.quantize(Decimal('0.01')),
-        'valor_salidas': valor_salidas_recientes.quantize(Decimal('0.01')),
-        'datos_grafico_json': json.dumps(datos_grafico),
-        'categorias': ClaseInventario.objects.all().order_by('nombre'),
+        **datos,
         'archivos_generados': archivos_generados, # Enviamos el listado a la plantilla
     }
     
@@ -206,10 +277,14 @@ def reportes_dashboard(request):
 # -----------------------------------------------------------------------------
 
 @login_required
+@con_admision('inventario', 'inventario:reportes')
+@lecturas_en_replica(*TABLAS_TABLA_INVENTARIO)
 def generar_reporte(request):
     """
     Genera el reporte de INVENTARIO.
     """
+    from . import reportes  # importación diferida (openpyxl)
+
     if request.method == 'GET':
         tipo_reporte = request.GET.get('tipo_reporte', 'Inventario Total')
         # Se agrega 'CSV' como opción por defecto si no se especifica.
@@ -222,10 +297,10 @@ def generar_reporte(request):
         filename = None
         
         if formato == 'XLSX':
-            filename = _generar_excel_y_guardar(reporte_data, tipo_reporte) 
+            filename = reportes.generar_excel_y_guardar(reporte_data, tipo_reporte) 
             
         elif formato == 'CSV':
-            filename = _generar_csv_y_guardar(reporte_data, tipo_reporte) 
+            filename = reportes.generar_csv_y_guardar(reporte_data, tipo_reporte) 
 
         elif formato == 'PDF':
             messages.warning(request, "La generación de PDF requiere implementación.")
@@ -245,10 +320,14 @@ def generar_reporte(request):
 # -----------------------------------------------------------------------------
 
 @login_required
+@con_admision('movimientos', 'inventario:reportes')
+@lecturas_en_replica(*TABLAS_REPORTES)
 def generar_reporte_movimientos(request):
     """
     Genera el reporte de MOVIMIENTOS con formato simplificado.
     """
+    from . import reportes  # importación diferida (openpyxl)
+
     if request.method == 'GET':
         formato = request.GET.get('formato', 'XLSX')
         
@@ -256,7 +335,7 @@ def generar_reporte_movimientos(request):
         try:
             movimientos_data = MovimientoInventario.objects.select_related(
                 'elemento' 
-            ).order_by('-fecha_movimiento') 
+            ).con_responsable_display().order_by('-fecha_movimiento') 
             
             if not movimientos_data.exists():
                 return redirect('inventario:reportes')
@@ -269,10 +348,10 @@ def generar_reporte_movimientos(request):
         filename = None
         
         if formato == 'XLSX':
-            filename = _generar_excel_movimientos_y_guardar(movimientos_data) 
+            filename = reportes.generar_excel_movimientos_y_guardar(movimientos_data) 
             
         elif formato == 'CSV':
-            filename = _generar_csv_movimientos_y_guardar(movimientos_data)
+            filename = reportes.generar_csv_movimientos_y_guardar(movimientos_data)
         
         
         # Manejo de redirección para formatos XLSX y CSV
@@ -284,6 +363,49 @@ def generar_reporte_movimientos(request):
     # Si la solicitud no es GET o si cae por defecto
     return redirect('inventario:reportes')
         
+@login_required
+def estado_reportes(request):
+    """
+    Estado de la admisión de reportes en este proceso: en ejecución, en cola,
+    rechazos y tiempos de espera. Sólo el Administrador ve los usuarios.
+    """
+    detalle = obtener_nivel_acceso(request) == 1
+    return JsonResponse(controlador_reportes.estado(detalle=detalle), json_dumps_params={'indent': 2})
+
+
+# -----------------------------------------------------------------------------
+# 🔄 FEED DE CAMBIOS PARA SINCRONIZACIÓN (ERP)
+# -----------------------------------------------------------------------------
+
+def _responder_feed(request, obtener_pagina):
+    """
+    ?cursor=<opaco>&limite=<n>&formato=ndjson|json. NDJSON se transmite fila
+    a fila desde el iterador de la consulta; la última línea trae el cursor.
+    """
+    try:
+        pagina = obtener_pagina(request.GET.get('cursor') or None, limite_de(request.GET.get('limite')))
+    except CursorInvalido as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(como_dict(pagina))
+    response = StreamingHttpResponse(como_ndjson(pagina), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@nivel_requerido(1, 2, login_url='/dashboard/')
+def cambios_movimientos(request):
+    """Movimientos registrados después del cursor (sustituye la descarga completa nocturna)."""
+    return _responder_feed(request, pagina_movimientos)
+
+
+@nivel_requerido(1, 2, login_url='/dashboard/')
+def cambios_elementos(request):
+    """Elementos creados o modificados después del cursor."""
+    return _responder_feed(request, pagina_elementos)
+
+
 # -----------------------------------------------------------------------------
 # 📥 VISTA CORREGIDA 3: DESCARGAR ARCHIVO ESTATICO
 # -----------------------------------------------------------------------------
@@ -329,290 +451,6 @@ def descargar_reporte(request, filename):
 
 # -----------------------------------------------------------------------------
 
-# --- FUNCIÓN AUXILIAR PARA GENERAR EXCEL Y GUARDAR (¡CORREGIDA!) ---
-
-def _generar_excel_y_guardar(reporte_data, tipo_reporte):
-
-    """Genera un archivo XLSX, lo GUARDA en el disco (MEDIA_ROOT/reports)
-
-    y retorna el nombre del archivo generado. """
-
-    try:
-
-        REPORTS_DIR = os.path.join(settings.MEDIA_ROOT, 'reports')
-
-        # Asegurarse de que el directorio de reportes exista
-
-        os.makedirs(REPORTS_DIR, exist_ok=True)
-
-        workbook = Workbook()
-
-        sheet = workbook.active
-
-        sheet.title = "Inventario General"
-
-        # Encabezados SOLICITADOS: ID, Clase, Descripción, Unidad, Existencia, Costo
-
-        headers = [
-
-            "ID", "Clase", "Descripción", "Unidad", "Existencia", "Costo"
-
-        ]
-
-        sheet.append(headers)
-
-
-        # Llenar datos
-
-        for item in reporte_data:
-
-            # Uso de Decimal para manejar stock y costo, evitando None
-
-            stock = item.stock_actual if item.stock_actual is not None else Decimal('0.00')
-
-            costo = item.costo_unitario if item.costo_unitario is not None else Decimal('0.00')
-
-           
-
-            # Fila de datos con el orden y campos deseados (6 columnas)
-
-            row = [
-
-                item.id,
-
-                item.clase.nombre, # Clase
-
-                item.descripcion, # Descripción
-
-                item.unidad, # Unidad
-
-                float(stock), # Existencia (Stock Actual)
-
-                float(costo), # Costo (Costo Unitario)
-
-            ]
-
-            sheet.append(row)
-
-
-
-        # 1. Generar nombre de archivo
-
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-
-        filename = f"{tipo_reporte.replace(' ', '_')}_{timestamp}.xlsx"
-
-        file_path = os.path.join(REPORTS_DIR, filename)
-
-
-        # 2. Guardar el libro directamente en la ruta del disco
-
-        workbook.save(file_path)
-
-        return filename
-
-    except Exception as e:
-
-        # Esto imprimirá el error exacto si ocurre uno, ayudando a la depuración.
-
-        print(f"Error al guardar el archivo de Excel: {e}")
-
-        return None 
-
-# -----------------------------------------------------------------------------
-# -----------------------------------------------------------------------------
-
-# --- FUNCIÓN AUXILIAR PARA GENERAR CSV DE INVENTARIO Y GUARDAR ---
-def _generar_csv_y_guardar(reporte_data, tipo_reporte):
-    """Genera un archivo CSV, lo GUARDA en el disco (MEDIA_ROOT/reports)
-    y retorna el nombre del archivo generado.
-    """
-    try:
-        REPORTS_DIR = os.path.join(settings.MEDIA_ROOT, 'reports')
-        os.makedirs(REPORTS_DIR, exist_ok=True)
-        
-        # 1. Generar nombre de archivo
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-        # Cambiamos la extensión a .csv
-        filename = f"{tipo_reporte.replace(' ', '_')}_{timestamp}.csv"
-        file_path = os.path.join(REPORTS_DIR, filename)
-
-        # 2. Definir encabezados (igual que el XLSX)
-        headers = [
-            "ID", "Clase", "Descripcion", "Unidad", "Existencia", "Costo"
-        ]
-        
-        # 3. Escribir el archivo CSV
-        # Usamos 'w' y 'newline=""' y 'encoding="utf-8"' para compatibilidad
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            # Usamos el delimitador de coma estándar
-            writer = csv.writer(csvfile)
-            
-            # Escribir encabezados
-            writer.writerow(headers)
-            
-            # Escribir datos
-            for item in reporte_data:
-                stock = item.stock_actual if item.stock_actual is not None else Decimal('0.00')
-                costo = item.costo_unitario if item.costo_unitario is not None else Decimal('0.00')
-                
-                # Fila de datos (similar a XLSX)
-                row = [
-                    item.id,
-                    item.clase.nombre,
-                    item.descripcion,
-                    item.unidad,
-                    float(stock),
-                    float(costo),
-                ]
-                writer.writerow(row)
-                
-        return filename
-
-    except Exception as e:
-        # Aquí también es vital imprimir el error si ocurre
-        print(f"Error al guardar el archivo CSV de Inventario: {e}")
-        return None
-        
-# -----------------------------------------------------------------------------
-# -----------------------------------------------------------------------------
-
-
-# --- FUNCIÓN AUXILIAR PARA GENERAR EXCEL DE MOVIMIENTOS Y GUARDAR (FORMATO SIMPLIFICADO) ---
-
-
-def _generar_excel_movimientos_y_guardar(movimientos_data):
-    """Genera un archivo XLSX para movimientos con formato simplificado: 
-    Fecha, Ubicación, Destino/Referencia, Cantidad.
-    """
-    
-    tipo_reporte = "Reporte_de_Movimientos_Simplificado" # Usamos underscores directamente
-
-    try:
-        REPORTS_DIR = os.path.join(settings.MEDIA_ROOT, 'reports')
-        os.makedirs(REPORTS_DIR, exist_ok=True)
-        
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = "Movimientos Simples"
-        
-        # 1. ENCABEZADOS DESEADOS
-        headers = [
-            "Fecha", 
-            "Ubicación (Almacén)", 
-            "Destino/Referencia", 
-            "Elemento", 
-            "Cantidad"
-        ]
-        sheet.append(headers)
-
-        # Llenar datos
-        for item in movimientos_data:
-            
-            # Verificación de la relación crítica
-            elemento_descripcion = item.elemento.descripcion if item.elemento else "Elemento Desconocido"
-            elemento_ubicacion = item.elemento.ubicacion if item.elemento and item.elemento.ubicacion else "N/A"
-
-            # Conversión y manejo de Nulos
-            cantidad = item.cantidad if item.cantidad is not None else Decimal('0.00')
-            fecha_str = item.fecha_movimiento.strftime('%Y-%m-%d %H:%M:%S') if item.fecha_movimiento else ""
-            
-            # Formatear la cantidad para indicar ENTRADA o SALIDA
-            if item.tipo == 'SALIDA':
-                # Si es salida, la cantidad es negativa
-                cantidad_formateada = float(cantidad) * -1
-            else:
-                # Si es entrada, la cantidad es positiva
-                cantidad_formateada = float(cantidad)
-            
-            # 2. FILA DE DATOS
-            row = [
-                fecha_str,                             
-                elemento_ubicacion,                    # Ubicación (Manejada para evitar None)
-                item.referencia or "",                 # Destino/Referencia
-                elemento_descripcion,                  # Elemento (Manejada para evitar None)
-                cantidad_formateada                    
-            ]
-            sheet.append(row)
-
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{tipo_reporte}_{timestamp}.xlsx"
-        file_path = os.path.join(REPORTS_DIR, filename)
-
-        workbook.save(file_path)
-        return filename
-
-    except Exception as e:
-        # Esto imprimirá el error exacto en tu consola de Django
-        print(f"Error fatal al generar el Excel de Movimientos: {e}") 
-        return None
-    
-
-# -----------------------------------------------------------------------------
-# -----------------------------------------------------------------------------
-
-# --- FUNCIÓN AUXILIAR PARA GENERAR CSV DE MOVIMIENTOS Y GUARDAR ---
-def _generar_csv_movimientos_y_guardar(movimientos_data):
-    """Genera un archivo CSV para movimientos con formato simplificado:
-    Fecha, Ubicación, Destino/Referencia, Cantidad.
-    """
-    tipo_reporte = "Reporte_de_Movimientos_Simplificado"
-
-    try:
-        REPORTS_DIR = os.path.join(settings.MEDIA_ROOT, 'reports')
-        os.makedirs(REPORTS_DIR, exist_ok=True)
-        
-        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-        # Cambiamos la extensión a .csv
-        filename = f"{tipo_reporte}_{timestamp}.csv"
-        file_path = os.path.join(REPORTS_DIR, filename)
-
-        # 1. ENCABEZADOS DESEADOS
-        headers = [
-            "Fecha",
-            "Ubicacion (Almacen)",
-            "Destino/Referencia",
-            "Elemento",
-            "Cantidad"
-        ]
-        
-        # 2. Escribir el archivo CSV
-        with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(headers)
-
-            # Llenar datos
-            for item in movimientos_data:
-                elemento_descripcion = item.elemento.descripcion if item.elemento else "Elemento Desconocido"
-                # 🚨 CORRECCIÓN APLICADA: Forzar a cadena la relación 'ubicacion' para el CSV writer
-                elemento_ubicacion = str(item.elemento.ubicacion) if item.elemento and item.elemento.ubicacion else "N/A"
-                
-                cantidad = item.cantidad if item.cantidad is not None else Decimal('0.00')
-                fecha_str = item.fecha_movimiento.strftime('%Y-%m-%d %H:%M:%S') if item.fecha_movimiento else ""
-                
-                if item.tipo == 'SALIDA':
-                    cantidad_formateada = float(cantidad) * -1
-                else:
-                    cantidad_formateada = float(cantidad)
-                
-                # 3. FILA DE DATOS
-                row = [
-                    fecha_str,
-                    elemento_ubicacion,
-                    item.referencia or "",
-                    elemento_descripcion,
-                    cantidad_formateada
-                ]
-                writer.writerow(row)
-
-        return filename
-
-    except Exception as e:
-        # 🚨 DEBUG CRÍTICO: Imprimir el error
-        print(f"Error fatal al generar el CSV de Movimientos: {e}")
-        return None
-
-
 # -----------------------------------------------------------------------------
 # 🟢 VISTA DE ENTRADAS (gestion_entradas)
 # (Contenido omitido por ser muy largo)
@@ -641,7 +479,11 @@ def gestion_entradas(request):
         'elementos': elementos,
         'proveedores': proveedores, 
         'clases': clases,
+        'ubicaciones': Ubicacion.objects.filter(activa=True).order_by('nombre'),
         'entradas_temporales': entradas_temporales, 
+        # El escaneo conserva el proveedor del último ítem para escanear en serie
+        'proveedor_escaneo': str(entradas_temporales[-1]['id_proveedor']) if entradas_temporales else '',
+        'clave_confirmacion': _obtener_clave_confirmacion(request, SESSION_KEY),
     }
     return render(request, 'inventario/entradas.html', context)
 
@@ -666,17 +508,52 @@ def gestion_salidas(request):
             return _eliminar_item_temporal(request, SESSION_KEY, salidas_temporales, 'inventario:salidas') 
 
     # --- LÓGICA DE RENDERIZADO (GET) ---
-    elementos = ElementoInventario.objects.select_related('clase').order_by('descripcion')
+    # El stock mostrado descuenta lo apartado por otros carritos (una sola consulta).
+    elementos = anotar_disponible(
+        ElementoInventario.objects.select_related('clase')
+    ).order_by('descripcion')
     clases = ClaseInventario.objects.all().order_by('id') 
 
     context = {
         'elementos': elementos,
         'clases': clases,
+        'ubicaciones': Ubicacion.objects.filter(activa=True).order_by('nombre'),
         'salidas_temporales': salidas_temporales, 
+        'destinos': DESTINOS_SALIDA,
+        # El escaneo conserva el destino del último ítem para escanear en serie
+        'destino_escaneo': salidas_temporales[-1]['destino_referencia'] if salidas_temporales else '',
+        'clave_confirmacion': _obtener_clave_confirmacion(request, SESSION_KEY),
     }
     return render(request, 'inventario/salidas.html', context)
 
 
+@login_required
+@require_POST
+def escanear_codigo(request, carrito):
+    """
+    Agrega al carrito de entradas o salidas el elemento del código escaneado:
+    una búsqueda por el índice único de `codigo`. Proveedor / destino, ubicación
+    y cantidad viajan en el formulario de escaneo, igual que al agregar a mano.
+    """
+    if carrito not in ('entradas', 'salidas'):
+        raise Http404("Carrito no válido.")
+
+    try:
+        elemento = buscar_por_codigo(request.POST.get('codigo'), ElementoInventario.objects.only('id'))
+    except CodigoInvalido as e:
+        messages.error(request, str(e))
+        return redirect(f'inventario:{carrito}')
+    if elemento is None:
+        messages.error(request, f"No hay un elemento con el código '{request.POST.get('codigo', '').strip()}'.")
+        return redirect(f'inventario:{carrito}')
+
+    SESSION_KEY = f'{carrito}_temp'
+    items_temporales = request.session.get(SESSION_KEY, [])
+    if carrito == 'entradas':
+        return _agregar_entrada_temporal(request, SESSION_KEY, items_temporales, elemento_id=elemento.id)
+    return _agregar_salida_temporal(request, SESSION_KEY, items_temporales, elemento_id=elemento.id)
+
+
 # -----------------------------------------------------------------------------
 # 📦 OTRAS VISTAS (CRUD Proveedores, etc.)
 # (Contenido omitido por ser muy largo)
@@ -687,6 +564,47 @@ def gestion_inventario(request):
     messages.info(request, "Vista de Gestión de Inventario (CRUD) en desarrollo.")
     return redirect('inventario:dashboard') 
 
+@login_required
+def alertas_stock(request):
+    """
+    Alertas de stock abiertas (paginación por clave, más recientes primero) y
+    definición de los umbrales mínimo/máximo de un elemento: desde la fila de
+    su alerta o buscándolo por código o id (sin cargar el catálogo).
+    """
+    if request.method == 'POST':
+        elemento, error = _elemento_del_formulario(request, ElementoInventario.objects.only('id'))
+        if error:
+            messages.error(request, error)
+            return redirect('inventario:alertas_stock')
+        try:
+            minimo, maximo = leer_umbrales(request.POST.get('stock_minimo'), request.POST.get('stock_maximo'))
+            elemento = definir_umbrales(elemento.id, minimo, maximo)
+            messages.success(request, f"Umbrales de '{elemento.descripcion}' actualizados.")
+        except UmbralInvalido as e:
+            messages.error(request, str(e))
+        return redirect('inventario:alertas_stock')
+
+    tipo = request.GET.get('tipo', '').strip()
+    alertas_qs = AlertaStock.objects.select_related('elemento')
+    if tipo in ('BAJO', 'EXCESO'):
+        alertas_qs = alertas_qs.filter(tipo=tipo)
+
+    pagina = paginar_por_clave(
+        alertas_qs,
+        ('-abierta_en', '-id'),
+        cursor=request.GET.get('cursor'),
+        direccion=request.GET.get('dir', 'siguiente'),
+    )
+    context = {
+        'alertas': pagina,
+        'pagina': pagina,
+        'tipo': tipo,
+        'resumen': resumen_alertas(limite=0),
+        'params_busqueda': urlencode({'tipo': tipo}),
+    }
+    return render(request, 'inventario/alertas.html', context)
+
+
 @login_required
 def crear_producto(request):
     """Vista principal para manejar el POST del modal 'Nuevo Producto'."""
@@ -695,8 +613,9 @@ def crear_producto(request):
 
 # --- GESTIÓN DE PROVEEDORES (CREAR Y LISTAR) ---
 @login_required
+@condicional_por_version(Proveedor._meta.db_table, CompraMensualProveedor._meta.db_table)
 def gestion_proveedores(request):
-    """Maneja la creación de Proveedores y lista todos los proveedores."""
+    """Maneja la creación de Proveedores y lista proveedores (búsqueda y paginación por clave)."""
     
     if request.method == 'POST':
         # --- CREAR PROVEEDOR ---
@@ -728,12 +647,79 @@ def gestion_proveedores(request):
         return redirect('inventario:proveedores')
     
     # --- LÓGICA DE RENDERIZADO (GET) ---
-    proveedores = Proveedor.objects.all().order_by('nombre')
+    # Búsqueda en servidor + paginación por clave; compras del año desde la tabla agregada
+    busqueda = request.GET.get('q', '').strip()
+    estado = request.GET.get('estado', '').strip()
+    orden = request.GET.get('orden', 'nombre')
+    if orden not in ORDENES_PROVEEDORES:
+        orden = 'nombre'
+    anio = timezone.localdate().year
+
+    proveedores_qs = Proveedor.objects.all()
+    if busqueda:
+        # Búsqueda por prefijo: LIKE 'texto%' puede usar los índices
+        proveedores_qs = proveedores_qs.filter(
+            Q(nombre__istartswith=busqueda)
+            | Q(rfc__istartswith=busqueda)
+            | Q(giro__istartswith=busqueda)
+        )
+    if estado in ('activos', 'inactivos'):
+        proveedores_qs = proveedores_qs.filter(activo=(estado == 'activos'))
+
+    if orden != 'nombre':
+        # Orden por compras: la clave incluye el total anotado
+        proveedores_qs = anotar_compras(proveedores_qs, anio)
+    pagina = paginar_por_clave(
+        proveedores_qs,
+        ORDENES_PROVEEDORES[orden],
+        cursor=request.GET.get('cursor'),
+        direccion=request.GET.get('dir', 'siguiente'),
+    )
+    if orden == 'nombre':
+        # Página por el índice (nombre, id); compras sólo de esos proveedores
+        adjuntar_compras(pagina.items, anio)
+
     context = {
-        'proveedores': proveedores
+        'proveedores': pagina,
+        'pagina': pagina,
+        'busqueda': busqueda,
+        'estado': estado,
+        'orden': orden,
+        'anio': anio,
+        # Parámetros que se conservan en los enlaces de paginación y de orden
+        'params_busqueda': urlencode({'q': busqueda, 'estado': estado, 'orden': orden}),
+        'params_filtro': urlencode({'q': busqueda, 'estado': estado}),
     }
     return render(request, 'inventario/proveedores.html', context)
 
+
+@login_required
+def compras_proveedor(request, proveedor_id):
+    """
+    Analítica de compras de un proveedor (JSON): totales del año, última
+    entrega y tendencia de los últimos 12 meses, desde CompraMensualProveedor.
+    """
+    anio = timezone.localdate().year
+    proveedor = get_object_or_404(anotar_compras(Proveedor.objects.all(), anio), pk=proveedor_id)
+    tendencia = [
+        {
+            'mes': fila['mes'].strftime('%Y-%m'),
+            'importe': f"{fila['importe']:.2f}",
+            'cantidad': f"{fila['cantidad']:.2f}",
+            'partidas': fila['partidas'],
+        }
+        for fila in tendencia_mensual(proveedor.id)
+    ]
+    return JsonResponse({
+        'proveedor': proveedor.nombre,
+        'anio': anio,
+        'importe': f"{proveedor.compras_importe:.2f}",
+        'cantidad': f"{proveedor.compras_cantidad:.2f}",
+        'partidas': proveedor.compras_partidas,
+        'ultima_entrega': proveedor.ultima_entrega.isoformat() if proveedor.ultima_entrega else None,
+        'tendencia': tendencia,
+    }, json_dumps_params={'indent': 2})
+
 # --- VISTA DE EDICIÓN DE PROVEEDOR ---
 @login_required
 def editar_proveedor(request, proveedor_id): 
@@ -791,6 +777,192 @@ def eliminar_proveedor(request, proveedor_id):
     return redirect('inventario:proveedores')
 
 
+# -----------------------------------------------------------------------------
+# 📋 CONTEOS CÍCLICOS
+# -----------------------------------------------------------------------------
+
+@login_required
+def existencias_ubicaciones(request):
+    """
+    Existencias de una ubicación (paginación por clave sobre el índice
+    ubicacion, elemento) y transferencia de stock entre ubicaciones: el
+    stock_actual del elemento no cambia, sólo sus filas de existencia.
+    """
+    if request.method == 'POST':
+        elemento, error = _elemento_del_formulario(request)
+        origen = get_object_or_404(Ubicacion, pk=request.POST.get('origen_id') or 0, activa=True)
+        destino = get_object_or_404(Ubicacion, pk=request.POST.get('destino_id') or 0, activa=True)
+        try:
+            cantidad = Decimal(request.POST.get('cantidad', '').replace(',', '.'))
+        except ArithmeticError:
+            cantidad = None
+
+        if error:
+            messages.error(request, error)
+        elif cantidad is None or cantidad <= 0:
+            messages.error(request, "La cantidad a transferir debe ser un número positivo.")
+        elif origen.id == destino.id:
+            messages.error(request, "El origen y el destino deben ser ubicaciones distintas.")
+        else:
+            try:
+                transferir(elemento.id, origen.id, destino.id, cantidad)
+                messages.success(
+                    request, f"{cantidad} de '{elemento.descripcion}' transferidos de {origen.nombre} a {destino.nombre}."
+                )
+            except ExistenciaInsuficiente as e:
+                messages.error(request, str(e))
+        return redirect(f"{reverse('inventario:ubicaciones')}?{urlencode({'ubicacion_id': origen.id})}")
+
+    ubicaciones = Ubicacion.objects.filter(activa=True).order_by('nombre')
+    ubicacion = None
+    if request.GET.get('ubicacion_id'):
+        ubicacion = get_object_or_404(ubicaciones, pk=request.GET['ubicacion_id'])
+
+    pagina = None
+    if ubicacion:
+        pagina = paginar_por_clave(
+            existencias_en(ubicacion.id),
+            ('elemento_id',),
+            cursor=request.GET.get('cursor'),
+            direccion=request.GET.get('dir', 'siguiente'),
+        )
+    context = {
+        'ubicaciones': ubicaciones,
+        'ubicacion': ubicacion,
+        'existencias': pagina or [],
+        'pagina': pagina,
+        'params_busqueda': urlencode({'ubicacion_id': ubicacion.id if ubicacion else ''}),
+    }
+    return render(request, 'inventario/ubicaciones.html', context)
+
+
+@login_required
+def conteos_ciclicos(request):
+    """Lista las sesiones de conteo y crea una nueva (congela el stock esperado)."""
+    if request.method == 'POST':
+        nombre = request.POST.get('nombre', '').strip()
+        if not nombre:
+            messages.error(request, "El **Nombre** del conteo es obligatorio.")
+            return redirect('inventario:conteos')
+
+        # Un criterio inexistente es un 404, no un conteo vacío ni un 500
+        clase = _opcional_o_404(ClaseInventario.objects.all(), request.POST.get('clase_id'))
+        ubicacion = _opcional_o_404(Ubicacion.objects.filter(activa=True), request.POST.get('ubicacion_id'))
+        conteo, lineas = crear_conteo(
+            nombre, request.user,
+            clase_id=clase.id if clase else None,
+            ubicacion_id=ubicacion.id if ubicacion else None,
+        )
+        if not lineas:
+            messages.warning(request, f"El conteo '{nombre}' no incluye elementos con ese criterio.")
+        else:
+            messages.success(request, f"Conteo '{nombre}' creado con {lineas} elementos.")
+        return redirect('inventario:conteo_detalle', conteo_id=conteo.id)
+
+    context = {
+        'conteos': ConteoCiclico.objects.select_related('creado_por', 'clase', 'ubicacion')
+        .annotate(lineas_total=Count('lineas')).order_by('-creado_en')[:50],
+        'clases': ClaseInventario.objects.order_by('nombre'),
+        'ubicaciones': Ubicacion.objects.filter(activa=True).order_by('nombre'),
+    }
+    return render(request, 'inventario/conteos.html', context)
+
+
+@login_required
+def conteo_detalle(request, conteo_id):
+    """
+    Líneas de una sesión (paginación por clave) con captura individual (id o
+    código escaneado), carga masiva por CSV (elemento|codigo|descripcion,
+    cantidad), aplicación y cancelación.
+    """
+    conteo = get_object_or_404(ConteoCiclico.objects.select_related('creado_por', 'aplicado_por'), pk=conteo_id)
+
+    if request.method == 'POST':
+        try:
+            if 'aplicar' in request.POST:
+                ajustes, recortados, sin_existencia = aplicar_conteo(conteo.id, request.user)
+                messages.success(request, f"Conteo aplicado: {ajustes} movimientos de ajuste registrados.")
+                if recortados:
+                    messages.warning(request, (
+                        f"{len(recortados)} elementos tuvieron salidas después de congelar el conteo y su "
+                        f"faltante sólo se ajustó hasta stock 0 (ids: {_lista_de_ids(recortados)})."
+                    ))
+                if sin_existencia:
+                    messages.warning(request, (
+                        f"{len(sin_existencia)} elementos no tenían existencia suficiente en su ubicación "
+                        f"principal; quedó en 0 (ids: {_lista_de_ids(sin_existencia)}). Revise sus ubicaciones."
+                    ))
+            elif 'cancelar' in request.POST:
+                cancelar_conteo(conteo.id)
+                messages.info(request, "Conteo cancelado sin ajustes.")
+            elif 'importar' in request.POST:
+                _importar_cantidades_conteo(request, conteo)
+            elif not (request.POST.get('codigo', '').strip() or request.POST.get('elemento_id', '').strip()):
+                messages.error(request, "Escanea un código o escribe el id del elemento.")
+            else:
+                cantidades, errores = leer_cantidades([(1, {
+                    'elemento': request.POST.get('elemento_id', '').strip(),
+                    'codigo': request.POST.get('codigo', '').strip(),
+                    'cantidad': request.POST.get('cantidad', '').strip(),
+                })])
+                if errores:
+                    messages.error(request, errores[0][2])
+                else:
+                    registradas, fuera = registrar_cantidades(conteo.id, cantidades)
+                    if fuera:
+                        messages.error(request, f"El elemento {fuera[0]} no forma parte de este conteo.")
+                    else:
+                        messages.success(request, "Cantidad registrada.")
+        except ConteoNoAbierto as e:
+            messages.error(request, str(e))
+        except UnicodeDecodeError:
+            messages.error(request, 'El archivo debe estar codificado en UTF-8.')
+        return redirect('inventario:conteo_detalle', conteo_id=conteo.id)
+
+    ver = request.GET.get('ver', '')
+    lineas_qs = conteo.lineas.select_related('elemento')
+    if ver == 'pendientes':
+        lineas_qs = lineas_qs.filter(contado__isnull=True)
+    elif ver == 'diferencias':
+        lineas_qs = lineas_qs.filter(contado__isnull=False).exclude(contado=F('esperado'))
+
+    pagina = paginar_por_clave(
+        lineas_qs,
+        ('elemento_id',),
+        cursor=request.GET.get('cursor'),
+        direccion=request.GET.get('dir', 'siguiente'),
+    )
+    context = {
+        'conteo': conteo,
+        'lineas': pagina,
+        'pagina': pagina,
+        'ver': ver,
+        'resumen': resumen_conteo(conteo),
+        'params_busqueda': urlencode({'ver': ver}),
+    }
+    return render(request, 'inventario/conteo_detalle.html', context)
+
+
+def _importar_cantidades_conteo(request, conteo):
+    """Carga masiva de cantidades contadas desde un CSV."""
+    if 'archivo_csv' not in request.FILES:
+        messages.error(request, 'Selecciona un archivo CSV para importar.')
+        return
+
+    cantidades, errores = leer_cantidades(leer_csv(request.FILES['archivo_csv']))
+    registradas, fuera = registrar_cantidades(conteo.id, cantidades)
+    if registradas:
+        messages.success(request, f'{registradas} cantidades registradas.')
+    if fuera:
+        messages.warning(request, f'{len(fuera)} elementos del archivo no forman parte de este conteo.')
+
+    # Se muestran sólo los primeros fallos para no saturar la página
+    for linea, referencia, motivo in errores[:20]:
+        messages.error(request, f'Línea {linea} ({referencia or "sin elemento"}): {motivo}')
+    if len(errores) > 20:
+        messages.warning(request, f'... y {len(errores) - 20} filas más con error.')
+
+
 # -----------------------------------------------------------------------------
 # 🛠️ FUNCIONES AUXILIARES GENERALES
 # (Contenido omitido por ser muy largo)
@@ -820,25 +992,35 @@ def _crear_nuevo_producto_logica(request):
     try:
         clase = get_object_or_404(ClaseInventario, pk=clase_id)
         costo = Decimal(costo_str) 
+        minimo, maximo = leer_umbrales(request.POST.get('stock_minimo'), request.POST.get('stock_maximo'))
+        codigo = normalizar_codigo(request.POST.get('codigo'))
         
         if costo < 0:
             messages.error(request, "El costo unitario no puede ser negativo.")
             return redirect(referer)
 
-        nuevo_elemento = ElementoInventario.objects.create(
-            descripcion=descripcion,
-            clase=clase,
-            unidad=unidad,
-            costo_unitario=costo, 
-            ubicacion=ubicacion, 
-            stock_actual=Decimal('0.00'), 
-        )
+        with transaction.atomic():
+            nuevo_elemento = ElementoInventario.objects.create(
+                descripcion=descripcion,
+                codigo=codigo,
+                clase=clase,
+                unidad=unidad,
+                costo_unitario=costo, 
+                ubicacion=ubicacion, 
+                ubicacion_principal=obtener_o_crear_ubicacion(ubicacion),
+                stock_actual=Decimal('0.00'), 
+                stock_minimo=minimo,
+                stock_maximo=maximo,
+            )
+            evaluar_alertas([nuevo_elemento])
         messages.success(request, f"Producto '{nuevo_elemento.descripcion}' creado con éxito.")
         
+    except (UmbralInvalido, CodigoInvalido) as e:
+        messages.error(request, str(e))
     except ValueError:
         messages.error(request, "El costo debe ser un número válido.")
     except IntegrityError:
-        messages.error(request, f"Error: Ya existe un producto con la descripción '{descripcion}'.")
+        messages.error(request, f"Error: Ya existe un producto con la descripción '{descripcion}' o con ese código.")
     except Exception as e:
         messages.error(request, f"Error al crear el producto: {e}")
         
@@ -862,7 +1044,9 @@ def _eliminar_item_temporal(request, SESSION_KEY, items_temporales, redirect_to_
         index = int(item_index)
         
         if 0 <= index < len(items_temporales):
-            del items_temporales[index]
+            item_eliminado = items_temporales.pop(index)
+            # Las líneas de salida llevan una reserva de stock que se libera aquí
+            liberar_reservas([item_eliminado.get('id_reserva')], request.user)
             request.session[SESSION_KEY] = items_temporales
             request.session.modified = True
             
@@ -881,6 +1065,115 @@ def _eliminar_item_temporal(request, SESSION_KEY, items_temporales, redirect_to_
     return redirect(redirect_to_url_name)
 
 
+class ConfirmacionDuplicada(Exception):
+    """Otra petición con la misma clave de confirmación ya registró el carrito."""
+
+
+def _obtener_clave_confirmacion(request, SESSION_KEY):
+    """
+    Emite (o reutiliza) la clave de idempotencia del carrito. Viaja oculta en el
+    formulario de confirmación para reconocer los dobles envíos.
+    """
+    CLAVE_KEY = f'{SESSION_KEY}_clave'
+    clave = request.session.get(CLAVE_KEY)
+
+    if not clave:
+        clave = uuid.uuid4().hex
+        request.session[CLAVE_KEY] = clave
+        request.session.modified = True
+
+    return clave
+
+
+def _registrar_confirmacion(request, clave, tipo, items_procesados, mensaje):
+    """
+    Inserta la clave en ConfirmacionLote (índice único). Retorna False si otra
+    petición con la misma clave ya la registró.
+    """
+    try:
+        with transaction.atomic():
+            ConfirmacionLote.objects.create(
+                clave=clave,
+                tipo=tipo,
+                responsable=request.user,
+                items_procesados=items_procesados,
+                mensaje=mensaje,
+            )
+        return True
+    except IntegrityError:
+        return False
+
+
+def _repetir_confirmacion(request, SESSION_KEY, clave, redirect_to_url_name):
+    """
+    Responde a un envío duplicado con el resultado original, sin volver a
+    bloquear ni modificar el inventario.
+    """
+    confirmacion = ConfirmacionLote.objects.filter(clave=clave, responsable=request.user).first()
+    if confirmacion is None:
+        return None
+
+    request.session.pop(SESSION_KEY, None)
+    request.session.pop(f'{SESSION_KEY}_lote', None)
+    request.session.pop(f'{SESSION_KEY}_clave', None)
+    request.session.modified = True
+
+    messages.success(request, confirmacion.mensaje)
+    return redirect(redirect_to_url_name)
+
+
+def _elemento_del_formulario(request, queryset=None):
+    """
+    Elemento indicado por `codigo` (escaneado, índice único) o, si no hay
+    código, por `elemento_id`. Retorna (elemento, None) o (None, mensaje).
+    """
+    queryset = ElementoInventario.objects.all() if queryset is None else queryset
+    codigo = request.POST.get('codigo', '').strip()
+    if codigo:
+        try:
+            elemento = buscar_por_codigo(codigo, queryset)
+        except CodigoInvalido as e:
+            return None, str(e)
+        if elemento is None:
+            return None, f"No hay un elemento con el código '{codigo}'."
+        return elemento, None
+
+    elemento_id = request.POST.get('elemento_id', '').strip()
+    if not elemento_id.isdigit():
+        return None, "Escanea un código o escribe el id del elemento."
+    elemento = queryset.filter(pk=int(elemento_id)).first()
+    if elemento is None:
+        return None, f"No existe el elemento {elemento_id}."
+    return elemento, None
+
+
+def _lista_de_ids(ids, maximo=20):
+    """Ids separados por coma para un mensaje, recortando listas largas."""
+    texto = ', '.join(str(i) for i in ids[:maximo])
+    return f"{texto}, ... y {len(ids) - maximo} más" if len(ids) > maximo else texto
+
+
+def _opcional_o_404(queryset, valor):
+    """Objeto de un id opcional del formulario: None si viene vacío, 404 si no existe."""
+    valor = (valor or '').strip()
+    if not valor:
+        return None
+    if not valor.isdigit():
+        raise Http404("El criterio indicado no existe.")
+    return get_object_or_404(queryset, pk=int(valor))
+
+
+def _ubicacion_del_item(request, elemento):
+    """
+    Ubicación elegida en el formulario (`ubicacion_id`) o, si no se eligió,
+    la ubicación principal del elemento. Puede ser None.
+    """
+    ubicacion_id = request.POST.get('ubicacion_id')
+    if ubicacion_id:
+        return get_object_or_404(Ubicacion, pk=ubicacion_id, activa=True)
+    return elemento.ubicacion_principal
+
+
 # -----------------------------------------------------------------------------
 # 🛠️ FUNCIONES AUXILIARES DE ENTRADAS
 # (Contenido omitido por ser muy largo)
@@ -907,9 +1200,12 @@ def _obtener_folio_y_fecha(request, SESSION_KEY):
     return lote_info['folio'], lote_info['fecha']
 
 
-def _agregar_entrada_temporal(request, SESSION_KEY, entradas_temporales):
-    """Lógica para agregar un ítem al carrito temporal de Entrada (Sesión)."""
-    elemento_id = request.POST.get('descripcion')
+def _agregar_entrada_temporal(request, SESSION_KEY, entradas_temporales, elemento_id=None):
+    """
+    Lógica para agregar un ítem al carrito temporal de Entrada (Sesión).
+    `elemento_id` viene del escaneo; si no, del selector de descripción.
+    """
+    elemento_id = elemento_id or request.POST.get('descripcion')
     cantidad_str = request.POST.get('cantidad')
     proveedor_id = request.POST.get('proveedor_id')
 
@@ -932,6 +1228,7 @@ def _agregar_entrada_temporal(request, SESSION_KEY, entradas_temporales):
             return redirect('inventario:entradas')
             
         precio_unitario_decimal = getattr(elemento, 'costo_unitario', Decimal('0.00')) 
+        ubicacion = _ubicacion_del_item(request, elemento)
         
         item_temporal = {
             'id_elemento': elemento.id,
@@ -946,6 +1243,8 @@ def _agregar_entrada_temporal(request, SESSION_KEY, entradas_temporales):
             'rfc': getattr(proveedor, 'rfc', ''),
             'folio': folio_automatico, 
             'fecha': fecha_automatica, 
+            'id_ubicacion': ubicacion.id if ubicacion else None,
+            'nombre_ubicacion': ubicacion.nombre if ubicacion else '',
         }
         
         entradas_temporales.append(item_temporal)
@@ -965,13 +1264,29 @@ def _agregar_entrada_temporal(request, SESSION_KEY, entradas_temporales):
 def _confirmar_entradas(request, SESSION_KEY, entradas_temporales):
     """Lógica para guardar todos los ítems de ENTRADA en la base de datos y sumar stock."""
     LOTE_KEY = f'{SESSION_KEY}_lote'
+    clave = request.POST.get('clave_confirmacion', '').strip()
+
+    # Doble envío: la clave ya está confirmada, se repite el resultado original
+    if clave:
+        respuesta_previa = _repetir_confirmacion(request, SESSION_KEY, clave, 'inventario:entradas')
+        if respuesta_previa:
+            return respuesta_previa
     
     if not entradas_temporales:
         messages.error(request, "No hay elementos para confirmar la entrada.")
         return redirect('inventario:entradas')
 
+    mensaje_exito = f"Entradas registradas y confirmadas con éxito. {len(entradas_temporales)} ítems procesados."
+
     try:
         with transaction.atomic():
+            # La clave se registra ANTES de bloquear elementos: un envío concurrente
+            # con la misma clave choca contra el índice único y no toma bloqueos.
+            if clave and not _registrar_confirmacion(request, clave, 'ENTRADA', len(entradas_temporales), mensaje_exito):
+                raise ConfirmacionDuplicada(clave)
+
+            compras = []
+            tocados = []
             for item in entradas_temporales:
                 # 1. Convertir str de vuelta a Decimal para DB y cálculos
                 cantidad_db = Decimal(item['cantidad'])
@@ -982,7 +1297,7 @@ def _confirmar_entradas(request, SESSION_KEY, entradas_temporales):
                 proveedor = get_object_or_404(Proveedor, pk=item['id_proveedor'])
                 
                 # Crear el Movimiento de Inventario
-                MovimientoInventario.objects.create(
+                movimiento = MovimientoInventario.objects.create(
                     elemento=elemento,
                     tipo='ENTRADA',
                     cantidad=cantidad_db, 
@@ -991,7 +1306,10 @@ def _confirmar_entradas(request, SESSION_KEY, entradas_temporales):
                     responsable=request.user,
                     proveedor=proveedor,
                     folio_documento=item.get('folio', ''), 
+                    ubicacion_id=item.get('id_ubicacion'),
                 )
+                if item.get('id_ubicacion'):
+                    sumar_existencia(elemento, item['id_ubicacion'], cantidad_db)
 
                 # CORRECCIÓN CLAVE: Aseguramos Decimal y realizamos la suma
                 stock_actual_decimal = Decimal(elemento.stock_actual) if elemento.stock_actual is not None else Decimal('0.00')
@@ -999,14 +1317,24 @@ def _confirmar_entradas(request, SESSION_KEY, entradas_temporales):
                 # -----------------------------------------------------------
                 
                 elemento.save()
+                compras.append((proveedor.id, cantidad_db, precio_unitario_db, movimiento.fecha_movimiento))
+                tocados.append(elemento)
+
+            # Analítica de proveedores: se acumula en la misma transacción
+            registrar_compras(compras)
+            # Alertas de stock sólo de los elementos confirmados (ya bloqueados)
+            evaluar_alertas(tocados)
             
             # Limpiar la sesión después de confirmar
             request.session.pop(SESSION_KEY, None)
             request.session.pop(LOTE_KEY, None)
+            request.session.pop(f'{SESSION_KEY}_clave', None)
             request.session.modified = True
             
-            messages.success(request, f"Entradas registradas y confirmadas con éxito. {len(entradas_temporales)} ítems procesados.")
+            messages.success(request, mensaje_exito)
         
+    except ConfirmacionDuplicada:
+        return _repetir_confirmacion(request, SESSION_KEY, clave, 'inventario:entradas') or redirect('inventario:entradas')
     except Exception as e:
         messages.error(request, f"Error al confirmar las entradas. Transacción revertida. Detalle: {e}")
         
@@ -1018,12 +1346,13 @@ def _confirmar_entradas(request, SESSION_KEY, entradas_temporales):
 # (Contenido omitido por ser muy largo)
 # -----------------------------------------------------------------------------
 
-def _agregar_salida_temporal(request, SESSION_KEY, salidas_temporales):
+def _agregar_salida_temporal(request, SESSION_KEY, salidas_temporales, elemento_id=None):
     """
     Lógica para agregar un ítem al carrito temporal de Salida (Sesión)
-    VALIDANDO el stock actual.
+    VALIDANDO el stock actual. `elemento_id` viene del escaneo; si no, del
+    selector de descripción.
     """
-    elemento_id = request.POST.get('descripcion')
+    elemento_id = elemento_id or request.POST.get('descripcion')
     cantidad_str = request.POST.get('cantidad')
     destino_referencia = request.POST.get('destino_referencia')
 
@@ -1032,21 +1361,42 @@ def _agregar_salida_temporal(request, SESSION_KEY, salidas_temporales):
         return redirect('inventario:salidas')
 
     try:
-        elemento = get_object_or_404(ElementoInventario, pk=elemento_id)
-        
         # 1. Usar Decimal para el cálculo y validación
         cantidad_decimal = Decimal(cantidad_str.replace(',', '.')) 
-        
-        # CORRECCIÓN: Aseguramos que stock_actual es Decimal para la validación
-        stock_actual = Decimal(elemento.stock_actual) if elemento.stock_actual is not None else Decimal('0.00')
 
         if cantidad_decimal <= 0:
             messages.error(request, "La cantidad a retirar debe ser positiva.")
             return redirect('inventario:salidas')
-            
-        # Validación de Stock
-        if cantidad_decimal > stock_actual:
-            messages.error(request, f"Stock insuficiente para '{elemento.descripcion}'. Disponible: {stock_actual}, Solicitado: {cantidad_decimal}.")
+
+        # La ubicación de origen debe tener la cantidad, descontando lo que este
+        # carrito ya retira de ella; la confirmación lo vuelve a validar con el
+        # elemento bloqueado.
+        elemento_base = get_object_or_404(
+            ElementoInventario.objects.select_related('ubicacion_principal').only(
+                'id', 'descripcion', 'ubicacion_principal'
+            ),
+            pk=elemento_id,
+        )
+        ubicacion = _ubicacion_del_item(request, elemento_base)
+        if ubicacion:
+            en_carrito = sum(
+                (Decimal(item['cantidad']) for item in salidas_temporales
+                 if item['id_elemento'] == elemento_base.id and item.get('id_ubicacion') == ubicacion.id),
+                Decimal('0.00'),
+            )
+            en_ubicacion = existencia_de(elemento_base.id, ubicacion.id) - en_carrito
+            if cantidad_decimal > en_ubicacion:
+                messages.error(request, str(ExistenciaInsuficiente(elemento_base, ubicacion, en_ubicacion, cantidad_decimal)))
+                return redirect('inventario:salidas')
+
+        # Validación de Stock contra lo DISPONIBLE (stock - reservas vigentes de
+        # todos los carritos, incluido este) y reserva de la cantidad solicitada.
+        try:
+            reserva, elemento = reservar_stock(elemento_base.id, cantidad_decimal, request.user)
+        except ElementoInventario.DoesNotExist:
+            raise Http404("El elemento no existe.")
+        except StockInsuficiente as e:
+            messages.error(request, str(e))
             return redirect('inventario:salidas')
             
         precio_unitario_salida = getattr(elemento, 'costo_unitario', Decimal('0.00')) 
@@ -1059,6 +1409,9 @@ def _agregar_salida_temporal(request, SESSION_KEY, salidas_temporales):
             'cantidad': str(cantidad_decimal), 
             'precio_unitario': str(precio_unitario_salida), 
             'destino_referencia': destino_referencia,
+            'id_reserva': reserva.id,
+            'id_ubicacion': ubicacion.id if ubicacion else None,
+            'nombre_ubicacion': ubicacion.nombre if ubicacion else '',
         }
         
         salidas_temporales.append(item_temporal)
@@ -1078,25 +1431,45 @@ def _agregar_salida_temporal(request, SESSION_KEY, salidas_temporales):
 def _confirmar_salidas(request, SESSION_KEY, salidas_temporales):
     """Lógica para guardar todos los ítems de SALIDA en la base de datos y restar stock."""
     
+    clave = request.POST.get('clave_confirmacion', '').strip()
+
+    # Doble envío: la clave ya está confirmada, se repite el resultado original
+    if clave:
+        respuesta_previa = _repetir_confirmacion(request, SESSION_KEY, clave, 'inventario:salidas')
+        if respuesta_previa:
+            return respuesta_previa
+
     if not salidas_temporales:
         messages.error(request, "No hay elementos para confirmar la salida.")
         return redirect('inventario:salidas')
 
+    mensaje_exito = f"Salidas registradas y confirmadas con éxito. {len(salidas_temporales)} ítems procesados."
+
+    # Reservas que este carrito consume al confirmar
+    ids_reserva = [item.get('id_reserva') for item in salidas_temporales if item.get('id_reserva')]
+
     try:
         with transaction.atomic():
+            # La clave se registra ANTES de bloquear elementos (ver _confirmar_entradas)
+            if clave and not _registrar_confirmacion(request, clave, 'SALIDA', len(salidas_temporales), mensaje_exito):
+                raise ConfirmacionDuplicada(clave)
+
+            tocados = []
             for item in salidas_temporales:
                 # 1. Convertir str de vuelta a Decimal para DB y cálculos
                 cantidad_db = Decimal(item['cantidad'])
                 precio_unitario_db = Decimal(item.get('precio_unitario', '0.00')) # Usamos costo como precio de salida
                 
-                # Usar select_for_update para prevenir condiciones de carrera al modificar el stock
-                elemento = ElementoInventario.objects.select_for_update().get(pk=item['id_elemento'])
+                # Usar select_for_update para prevenir condiciones de carrera al modificar el stock.
+                # El disponible excluye las reservas propias (se consumen aquí) pero
+                # respeta las vigentes de otros carritos.
+                elemento = disponible_para_confirmar(item['id_elemento'], ids_reserva)
                 
                 stock_actual_decimal = Decimal(elemento.stock_actual) if elemento.stock_actual is not None else Decimal('0.00')
 
                 # Re-validación de Stock (seguridad)
-                if cantidad_db > stock_actual_decimal:
-                    raise IntegrityError(f"Stock insuficiente para {elemento.descripcion}. Solo {stock_actual_decimal} disponibles.")
+                if cantidad_db > elemento.stock_disponible:
+                    raise IntegrityError(f"Stock insuficiente para {elemento.descripcion}. Solo {elemento.stock_disponible} disponibles.")
 
                 # Crear el Movimiento de Inventario
                 MovimientoInventario.objects.create(
@@ -1107,19 +1480,33 @@ def _confirmar_salidas(request, SESSION_KEY, salidas_temporales):
                     fecha_movimiento=timezone.now(),
                     responsable=request.user,
                     referencia=item.get('destino_referencia', ''), 
+                    ubicacion_id=item.get('id_ubicacion'),
                 )
+                # La ubicación de origen debe tener la cantidad (índice elemento, ubicacion)
+                if item.get('id_ubicacion'):
+                    retirar_existencia(elemento, item['id_ubicacion'], cantidad_db)
 
                 # CORRECCIÓN CLAVE: Restamos la cantidad
                 elemento.stock_actual = stock_actual_decimal - cantidad_db
-                elemento.save()
-            
+                elemento.save(update_fields=['stock_actual', 'modificado'])
+                tocados.append(elemento)
+
+            # Alertas de stock sólo de los elementos confirmados (ya bloqueados)
+            evaluar_alertas(tocados)
+
+            # Las reservas quedan consumidas por los movimientos creados
+            liberar_reservas(ids_reserva, request.user)
+
             # Limpiar la sesión después de confirmar
             request.session.pop(SESSION_KEY, None)
+            request.session.pop(f'{SESSION_KEY}_clave', None)
             request.session.modified = True
             
-            messages.success(request, f"Salidas registradas y confirmadas con éxito. {len(salidas_temporales)} ítems procesados.")
+            messages.success(request, mensaje_exito)
         
-    except IntegrityError as e:
+    except ConfirmacionDuplicada:
+        return _repetir_confirmacion(request, SESSION_KEY, clave, 'inventario:salidas') or redirect('inventario:salidas')
+    except (IntegrityError, ExistenciaInsuficiente) as e:
         messages.error(request, f"Error de Stock. Transacción revertida. Detalle: {e}")
     except Exception as e:
         messages.error(request, f"Error al confirmar las salidas. Transacción revertida. Detalle: {e}")
@@ -1,9 +1,10 @@
+import importlib.util
 import os
 from pathlib import Path
-import pymysql
 
-# Instala pymysql para usarlo como driver de MySQL
-pymysql.install_as_MySQLdb()
+# WhiteNoise es opcional: si está instalado sirve los estáticos comprimidos
+# (find_spec no lo importa; el middleware lo cargará al arrancar)
+WHITENOISE_DISPONIBLE = importlib.util.find_spec('whitenoise') is not None
 
 # ==========================================================
 # BASE DIR
@@ -41,15 +42,24 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # ==========================================================
 MIDDLEWARE = [
+    # Primero, para que el tiempo total incluya al resto de middlewares
+    'core.instrumentacion.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    # Expone request.nivel_acceso del perfil cargado junto con el usuario
+    'core.acceso.NivelAccesoMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if WHITENOISE_DISPONIBLE:
+    # Justo después de SecurityMiddleware, como indica WhiteNoise
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                      'whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'sma_inventario.urls'
 
 # ==========================================================
@@ -70,6 +80,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.nivel_acceso',
             ],
         },
     },
@@ -82,15 +93,52 @@ WSGI_APPLICATION = 'sma_inventario.wsgi.application'
 # ==========================================================
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # Backend MySQL de Django con pool de conexiones por proceso (core.mysql_pool)
+        'ENGINE': 'core.mysql_pool',
         'NAME': 'sma_inventario_db',
         'USER': 'root',
         'PASSWORD': 'Lizeth11',
         'HOST': 'localhost',
         'PORT': '3306',
+        # El pool conserva las conexiones: Django las devuelve al final de cada request
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'TAMANO_MAXIMO': int(os.environ.get('SMA_DB_POOL_TAMANO', 10)),
+            'ESPERA_MAXIMA': float(os.environ.get('SMA_DB_POOL_ESPERA', 5)),
+            'EDAD_MAXIMA': int(os.environ.get('SMA_DB_POOL_EDAD', 600)),
+        },
     }
 }
 
+# SMA_DB_POOL=0 vuelve al backend MySQL estándar (una conexión nueva por request)
+if os.environ.get('SMA_DB_POOL') == '0':
+    DATABASES['default']['ENGINE'] = 'django.db.backends.mysql'
+
+# Benchmarks locales sin MySQL: SMA_DB=sqlite usa un archivo SQLite
+if os.environ.get('SMA_DB') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('SMA_DB_NAME', BASE_DIR / 'db.sqlite3'),
+    }
+
+# Réplica de lectura opcional para reportes y dashboards (core.db_router).
+# Hereda la configuración de 'default' salvo lo indicado en SMA_DB_REPLICA_*;
+# con SQLite basta SMA_DB_REPLICA_NAME apuntando a una copia del archivo.
+if os.environ.get('SMA_DB_REPLICA_HOST') or os.environ.get('SMA_DB_REPLICA_NAME'):
+    DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    for _clave in ('HOST', 'PORT', 'NAME', 'USER', 'PASSWORD'):
+        if os.environ.get(f'SMA_DB_REPLICA_{_clave}'):
+            DATABASES['replica'][_clave] = os.environ[f'SMA_DB_REPLICA_{_clave}']
+
+DATABASE_ROUTERS = ['core.db_router.RouterReplica']
+# Segundos tras un cambio en que las lecturas siguen en la primaria
+REPLICA_RETRASO_MAXIMO = int(os.environ.get('SMA_DB_REPLICA_RETRASO', 5))
+
+# Instala pymysql como driver de MySQL sólo cuando se usa MySQL
+if DATABASES['default']['ENGINE'] in ('django.db.backends.mysql', 'core.mysql_pool'):
+    import pymysql
+    pymysql.install_as_MySQLdb()
+
 # ==========================================================
 # AUTHENTICATION
 # ==========================================================
@@ -121,6 +169,44 @@ STATICFILES_DIRS = [
 # 3. Directorio donde se recopilan los archivos estáticos en producción (python manage.py collectstatic)
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# 4. collectstatic genera nombres con hash de contenido (caché de larga duración).
+#    Con WhiteNoise además se generan variantes .gz/.br (brotli si está instalado)
+#    que se sirven directamente según Accept-Encoding.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'whitenoise.storage.CompressedManifestStaticFilesStorage'
+            if WHITENOISE_DISPONIBLE else
+            'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+        ),
+    },
+}
+
+# 5. Dependencias de terceros servidas desde static/ en lugar de un CDN.
+#    Paso obligatorio del despliegue, antes de collectstatic:
+#        python manage.py vendorizar_estaticos
+#    El comando sólo guarda archivos cuyo sha256 coincide con el fijado aquí, y
+#    `check --deploy` falla si falta un hash y advierte si falta un archivo.
+#    Mientras el archivo no esté (o no haya pasado por collectstatic),
+#    {% vendor_url %} usa la URL del CDN en lugar de romper la página. Para fijar o actualizar una
+#    versión: cambie url/destino y ejecute `vendorizar_estaticos --fijar` en un
+#    equipo con red; imprime el sha256 a copiar en 'sha256'.
+VENDOR_ESTATICOS = {
+    'chart.js': {
+        'url': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js',
+        'destino': 'vendor/chart.js/4.4.0/chart.umd.min.js',
+        'sha256': None,
+    },
+    'tailwindcss': {
+        'url': 'https://cdn.tailwindcss.com/3.4.1',
+        'destino': 'vendor/tailwindcss/3.4.1/tailwindcss.js',
+        'sha256': None,
+    },
+}
+
 
 # ==========================================================
 # 💾 MEDIA FILES (ARCHIVOS SUBIDOS Y REPORTES GENERADOS)
@@ -147,4 +233,106 @@ LOGOUT_REDIRECT_URL = 'core:index'
 # ==========================================================
 # AUTO FIELD
 # ==========================================================
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# ==========================================================
+# RESERVAS DE STOCK (CARRITO DE SALIDAS)
+# ==========================================================
+# Minutos que una línea del carrito de salidas mantiene apartado su stock.
+RESERVA_STOCK_MINUTOS = 30
+
+
+# ==========================================================
+# ADMISIÓN DE REPORTES (core.admision)
+# ==========================================================
+# Generaciones de reportes simultáneas por proceso; el resto espera en cola
+# (máximo LONGITUD_COLA, ESPERA_MAXIMA segundos) para no acaparar la BD ni
+# los hilos que atienden entradas y salidas. Prioridad: 0 alta, 1 normal,
+# 2 baja (niveles no listados); ENVEJECIMIENTO segundos de espera suben una clase.
+REPORTES_ADMISION = {
+    'MAXIMO_CONCURRENTE': int(os.environ.get('SMA_REPORTES_CONCURRENTES', 2)),
+    'LONGITUD_COLA': 20,
+    'ESPERA_MAXIMA': 20,
+    'ENVEJECIMIENTO': 10,
+    'PRIORIDAD_POR_NIVEL': {1: 0, 3: 1, 2: 2},
+}
+
+
+# ==========================================================
+# FEED DE CAMBIOS PARA ERP (inventario.cambios)
+# ==========================================================
+# Filas máximas por página. El orden es el de confirmación (RegistroCambio):
+# no hace falta un margen de antigüedad para las transacciones largas.
+CAMBIOS_FEED = {
+    'LIMITE_MAXIMO': 5000,
+}
+
+# ==========================================================
+# NIVEL DE ACCESO
+# ==========================================================
+# El usuario de cada petición se recupera junto con su PerfilUsuario
+# (una sola consulta): el nivel de acceso nunca queda desfasado entre procesos.
+AUTHENTICATION_BACKENDS = ['core.acceso.BackendConPerfil']
+
+
+# ==========================================================
+# INSTRUMENTACIÓN (CONSULTAS / LATENCIA POR VISTA)
+# ==========================================================
+# Presupuesto de consultas SQL por vista (nombre 'namespace:vista'). Las
+# peticiones que lo exceden se registran en el logger 'sma_inventario.rendimiento'.
+PRESUPUESTO_CONSULTAS_DEFAULT = 50
+PRESUPUESTO_CONSULTAS = {
+    'inventario:dashboard': 10,
+    'inventario:reportes': 15,
+    'admin_sistema:usuarios': 10,
+}
+# Veces que debe repetirse la misma consulta en una petición para marcarla como N+1.
+UMBRAL_CONSULTAS_REPETIDAS = 5
+# Segundos entre avisos de la misma consulta repetida en la misma vista (el
+# conteo en /estadisticas sigue acumulando todas las peticiones).
+INTERVALO_AVISO_N1 = 300
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'sma_inventario.rendimiento': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+        'sma_inventario.cambios': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
+
+
+# ==========================================================
+# CACHÉ (DATOS VERSIONADOS POR TABLA)
+# ==========================================================
+# Las versiones de datos viven en la base de datos (core.VersionDatos), así que
+# la caché puede ser local a cada proceso: una copia cacheada sólo se usa con la
+# versión vigente. La caché en archivos (SMA_CACHE_DIR=/ruta) comparte además
+# los valores calculados entre los procesos de un mismo servidor.
+if os.environ.get('SMA_CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['SMA_CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sma-inventario',
+        }
+    }
+
+# Segundos máximos de vida de un contexto/fragmento cacheado aunque su versión
+# no cambie (acota, p. ej., la ventana móvil de 30 días de los KPIs).
+CACHE_DATOS_TIMEOUT = 300